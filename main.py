@@ -1,17 +1,84 @@
+import argparse
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from modules.login import LoginWindow
 from modules.database import Database
+from modules.writer import get_write_queue, stop_write_queue
+from modules.jobs import JobScheduler
+from modules.profiling import ProfilingApplication
+from modules.styles import APP_STYLESHEET
+from modules.windows import get_window_manager
+from modules.config import add_arguments, configure
+from modules.memstore import get_memory_store
+from modules.api import ApiServer
+from modules.events import change_bus
+from modules.replication import SyncEngine, hub_url_setting
+from modules.workload import start_recording, stop_recording
 
 def main():
-    app = QApplication(sys.argv)
+    # Database location / mode; anything else is left for Qt
+    parser = argparse.ArgumentParser(description="Tobacco Inventory System")
+    add_arguments(parser)
+    parser.add_argument("--api-port", type=int, help="also serve the HTTP API for remote tills on this port")
+    parser.add_argument("--api-host", default="127.0.0.1", help="interface for the HTTP API (0.0.0.0 for the LAN)")
+    parser.add_argument("--hub", help="replication hub URL shared by the shop's terminals")
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR",
+                        help="profile every UI action into DIR (default: profiles/ next to the database)")
+    parser.add_argument("--record-workload", nargs="?", const="", metavar="FILE",
+                        help="log sales, purchases, payments and reports for python -m modules.replay")
+    args, qt_args = parser.parse_known_args()
+    settings = configure(db=args.db, data_dir=args.data_dir, memory=args.memory)
+    
+    # Event dispatch can be profiled per action (--profile or the admin toggle)
+    app = ProfilingApplication(sys.argv[:1] + qt_args)
     app.setStyle('Fusion')  # Modern look
+    app.setStyleSheet(APP_STYLESHEET)  # parsed once for every window
+    if args.profile is not None:
+        app.set_profiling(True, args.profile or None)
     
     # Initialize database
     db = Database()
     db.init_database()
     
+    # Remote tills and integrations share the GUI's writer, so their sales
+    # show up in open windows; stopped before the writer drains
+    if args.api_port:
+        api = ApiServer(db, args.api_host, args.api_port, token=os.environ.get("TOBACCO_API_TOKEN"))
+        api.start_in_thread()
+        app.aboutToQuit.connect(api.stop)
+    
+    # Flush queued sales/purchases before the process exits
+    app.aboutToQuit.connect(stop_write_queue)
+    
+    if args.record_workload is not None:
+        start_recording(args.record_workload or None)
+        app.aboutToQuit.connect(stop_recording)
+    
+    # RAM-backed mode: copy to disk on a timer and once more after the writer stops
+    if settings.in_memory:
+        store = get_memory_store()
+        store.start(settings.persist_interval)
+        app.aboutToQuit.connect(store.stop)
+    
+    # Multi-terminal replication: sell locally, converge stock through the hub
+    hub_url = hub_url_setting(args.hub)
+    if hub_url:
+        sync = SyncEngine(hub_url, db, write_queue=get_write_queue())
+        sync.start()
+        change_bus.sale_recorded.connect(sync.wake)
+        change_bus.purchase_recorded.connect(sync.wake)
+        app.aboutToQuit.connect(sync.stop)
+    
+    # Checkpoints, optimize, aggregate checks, report pre-warming, stock
+    # audit and backups, run only while no sale is being saved
+    jobs = JobScheduler(db, write_queue=get_write_queue())
+    jobs.start()
+    app.aboutToQuit.connect(jobs.stop)
+    
+    # Report how long windows took to appear
+    app.aboutToQuit.connect(get_window_manager().print_latencies)
+    
     window = LoginWindow()
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,254 @@
+import argparse
+from datetime import date
+from modules.archive import report_sources
+from modules.database import CATEGORY_LINEAGE, Database
+
+TOLERANCE = 0.005  # money differences below half a paisa are rounding, not drift
+
+
+def find_drift(conn):
+    """Compare the maintained aggregates with the history they summarise.
+
+    Covers daily_sales, supplier_product_costs, the category roll-ups and
+    the customer and supplier balances. Everything is read in one snapshot (archives
+    included) and returned as corrections relative to the stored values,
+    so applying them later keeps whatever the writer has added since.
+    """
+    sources = report_sources(conn, "0001-01-01", date.today().isoformat())
+    sales, purchases = sources['sales'], sources['purchases']
+    conn.execute("BEGIN")
+    try:
+        daily = conn.execute(f"""
+            SELECT h.day, h.sales_count - COALESCE(d.sales_count, 0), h.units - COALESCE(d.units, 0),
+                   h.revenue - COALESCE(d.revenue, 0)
+            FROM (SELECT substr(sale_date, 1, 10) AS day, COUNT(*) AS sales_count,
+                         SUM(quantity) AS units, SUM(total_amount) AS revenue
+                  FROM {sales} GROUP BY substr(sale_date, 1, 10)) h
+            LEFT JOIN daily_sales d ON d.day = h.day
+            WHERE h.sales_count != COALESCE(d.sales_count, 0) OR h.units != COALESCE(d.units, 0)
+               OR abs(h.revenue - COALESCE(d.revenue, 0)) > :tolerance
+            UNION ALL
+            SELECT d.day, -d.sales_count, -d.units, -d.revenue
+            FROM daily_sales d
+            WHERE NOT EXISTS (SELECT 1 FROM {sales} s
+                              WHERE s.sale_date >= d.day AND s.sale_date < date(d.day, '+1 day'))
+        """, {'tolerance': TOLERANCE}).fetchall()
+
+        # unit_cost is a bare column next to MAX(), so it comes from the latest purchase
+        costs = conn.execute(f"""
+            SELECT h.supplier_id, h.product_id, h.purchase_count - COALESCE(c.purchase_count, 0),
+                   h.quantity - COALESCE(c.quantity, 0), h.total_cost - COALESCE(c.total_cost, 0),
+                   h.last_cost, h.last_purchase_date, c.last_purchase_date
+            FROM (SELECT supplier_id, product_id, COUNT(*) AS purchase_count, SUM(quantity) AS quantity,
+                         SUM(total_cost) AS total_cost, unit_cost AS last_cost,
+                         MAX(purchase_date) AS last_purchase_date
+                  FROM {purchases} WHERE supplier_id IS NOT NULL
+                  GROUP BY supplier_id, product_id) h
+            LEFT JOIN supplier_product_costs c
+                   ON c.supplier_id = h.supplier_id AND c.product_id = h.product_id
+            WHERE h.purchase_count != COALESCE(c.purchase_count, 0) OR h.quantity != COALESCE(c.quantity, 0)
+               OR abs(h.total_cost - COALESCE(c.total_cost, 0)) > :tolerance
+               OR h.last_purchase_date IS NOT c.last_purchase_date
+            UNION ALL
+            SELECT c.supplier_id, c.product_id, -c.purchase_count, -c.quantity, -c.total_cost,
+                   NULL, NULL, c.last_purchase_date
+            FROM supplier_product_costs c
+            WHERE NOT EXISTS (SELECT 1 FROM {purchases} p
+                              WHERE p.supplier_id = c.supplier_id AND p.product_id = c.product_id)
+        """, {'tolerance': TOLERANCE}).fetchall()
+
+        # Each product counts towards its category and every ancestor
+        category_sales = conn.execute(f"""
+            WITH RECURSIVE {CATEGORY_LINEAGE},
+            leaf AS (
+                SELECT p.category_id, substr(s.sale_date, 1, 10) AS day, COUNT(*) AS sales_count,
+                       SUM(s.quantity) AS units, SUM(s.total_amount) AS revenue
+                FROM {sales} s JOIN products p ON p.id = s.product_id
+                WHERE p.category_id IS NOT NULL
+                GROUP BY p.category_id, substr(s.sale_date, 1, 10)
+            ),
+            expected AS (
+                SELECT g.ancestor_id AS category_id, l.day, SUM(l.sales_count) AS sales_count,
+                       SUM(l.units) AS units, SUM(l.revenue) AS revenue
+                FROM leaf l JOIN lineage g ON g.category_id = l.category_id
+                GROUP BY g.ancestor_id, l.day
+            )
+            SELECT e.category_id, e.day, e.sales_count - COALESCE(k.sales_count, 0),
+                   e.units - COALESCE(k.units, 0), e.revenue - COALESCE(k.revenue, 0)
+            FROM expected e
+            LEFT JOIN category_sales k ON k.day = e.day AND k.category_id = e.category_id
+            WHERE e.sales_count != COALESCE(k.sales_count, 0) OR e.units != COALESCE(k.units, 0)
+               OR abs(e.revenue - COALESCE(k.revenue, 0)) > :tolerance
+            UNION ALL
+            SELECT k.category_id, k.day, -k.sales_count, -k.units, -k.revenue
+            FROM category_sales k
+            WHERE NOT EXISTS (SELECT 1 FROM expected e WHERE e.day = k.day AND e.category_id = k.category_id)
+        """, {'tolerance': TOLERANCE}).fetchall()
+
+        category_stock = conn.execute(f"""
+            WITH RECURSIVE {CATEGORY_LINEAGE},
+            expected AS (
+                SELECT g.ancestor_id AS category_id, COUNT(p.id) AS products,
+                       COALESCE(SUM(p.stock_quantity), 0) AS units,
+                       COALESCE(SUM(COALESCE(p.stock_quantity, 0) * COALESCE(p.unit_price, 0)), 0) AS stock_value
+                FROM lineage g LEFT JOIN products p ON p.category_id = g.category_id
+                GROUP BY g.ancestor_id
+            )
+            SELECT e.category_id, e.products - COALESCE(k.products, 0), e.units - COALESCE(k.units, 0),
+                   e.stock_value - COALESCE(k.stock_value, 0)
+            FROM expected e
+            LEFT JOIN category_stock k ON k.category_id = e.category_id
+            WHERE k.category_id IS NULL OR e.products != k.products OR e.units != k.units
+               OR abs(e.stock_value - k.stock_value) > :tolerance
+        """, {'tolerance': TOLERANCE}).fetchall()
+
+        balances = {}
+        for table, history, amount, payments, party in (
+                ('customers', sales, 'total_amount', 'customer_payments', 'customer_id'),
+                ('suppliers', purchases, 'total_cost', 'supplier_payments', 'supplier_id')):
+            balances[table] = conn.execute(f"""
+                SELECT t.id, COALESCE(ledger.owed, 0) - t.balance
+                FROM {table} t
+                LEFT JOIN (
+                    SELECT {party} AS party_id, SUM(amount) AS owed
+                    FROM (
+                        SELECT {party}, {amount} AS amount FROM {history} WHERE payment_type = 'Credit'
+                        UNION ALL
+                        SELECT {party}, -amount FROM {payments}
+                    )
+                    GROUP BY {party}
+                ) ledger ON ledger.party_id = t.id
+                WHERE abs(COALESCE(ledger.owed, 0) - t.balance) > :tolerance
+            """, {'tolerance': TOLERANCE}).fetchall()
+    finally:
+        conn.execute("COMMIT")
+
+    return {'daily_sales': daily, 'supplier_costs': costs,
+            'category_sales': category_sales, 'category_stock': category_stock,
+            'customers': balances['customers'], 'suppliers': balances['suppliers']}
+
+
+def drift_count(drift):
+    return sum(len(rows) for rows in drift.values())
+
+
+def repair_drift(cursor, drift):
+    """Write-queue handler: apply the corrections from find_drift.
+
+    Counters and totals move by the measured difference. The last cost of
+    a supplier/product pair is only replaced when it has not changed since
+    the snapshot. Returns (summary, None).
+    """
+    cursor.executemany("""
+        INSERT INTO daily_sales (day, sales_count, units, revenue) VALUES (?, ?, ?, ?)
+        ON CONFLICT (day) DO UPDATE SET
+            sales_count = sales_count + excluded.sales_count,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue
+    """, drift['daily_sales'])
+    cursor.execute("DELETE FROM daily_sales WHERE sales_count <= 0")
+
+    for supplier_id, product_id, count, quantity, total, last_cost, last_date, seen_date in drift['supplier_costs']:
+        cursor.execute("""
+            INSERT INTO supplier_product_costs
+                (supplier_id, product_id, purchase_count, quantity, total_cost, last_cost, last_purchase_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (supplier_id, product_id) DO UPDATE SET
+                purchase_count = purchase_count + excluded.purchase_count,
+                quantity = quantity + excluded.quantity,
+                total_cost = total_cost + excluded.total_cost,
+                last_cost = CASE WHEN last_purchase_date IS ? THEN excluded.last_cost ELSE last_cost END,
+                last_purchase_date = CASE WHEN last_purchase_date IS ? THEN excluded.last_purchase_date
+                                          ELSE last_purchase_date END
+        """, (supplier_id, product_id, count, quantity, total, last_cost, last_date, seen_date, seen_date))
+    cursor.execute("DELETE FROM supplier_product_costs WHERE purchase_count <= 0")
+
+    cursor.executemany("""
+        INSERT INTO category_sales (category_id, day, sales_count, units, revenue) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day, category_id) DO UPDATE SET
+            sales_count = sales_count + excluded.sales_count,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue
+    """, drift['category_sales'])
+    cursor.execute("DELETE FROM category_sales WHERE sales_count <= 0")
+    cursor.executemany("""
+        INSERT INTO category_stock (category_id, products, units, stock_value) VALUES (?, ?, ?, ?)
+        ON CONFLICT (category_id) DO UPDATE SET
+            products = products + excluded.products,
+            units = units + excluded.units,
+            stock_value = stock_value + excluded.stock_value
+    """, drift['category_stock'])
+
+    for table in ('customers', 'suppliers'):
+        cursor.executemany(f"UPDATE {table} SET balance = balance + ? WHERE id = ?",
+                           [(delta, party_id) for party_id, delta in drift[table]])
+
+    return {table: len(rows) for table, rows in drift.items()}, None
+
+
+def format_drift(drift):
+    lines = []
+    for day, count, units, revenue in drift['daily_sales']:
+        lines.append(f"daily_sales {day}: {count:+d} sales, {units:+d} units, Rs.{revenue:+.2f}")
+    for supplier_id, product_id, count, quantity, total, *_ in drift['supplier_costs']:
+        lines.append(f"supplier_product_costs supplier #{supplier_id} product #{product_id}: "
+                     f"{count:+d} purchases, {quantity:+d} units, Rs.{total:+.2f}")
+    for category_id, day, count, units, revenue in drift['category_sales']:
+        lines.append(f"category_sales category #{category_id} {day}: {count:+d} sales, {units:+d} units, "
+                     f"Rs.{revenue:+.2f}")
+    for category_id, products, units, value in drift['category_stock']:
+        lines.append(f"category_stock category #{category_id}: {products:+d} products, {units:+d} units, "
+                     f"Rs.{value:+.2f}")
+    for table in ('customers', 'suppliers'):
+        for party_id, delta in drift[table]:
+            lines.append(f"{table} #{party_id} balance: Rs.{delta:+.2f}")
+    return "\n".join(lines) or "All maintained aggregates match the history"
+
+
+def refresh_aggregates(db=None, write_queue=None):
+    """Check every aggregate and repair drift; returns the drift found.
+
+    The check runs on its own read connection; repairs go through the
+    write queue when one is given so they never contend with the till.
+    """
+    db = db or Database()
+    conn = db.get_connection()
+    conn.isolation_level = None
+    try:
+        drift = find_drift(conn)
+        if drift_count(drift) and write_queue is None:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                repair_drift(conn.cursor(), drift)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.close()
+
+    if drift_count(drift) and write_queue is not None:
+        write_queue.submit('aggregate_repair', drift)
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify daily sales, supplier costs, category roll-ups and balances against history")
+    parser.add_argument("--repair", action="store_true", help="correct the aggregates that drifted")
+    args = parser.parse_args()
+
+    db = Database()
+    if args.repair:
+        drift = refresh_aggregates(db)
+    else:
+        conn = db.get_connection()
+        conn.isolation_level = None
+        drift = find_drift(conn)
+        conn.close()
+    print(format_drift(drift))
+    if args.repair and drift_count(drift):
+        print(f"Repaired {drift_count(drift)} aggregate row(s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+from datetime import date
+
+# Trend report types and the strftime bucket each one groups by
+TREND_PERIODS = {
+    'Daily Trend': '%Y-%m-%d',
+    'Weekly Trend': '%Y-W%W',
+    'Monthly Trend': '%Y-%m',
+    'Year-over-Year': '%Y-%m',
+}
+
+
+def trend_columns(conn, sales, bucket_format, from_date, to_date):
+    """Aggregate sales per (period bucket, product) in a single grouped pass.
+
+    Returns columnar lists {'bucket', 'product', 'units', 'revenue'},
+    sorted by bucket, so callers can total or pivot without re-querying.
+    """
+    columns = {'bucket': [], 'product': [], 'units': [], 'revenue': []}
+    cursor = conn.execute(f"""
+        SELECT strftime(?, s.sale_date) AS bucket, p.name,
+               SUM(s.quantity), SUM(s.total_amount)
+        FROM {sales} s
+        JOIN products p ON s.product_id = p.id
+        WHERE s.sale_date BETWEEN ? AND ?
+        GROUP BY bucket, s.product_id
+        ORDER BY bucket
+    """, (bucket_format, from_date, to_date))
+
+    for bucket, product, units, revenue in cursor:
+        columns['bucket'].append(bucket)
+        columns['product'].append(product)
+        columns['units'].append(units)
+        columns['revenue'].append(revenue)
+    return columns
+
+
+def bucket_totals(columns):
+    """Collapse per-product columns into one total per bucket"""
+    totals = {'bucket': [], 'units': [], 'revenue': [], 'products': []}
+    for bucket, units, revenue in zip(columns['bucket'], columns['units'], columns['revenue']):
+        if totals['bucket'] and totals['bucket'][-1] == bucket:
+            totals['units'][-1] += units
+            totals['revenue'][-1] += revenue
+            totals['products'][-1] += 1
+        else:
+            totals['bucket'].append(bucket)
+            totals['units'].append(units)
+            totals['revenue'].append(revenue)
+            totals['products'].append(1)
+    return totals
+
+
+def year_over_year(totals):
+    """Pivot monthly totals ('YYYY-MM' buckets) into {year: [revenue for months 1-12]}"""
+    years = {}
+    for bucket, revenue in zip(totals['bucket'], totals['revenue']):
+        year, month = bucket[:4], int(bucket[5:7])
+        years.setdefault(year, [0.0] * 12)[month - 1] += revenue
+    return years
+
+
+def downsample_minmax(values, width):
+    """Reduce a series to at most `width` (min, max) pairs, one per pixel column.
+
+    Keeping both extremes of every column preserves spikes that plain
+    averaging would flatten.
+    """
+    count = len(values)
+    if count <= width:
+        return [(value, value) for value in values]
+
+    pairs = []
+    for column in range(width):
+        start = column * count // width
+        end = max((column + 1) * count // width, start + 1)
+        chunk = values[start:end]
+        pairs.append((min(chunk), max(chunk)))
+    return pairs
+
+
+def binned_sales(conn, from_date, to_date, bin_days):
+    """Pre-bin sales into fixed-width day bins from the daily_sales aggregate.
+
+    Reads at most one row per day in the range rather than every sale, so
+    the cost depends on the span charted, not on sales volume. Returns
+    columnar lists {'x' (julian day of bin start), 'revenue', 'units'}.
+    """
+    series = {'x': [], 'revenue': [], 'units': []}
+    cursor = conn.execute("""
+        SELECT CAST(julianday(day) / ? AS INTEGER) AS bin,
+               SUM(revenue), SUM(units)
+        FROM daily_sales
+        WHERE day BETWEEN ? AND ?
+        GROUP BY bin
+        ORDER BY bin
+    """, (bin_days, from_date, to_date))
+
+    for bin_index, revenue, units in cursor:
+        series['x'].append(bin_index * bin_days)
+        series['revenue'].append(revenue)
+        series['units'].append(units)
+    return series
+
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets downsampling to `threshold` points.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves the visual shape.
+    """
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(xs), list(ys)
+
+    sampled_x, sampled_y = [xs[0]], [ys[0]]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        avg_start = int((bucket + 1) * every) + 1
+        avg_end = min(int((bucket + 2) * every) + 1, count)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+
+        range_start = int(bucket * every) + 1
+        range_end = int((bucket + 1) * every) + 1
+        point_x, point_y = xs[previous], ys[previous]
+
+        max_area = -1
+        chosen = range_start
+        for index in range(range_start, range_end):
+            area = abs((point_x - avg_x) * (ys[index] - point_y)
+                       - (point_x - xs[index]) * (avg_y - point_y))
+            if area > max_area:
+                max_area = area
+                chosen = index
+
+        sampled_x.append(xs[chosen])
+        sampled_y.append(ys[chosen])
+        previous = chosen
+
+    sampled_x.append(xs[-1])
+    sampled_y.append(ys[-1])
+    return sampled_x, sampled_y
+
+
+def julian_to_iso(julian_day):
+    """Convert a SQLite julianday() value to a 'YYYY-MM-DD' string"""
+    return date.fromordinal(int(julian_day - 1721424.5)).isoformat()
@@ -0,0 +1,507 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+from modules.archive import report_sources
+from modules.config import add_arguments, configure
+from modules.database import Database
+from modules.transactions import TransactionError
+from modules.writer import get_write_queue
+
+PAYMENT_TYPES = ["Cash", "Credit", "Bank Transfer", "UPI"]
+PRODUCT_COLUMNS = ['id', 'name', 'category', 'barcode', 'stock_quantity', 'unit_price']
+SALE_COLUMNS = ['id', 'product_id', 'customer_name', 'quantity', 'unit_price', 'total_amount',
+                'payment_type', 'sale_date', 'txn_id']
+PURCHASE_COLUMNS = ['id', 'product_id', 'supplier', 'quantity', 'unit_cost', 'total_cost',
+                    'payment_type', 'purchase_date']
+
+STREAM_BATCH = 500  # rows per chunk of a streamed listing
+MAX_BODY = 1024 * 1024
+REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    """A request the API rejects; status is the HTTP status to answer with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReaderPool:
+    """Fixed set of read-only connections, one per worker thread.
+
+    Handlers run their queries with `await pool.run(fn, *args)`; fn gets
+    the worker's own connection, so reads never wait on each other or on
+    the writer (WAL) and never block the event loop.
+    """
+
+    def __init__(self, db, size=4):
+        self.db = db
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="api-reader",
+                                           initializer=self.open)
+
+    def open(self):
+        conn = self.db.get_connection()
+        conn.execute("PRAGMA query_only = ON")
+        self.local.conn = conn
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(self.local.conn, *args))
+
+    def close(self):
+        # Each connection belongs to its worker thread and closes with it
+        self.executor.shutdown(wait=True)
+
+
+def product_rows(conn, after_id, below=None):
+    sql = f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE id > ?"
+    params = [after_id]
+    if below is not None:
+        sql += " AND stock_quantity < ?"
+        params.append(below)
+    return conn.execute(sql + f" ORDER BY id LIMIT {STREAM_BATCH}", params).fetchall()
+
+
+def history_rows(conn, table, columns, date_column, from_date, to_date, after_id):
+    """One keyset page of sales or purchases in the range (archives included)"""
+    # Readers are query_only, so archived years come in as a subquery, not a TEMP view
+    source = report_sources(conn, from_date, to_date, inline=True)[table]
+    return conn.execute(f"""
+        SELECT {', '.join(columns)} FROM {source}
+        WHERE {date_column} >= ? AND {date_column} < date(?, '+1 day') AND id > ?
+        ORDER BY id LIMIT {STREAM_BATCH}
+    """, (from_date, to_date, after_id)).fetchall()
+
+
+def find_product(conn, product_id=None, barcode=None):
+    if product_id is not None:
+        where, value = "id = ?", product_id
+    else:
+        where, value = "barcode = ?", barcode
+    row = conn.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products WHERE {where}",
+                       (value,)).fetchone()
+    return dict(zip(PRODUCT_COLUMNS, row)) if row else None
+
+
+def require(body, field, kind, positive=True):
+    value = body.get(field)
+    if isinstance(value, bool) or not isinstance(value, kind):
+        raise ApiError(400, f"'{field}' is required")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ApiError(400, f"'{field}' must be a finite number")
+    if positive and value <= 0:
+        raise ApiError(400, f"'{field}' must be greater than zero")
+    return value
+
+
+def text(body, field, default=None):
+    value = body.get(field, default)
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(400, f"'{field}' is required")
+    return value.strip()
+
+
+def optional_text(body, field):
+    value = body.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ApiError(400, f"'{field}' must be a string")
+    return value.strip() or None
+
+
+def date_param(query, name, default):
+    value = query.get(name, [default])[0]
+    if not isinstance(value, str):
+        raise ApiError(400, f"'{name}' must be a YYYY-MM-DD date")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be a YYYY-MM-DD date")
+
+
+class ApiServer:
+    """HTTP/JSON API over the same transaction code as the windows.
+
+    Reads go through a ReaderPool; every write is submitted to the
+    process-wide WriteQueue, so API sales, till sales and purchase entry
+    share one serialised writer (and its group commit, stock checks,
+    offline journal and change bus). Large listings are streamed with
+    chunked transfer encoding, one keyset page at a time.
+    """
+
+    def __init__(self, db=None, host="127.0.0.1", port=8765, readers=4, write_queue=None, token=None):
+        self.db = db or Database()
+        self.host = host
+        self.port = port
+        self.readers = ReaderPool(self.db, readers)
+        self.write_queue = write_queue or get_write_queue()
+        self.token = token
+        self.server = None
+        self.loop = None
+        self.routes = [
+            ('GET', r'/health', self.health),
+            ('GET', r'/products', self.list_products),
+            ('GET', r'/products/(\d+)', self.get_product),
+            ('GET', r'/products/barcode/([^/]+)', self.get_product_by_barcode),
+            ('GET', r'/stock', self.list_stock),
+            ('GET', r'/sales', self.list_sales),
+            ('POST', r'/sales', self.create_sale),
+            ('GET', r'/purchases', self.list_purchases),
+            ('POST', r'/purchases', self.create_purchase),
+        ]
+        self.routes = [(method, re.compile(pattern + r'/?$'), handler)
+                       for method, pattern, handler in self.routes]
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"API listening on http://{self.host}:{self.port}")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the server on its own event loop thread (e.g. next to the GUI)"""
+        started = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except OSError as e:
+                failure.append(e)
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+            loop.close()
+
+        thread = threading.Thread(target=run, name="api-server", daemon=True)
+        thread.start()
+        started.wait(10)
+        if failure:
+            raise failure[0]
+        return thread
+
+    def stop(self):
+        """Stop a server started with start_in_thread"""
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.readers.close()
+
+    # HTTP plumbing
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send_json(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send_json(writer, 400, {'error': "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.send_json(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                await self.dispatch(writer, method, target, headers, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer, method, target, headers, body, keep_alive):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            if self.token and headers.get('authorization') != f"Bearer {self.token}":
+                raise ApiError(401, "Missing or invalid API token")
+            allowed = False
+            for route_method, pattern, handler in self.routes:
+                match = pattern.match(url.path)
+                if not match:
+                    continue
+                allowed = True
+                if route_method == method:
+                    break
+            else:
+                raise ApiError(405 if allowed else 404,
+                               "Method not allowed" if allowed else "Not found")
+
+            if method == 'POST':
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    raise ApiError(400, "Body must be JSON")
+                if not isinstance(payload, dict):
+                    raise ApiError(400, "Body must be a JSON object")
+                status, result = await handler(payload, *match.groups())
+            else:
+                result = await handler(query, *match.groups())
+                if hasattr(result, '__aiter__'):
+                    await self.send_stream(writer, result, keep_alive)
+                    return
+                status = 200
+            await self.send_json(writer, status, result, keep_alive)
+        except ApiError as e:
+            await self.send_json(writer, e.status, {'error': str(e)}, keep_alive)
+        except sqlite3.Error as e:
+            print(f"Debug - API database error: {e}")
+            await self.send_json(writer, 503, {'error': f"Database error: {e}"}, keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            # A handler bug must still get an answer, not a dropped connection
+            print(f"Debug - API error handling {method} {url.path}: {e!r}")
+            await self.send_json(writer, 500, {'error': "Internal server error"}, keep_alive)
+
+    def head(self, status, keep_alive, extra):
+        return (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                f"{extra}\r\n").encode('latin-1')
+
+    async def send_json(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, default=str).encode('utf-8')
+        writer.write(self.head(status, keep_alive, f"Content-Length: {len(data)}\r\n") + data)
+        await writer.drain()
+
+    async def send_stream(self, writer, pages, keep_alive):
+        """Send a JSON array page by page as HTTP chunks, honouring back-pressure.
+
+        The first page is fetched before the headers go out, so a failing
+        query still gets a proper error response. Once the body has started
+        an error can only abort the connection; the client sees a truncated
+        transfer rather than a response spliced into the array.
+        """
+        items = await anext(pages, [])
+        writer.write(self.head(200, keep_alive, "Transfer-Encoding: chunked\r\n"))
+        first = True
+        try:
+            while items is not None:
+                if items:
+                    data = ",".join(json.dumps(item, default=str) for item in items)
+                    data = ("[" if first else ",") + data
+                    first = False
+                    self.write_chunk(writer, data.encode('utf-8'))
+                    await writer.drain()
+                items = await anext(pages, None)
+        except Exception as e:
+            print(f"Debug - API stream aborted: {e!r}")
+            writer.transport.abort()
+            raise ConnectionAbortedError(str(e))
+        self.write_chunk(writer, b"[]" if first else b"]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    def write_chunk(self, writer, data):
+        writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b"\r\n")
+
+    async def keyset_pages(self, fetch, columns, *args):
+        after_id = 0
+        while True:
+            rows = await self.readers.run(fetch, *args, after_id)
+            yield [dict(zip(columns, row)) for row in rows]
+            if len(rows) < STREAM_BATCH:
+                return
+            after_id = rows[-1][0]
+
+    async def submit(self, kind, data):
+        """Queue a write and wait for its commit without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(result, error):
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        self.write_queue.submit(kind, data, lambda result, error: loop.call_soon_threadsafe(resolve, result, error))
+        return await future
+
+    # Endpoints
+
+    async def health(self, query):
+        return {'status': 'ok', 'writer': self.write_queue.metrics()}
+
+    async def list_products(self, query):
+        return self.keyset_pages(lambda conn, after_id: product_rows(conn, after_id), PRODUCT_COLUMNS)
+
+    async def list_stock(self, query):
+        below = query.get('below', [None])[0]
+        if below is not None and not below.lstrip('-').isdigit():
+            raise ApiError(400, "'below' must be a whole number")
+        below = int(below) if below is not None else None
+        return self.keyset_pages(lambda conn, after_id: product_rows(conn, after_id, below), PRODUCT_COLUMNS)
+
+    async def get_product(self, query, product_id):
+        product = await self.readers.run(find_product, int(product_id))
+        if not product:
+            raise ApiError(404, "Product not found")
+        return product
+
+    async def get_product_by_barcode(self, query, barcode):
+        product = await self.readers.run(find_product, None, barcode)
+        if not product:
+            raise ApiError(404, "Product not found")
+        return product
+
+    async def list_sales(self, query):
+        today = date.today().isoformat()
+        from_date, to_date = date_param(query, 'from', today), date_param(query, 'to', today)
+        return self.keyset_pages(history_rows, SALE_COLUMNS, 'sales', SALE_COLUMNS, 'sale_date',
+                                 from_date, to_date)
+
+    async def list_purchases(self, query):
+        today = date.today().isoformat()
+        from_date, to_date = date_param(query, 'from', today), date_param(query, 'to', today)
+        return self.keyset_pages(history_rows, PURCHASE_COLUMNS, 'purchases', PURCHASE_COLUMNS,
+                                 'purchase_date', from_date, to_date)
+
+    async def create_sale(self, body):
+        # Tills may identify the product by id or barcode instead of by name
+        product = None
+        if 'product_id' in body or 'barcode' in body:
+            product_id = require(body, 'product_id', int) if 'product_id' in body else None
+            product = await self.readers.run(find_product, product_id, optional_text(body, 'barcode'))
+            if not product:
+                raise ApiError(404, "Product not found")
+        sale = {
+            # Clients should send their own txn_id so a retried request is not recorded twice
+            'txn_id': self.txn_id(body),
+            'product_name': product['name'] if product else text(body, 'product_name'),
+            'customer_name': text(body, 'customer_name', "Walk-in"),
+            'quantity': require(body, 'quantity', int),
+            'payment_type': self.payment_type(body),
+            'sale_date': self.entry_date(body, 'sale_date'),
+        }
+        if 'unit_price' in body:
+            sale['unit_price'] = require(body, 'unit_price', (int, float))
+        else:
+            if product is None:
+                product = await self.readers.run(
+                    lambda conn: conn.execute("SELECT unit_price FROM products WHERE name = ?",
+                                              (sale['product_name'],)).fetchone())
+                if product is None:
+                    raise ApiError(404, "Product not found")
+                product = {'unit_price': product[0]}
+            sale['unit_price'] = product['unit_price']
+        return await self.write('sale', sale)
+
+    async def create_purchase(self, body):
+        purchase = {
+            'product_name': text(body, 'product_name'),
+            'barcode': optional_text(body, 'barcode'),
+            'supplier': text(body, 'supplier'),
+            'quantity': require(body, 'quantity', int),
+            'unit_cost': require(body, 'unit_cost', (int, float)),
+            'payment_type': self.payment_type(body),
+            'purchase_date': self.entry_date(body, 'purchase_date'),
+        }
+        return await self.write('purchase', purchase)
+
+    async def write(self, kind, data):
+        try:
+            record = await self.submit(kind, data)
+        except TransactionError as e:
+            raise ApiError(409, str(e))
+        except sqlite3.IntegrityError as e:
+            raise ApiError(409, f"Rejected by the database: {e}")
+        except OSError as e:
+            raise ApiError(503, f"Could not save: {e}")
+        if record is None:
+            # Same txn_id already recorded: the earlier request went through
+            return 200, {'duplicate': True, 'txn_id': data.get('txn_id')}
+        if record.get('offline'):
+            return 202, record
+        return 201, record
+
+    def txn_id(self, body):
+        # The dedupe key; a number or object is not silently turned into one
+        if 'txn_id' not in body:
+            return uuid.uuid4().hex
+        value = body['txn_id']
+        if not isinstance(value, str) or not value.strip():
+            raise ApiError(400, "'txn_id' must be a non-empty string")
+        return value
+
+    def payment_type(self, body):
+        payment_type = body.get('payment_type', "Cash")
+        if payment_type not in PAYMENT_TYPES:
+            raise ApiError(400, f"'payment_type' must be one of {', '.join(PAYMENT_TYPES)}")
+        return payment_type
+
+    def entry_date(self, body, field):
+        return date_param({field: [body[field]]} if body.get(field) else {}, field, date.today().isoformat())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve products, stock, sales and purchases over HTTP/JSON")
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--readers", type=int, default=4, help="pooled read connections")
+    parser.add_argument("--token", default=os.environ.get("TOBACCO_API_TOKEN"),
+                        help="require 'Authorization: Bearer TOKEN' (default: $TOBACCO_API_TOKEN)")
+    args = parser.parse_args()
+    configure(db=args.db, data_dir=args.data_dir, memory=args.memory)
+
+    db = Database()
+    db.init_database()
+    server = ApiServer(db, args.host, args.port, args.readers, token=args.token)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.readers.close()
+        server.write_queue.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from urllib.parse import urlsplit
+from modules.api import ApiServer
+from modules.database import Database
+from modules.writer import WriteQueue
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client for the load test"""
+
+    def __init__(self, host, port, token=None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write((head + "\r\n").encode('latin-1') + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int(await self.reader.readline(), 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get('content-length', 0)))
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def worker(client, deadline, product_ids, write_ratio, latencies, statuses):
+    while time.perf_counter() < deadline:
+        if random.random() < write_ratio:
+            method, path = 'POST', '/sales'
+            payload = {'product_id': random.choice(product_ids), 'quantity': 1,
+                       'customer_name': 'Load Test', 'txn_id': uuid.uuid4().hex}
+        else:
+            method, path, payload = 'GET', f"/products/{random.choice(product_ids)}", None
+        started = time.perf_counter()
+        try:
+            status = await client.request(method, path, payload)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            client.close()
+            client.writer = None
+            status = 'error'
+        latencies.setdefault(method, []).append((time.perf_counter() - started) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    client.close()
+
+
+async def run_load(host, port, concurrency, duration, write_ratio, token=None, product_ids=None):
+    product_ids = product_ids or list(range(1, 51))
+    latencies, statuses = {}, {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(Client(host, port, token), deadline, product_ids, write_ratio,
+                                  latencies, statuses)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # One large streamed listing, timed on its own
+    client = Client(host, port, token)
+    stream_started = time.perf_counter()
+    await client.request('GET', '/products')
+    stream_ms = (time.perf_counter() - stream_started) * 1000
+    client.close()
+    return latencies, statuses, elapsed, stream_ms
+
+
+def format_results(latencies, statuses, elapsed, stream_ms, concurrency):
+    total = sum(len(samples) for samples in latencies.values())
+    every = [ms for samples in latencies.values() for ms in samples]
+    lines = [
+        f"{total} requests in {elapsed:.1f}s with {concurrency} connections: {total / elapsed:.0f} req/s",
+        f"  all: p50 {percentile(every, 50):.2f} ms, p99 {percentile(every, 99):.2f} ms, "
+        f"max {max(every, default=0):.2f} ms",
+    ]
+    for method, samples in sorted(latencies.items()):
+        lines.append(f"  {method}: {len(samples)} requests, p50 {percentile(samples, 50):.2f} ms, "
+                     f"p99 {percentile(samples, 99):.2f} ms")
+    lines.append(f"  status codes: {', '.join(f'{code}={count}' for code, count in sorted(statuses.items(), key=str))}")
+    lines.append(f"  full /products stream: {stream_ms:.1f} ms")
+    return "\n".join(lines)
+
+
+def self_hosted(products, readers):
+    """Start an API server on a scratch database seeded with `products` items"""
+    folder = tempfile.mkdtemp(prefix="api_load_")
+    db = Database(os.path.join(folder, "load.db"))
+    db.init_database()
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO products (name, stock_quantity, unit_price, barcode) VALUES (?, ?, ?, ?)",
+                     [(f"Product {i}", 1_000_000, 10.0, f"89{i:011d}") for i in range(products)])
+    conn.commit()
+    conn.close()
+    server = ApiServer(db, port=0, readers=readers, write_queue=WriteQueue(db))
+    server.start_in_thread()
+    return server, folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API and report req/s and latency percentiles")
+    parser.add_argument("--url", help="running server to test, e.g. http://127.0.0.1:8765 "
+                                      "(default: start one on a scratch database)")
+    parser.add_argument("--token", default=os.environ.get("TOBACCO_API_TOKEN"))
+    parser.add_argument("--concurrency", type=int, default=32, help="parallel keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--write-ratio", type=float, default=0.2,
+                        help="share of requests that POST a sale (scratch database only unless --allow-writes)")
+    parser.add_argument("--allow-writes", action="store_true", help="let --write-ratio apply to --url")
+    parser.add_argument("--products", type=int, default=20_000, help="products in the scratch database")
+    parser.add_argument("--readers", type=int, default=4, help="reader pool size of the scratch server")
+    args = parser.parse_args()
+
+    server = folder = None
+    write_ratio = args.write_ratio
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        product_ids = None
+        if not args.allow_writes:
+            write_ratio = 0.0
+    else:
+        server, folder = self_hosted(args.products, args.readers)
+        host, port = server.host, server.port
+        product_ids = list(range(1, args.products + 1))
+
+    try:
+        results = asyncio.run(run_load(host, port, args.concurrency, args.duration, write_ratio,
+                                       args.token, product_ids))
+        print(format_results(*results, args.concurrency))
+        if server is not None:
+            metrics = server.write_queue.metrics()
+            print(f"  writer: {metrics['commands']} commands in {metrics['commits']} commits, "
+                  f"avg {metrics['avg_commit_ms']:.2f} ms per commit")
+    finally:
+        if server is not None:
+            server.stop()
+            server.write_queue.stop()
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
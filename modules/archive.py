@@ -0,0 +1,275 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from modules.config import get_settings
+from modules.database import Database
+
+# Archived tables and the date column that decides their year
+ARCHIVED_TABLES = {
+    'sales': 'sale_date',
+    'purchases': 'purchase_date',
+}
+
+
+def archive_path(db, year):
+    return os.path.join(os.path.dirname(os.path.abspath(db.db_name)), f"sales_{year}.db")
+
+
+def table_columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def archive_year(db, year, vacuum=False):
+    """Move one closed year of sales and purchases into sales_YYYY.db.
+
+    SQLite does not commit a transaction spanning ATTACHed databases
+    atomically in WAL mode, so a crash could keep one file's half and
+    lose the other's. The move is therefore two transactions: rows are
+    first copied into the archive (skipping any an earlier, interrupted
+    run already copied), then deleted from the hot database only where
+    an identical archived copy exists. An interruption leaves rows in
+    both files at worst, never in neither, and running it again finishes
+    the job. Returns {table: rows moved}.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not closed yet; only past years can be archived")
+
+    path = archive_path(db, year)
+    start, end = f"{year}-01-01", f"{year + 1}-01-01"
+    moved = {}
+
+    conn = db.get_connection()
+    conn.isolation_level = None
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    try:
+        # Step 1: copy into the archive
+        conn.execute("BEGIN IMMEDIATE")
+        for table, date_column in ARCHIVED_TABLES.items():
+            columns = table_columns(conn, 'main', table)
+            if not table_columns(conn, 'archive', table):
+                conn.execute(f"CREATE TABLE archive.{table} AS SELECT * FROM main.{table} WHERE 0")
+                conn.execute(f"CREATE INDEX archive.idx_{table}_date ON {table} ({date_column}, id)")
+            else:
+                # The hot schema may have grown columns since the archive was created
+                existing = table_columns(conn, 'archive', table)
+                for column in columns:
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {column}")
+
+            column_list = ", ".join(columns)
+            conn.execute(f"""
+                INSERT INTO archive.{table} ({column_list})
+                SELECT {column_list} FROM main.{table} m
+                WHERE m.{date_column} >= ? AND m.{date_column} < ?
+                  AND NOT EXISTS (SELECT 1 FROM archive.{table} a
+                                  WHERE a.{date_column} = m.{date_column} AND a.id = m.id)
+            """, (start, end))
+        conn.execute("COMMIT")
+
+        # Step 2: delete what the archive verifiably holds
+        conn.execute("BEGIN IMMEDIATE")
+        counts = {}
+        for table, date_column in ARCHIVED_TABLES.items():
+            same_row = " AND ".join(f"a.{column} IS m.{column}" for column in table_columns(conn, 'main', table))
+            copied = f"""EXISTS (SELECT 1 FROM archive.{table} a
+                                 WHERE a.{date_column} = m.{date_column} AND a.id = m.id AND {same_row})"""
+            missing = conn.execute(f"""
+                SELECT COUNT(*) FROM main.{table} m
+                WHERE m.{date_column} >= ? AND m.{date_column} < ? AND NOT {copied}
+            """, (start, end)).fetchone()[0]
+            if missing:
+                raise RuntimeError(f"{missing} {table} row(s) of {year} have no matching copy in {path}; "
+                                   "nothing was deleted")
+            cursor = conn.execute(f"""
+                DELETE FROM main.{table} AS m
+                WHERE m.{date_column} >= ? AND m.{date_column} < ? AND {copied}
+            """, (start, end))
+            moved[table] = cursor.rowcount
+            counts[table] = conn.execute(f"SELECT COUNT(*) FROM archive.{table}").fetchone()[0]
+
+        conn.execute("""
+            INSERT INTO archives (year, path, sales_rows, purchase_rows)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (year) DO UPDATE SET
+                sales_rows = excluded.sales_rows,
+                purchase_rows = excluded.purchase_rows,
+                archived_at = CURRENT_TIMESTAMP
+        """, (year, os.path.basename(path), counts['sales'], counts['purchases']))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DETACH DATABASE archive")
+
+    # Reclaim the freed pages so the hot file actually shrinks
+    if vacuum:
+        conn.execute("VACUUM")
+    conn.close()
+    return moved
+
+
+def report_sources(conn, from_date, to_date, inline=False):
+    """Return {table: name to query} covering the given date range.
+
+    Ranges inside the hot database use the plain tables. When a range
+    reaches back into archived years, those archives are attached and
+    TEMP views UNION ALL the hot table with each archive. inline=True
+    returns the UNION ALL as a parenthesised subquery instead, for
+    connections that cannot create views (PRAGMA query_only).
+    """
+    sources = {table: table for table in ARCHIVED_TABLES}
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='archives'")
+    if not cursor.fetchone():
+        return sources
+
+    cursor.execute("SELECT year, path FROM archives WHERE year BETWEEN ? AND ? ORDER BY year",
+                   (int(from_date[:4]), int(to_date[:4])))
+    archives = cursor.fetchall()
+    if not archives:
+        return sources
+
+    main_path = [row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main'][0]
+    if main_path and os.path.exists(main_path):
+        folder = os.path.dirname(os.path.abspath(main_path))
+    else:
+        # In-memory or temporary database: archives sit next to the configured file
+        folder = os.path.dirname(get_settings().db_path) if get_settings().persistent else os.getcwd()
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    for year, path in archives:
+        if f"arc_{year}" not in attached:
+            conn.execute("ATTACH DATABASE ? AS ?", (os.path.join(folder, path), f"arc_{year}"))
+
+    for table in ARCHIVED_TABLES:
+        columns = table_columns(conn, 'main', table)
+        parts = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+        for year, _ in archives:
+            archived = set(table_columns(conn, f"arc_{year}", table))
+            select_list = ", ".join(column if column in archived else f"NULL AS {column}"
+                                    for column in columns)
+            parts.append(f"SELECT {select_list} FROM arc_{year}.{table}")
+
+        if inline:
+            sources[table] = f"({' UNION ALL '.join(parts)})"
+            continue
+        view = f"{table}_{archives[0][0]}_{archives[-1][0]}"
+        conn.execute(f"DROP VIEW IF EXISTS temp.{view}")
+        conn.execute(f"CREATE TEMP VIEW {view} AS " + " UNION ALL ".join(parts))
+        sources[table] = view
+    return sources
+
+
+def list_archives(db):
+    conn = db.get_connection()
+    rows = conn.execute("""
+        SELECT year, path, sales_rows, purchase_rows, archived_at FROM archives ORDER BY year
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def benchmark(years=5, sales_per_day=100, runs=5):
+    """Show that current-month report latency does not grow with archived history"""
+    folder = tempfile.mkdtemp(prefix="archive_bench_")
+    db = Database(os.path.join(folder, "bench.db"))
+    db.init_database()
+
+    today = date.today()
+    first_day = date(today.year - years, 1, 1)
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO products (name, stock_quantity, unit_price) VALUES (?, 1000000, ?)",
+                     [(f"Product {i}", 10 + i) for i in range(50)])
+    rows = []
+    day = first_day
+    while day <= today:
+        for _ in range(sales_per_day):
+            quantity = random.randint(1, 5)
+            rows.append((random.randint(1, 50), "Walk-in", quantity, 10.0, quantity * 10.0,
+                         "Cash", day.isoformat()))
+        day += timedelta(days=1)
+    conn.executemany("""
+        INSERT INTO sales (product_id, customer_name, quantity, unit_price, total_amount, payment_type, sale_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+
+    month_start = today.replace(day=1).isoformat()
+    month_end = today.isoformat()
+
+    def month_report_ms():
+        best = None
+        for _ in range(runs):
+            conn = db.get_connection()
+            started = time.perf_counter()
+            sources = report_sources(conn, month_start, month_end)
+            conn.execute(f"""
+                SELECT s.sale_date, p.name, s.customer_name, s.quantity,
+                       s.unit_price, s.total_amount, s.payment_type
+                FROM {sources['sales']} s
+                JOIN products p ON s.product_id = p.id
+                WHERE s.sale_date BETWEEN ? AND ?
+                ORDER BY s.sale_date DESC
+            """, (month_start, month_end)).fetchall()
+            conn.execute(f"""
+                SELECT COUNT(*), SUM(total_amount), AVG(total_amount)
+                FROM {sources['sales']} WHERE sale_date BETWEEN ? AND ?
+            """, (month_start, month_end)).fetchone()
+            elapsed = (time.perf_counter() - started) * 1000
+            conn.close()
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    size_mb = os.path.getsize(db.db_name) / (1024 * 1024)
+    print(f"History: {len(rows)} sales over {years + 1} years, hot database {size_mb:.1f} MB")
+    print(f"  Current-month report: {month_report_ms():.2f} ms")
+
+    for year in range(first_day.year, today.year):
+        archive_year(db, year, vacuum=True)
+    size_mb = os.path.getsize(db.db_name) / (1024 * 1024)
+    print(f"After archiving {first_day.year}-{today.year - 1}: hot database {size_mb:.1f} MB")
+    print(f"  Current-month report: {month_report_ms():.2f} ms")
+
+    conn = db.get_connection()
+    started = time.perf_counter()
+    sources = report_sources(conn, first_day.isoformat(), month_end)
+    count = conn.execute(f"SELECT COUNT(*) FROM {sources['sales']} WHERE sale_date BETWEEN ? AND ?",
+                         (first_day.isoformat(), month_end)).fetchone()[0]
+    print(f"  Full-history count through archives: {count} rows in "
+          f"{(time.perf_counter() - started) * 1000:.2f} ms")
+    conn.close()
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed years of sales and purchases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_cmd = commands.add_parser("archive", help="move one closed year into sales_YYYY.db")
+    archive_cmd.add_argument("year", type=int)
+    archive_cmd.add_argument("--vacuum", action="store_true", help="shrink the hot database afterwards")
+    commands.add_parser("list", help="show archived years")
+    bench_cmd = commands.add_parser("bench", help="benchmark current-month reports against history size")
+    bench_cmd.add_argument("--years", type=int, default=5)
+    bench_cmd.add_argument("--per-day", type=int, default=100)
+    args = parser.parse_args()
+
+    db = Database()
+    if args.command == "archive":
+        moved = archive_year(db, args.year, vacuum=args.vacuum)
+        print(f"Archived {args.year}: {moved['sales']} sales, {moved['purchases']} purchases "
+              f"-> {archive_path(db, args.year)}")
+    elif args.command == "list":
+        for year, path, sales_rows, purchase_rows, archived_at in list_archives(db):
+            print(f"{year}: {sales_rows} sales, {purchase_rows} purchases in {path} (archived {archived_at})")
+    else:
+        benchmark(args.years, args.per_day)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from modules.database import Database
+
+
+def default_backup_dir(db):
+    return os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "backups")
+
+
+def run_backup(db=None, backup_dir=None, pages=64, step_sleep=0.005, compress=False,
+               keep=7, write_queue=None):
+    """Copy the live database with the SQLite online backup API.
+
+    Pages are copied in small batches with a sleep between steps, so the
+    writer only ever waits for one short step. The copy is checked with
+    PRAGMA integrity_check before it is (optionally) gzipped and old
+    backups beyond `keep` are removed. Returns a stats dict.
+    """
+    db = db or Database()
+    backup_dir = backup_dir or default_backup_dir(db)
+    os.makedirs(backup_dir, exist_ok=True)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    base_name = os.path.splitext(os.path.basename(db.db_name))[0]
+    path = os.path.join(backup_dir, f"{base_name}_{stamp}.db")
+    suffix = 1
+    while glob.glob(path + "*"):
+        path = os.path.join(backup_dir, f"{base_name}_{stamp}_{suffix}.db")
+        suffix += 1
+
+    writer_before = write_queue.metrics() if write_queue else None
+    steps = [0]
+
+    def progress(status, remaining, total):
+        steps[0] += 1
+        if remaining:
+            time.sleep(step_sleep)
+
+    started = time.perf_counter()
+    src = db.get_connection()
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst, pages=pages, progress=progress)
+    finally:
+        src.close()
+    copy_seconds = time.perf_counter() - started
+
+    integrity = dst.execute("PRAGMA integrity_check").fetchone()[0]
+    dst.close()
+    if integrity != "ok":
+        os.remove(path)
+        raise sqlite3.DatabaseError(f"Backup failed integrity check: {integrity}")
+
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    if compress:
+        with open(path, 'rb') as f_in, gzip.open(path + ".gz", 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(path)
+        path += ".gz"
+
+    stats = {
+        'path': path,
+        'size_mb': size_mb,
+        'seconds': copy_seconds,
+        'mb_per_s': size_mb / copy_seconds if copy_seconds else 0.0,
+        'steps': steps[0],
+        'integrity': integrity,
+        'removed': rotate_backups(backup_dir, base_name, keep),
+    }
+
+    # How much the backup slowed down sales committed while it ran
+    if writer_before:
+        writer_after = write_queue.metrics()
+        commits = writer_after['commits'] - writer_before['commits']
+        commit_ms = writer_after['total_commit_ms'] - writer_before['total_commit_ms']
+        stats['writer_commits_during'] = commits
+        stats['writer_avg_commit_ms_during'] = commit_ms / commits if commits else 0.0
+        stats['writer_avg_commit_ms_before'] = writer_before['avg_commit_ms']
+
+    return stats
+
+
+def rotate_backups(backup_dir, base_name, keep):
+    """Delete all but the newest `keep` backups; returns the removed paths"""
+    backups = sorted(glob.glob(os.path.join(backup_dir, f"{base_name}_*.db*")))
+    removed = backups[:-keep] if keep and len(backups) > keep else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def format_stats(stats):
+    lines = [
+        f"Backup written to {stats['path']}",
+        f"  {stats['size_mb']:.2f} MB in {stats['seconds']:.2f}s "
+        f"({stats['mb_per_s']:.2f} MB/s, {stats['steps']} steps), integrity: {stats['integrity']}",
+    ]
+    if 'writer_commits_during' in stats:
+        lines.append(f"  Sale/purchase commits during backup: {stats['writer_commits_during']}, "
+                     f"avg {stats['writer_avg_commit_ms_during']:.2f} ms "
+                     f"(before: {stats['writer_avg_commit_ms_before']:.2f} ms)")
+    if stats['removed']:
+        lines.append(f"  Rotated out {len(stats['removed'])} old backup(s)")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up the inventory database while it is in use")
+    parser.add_argument("--dir", help="backup folder (default: backups/ next to the database)")
+    parser.add_argument("--pages", type=int, default=64, help="pages copied per step")
+    parser.add_argument("--sleep", type=float, default=0.005, help="seconds to pause between steps")
+    parser.add_argument("--compress", action="store_true", help="gzip the verified copy")
+    parser.add_argument("--keep", type=int, default=7, help="number of backups to keep")
+    args = parser.parse_args()
+
+    stats = run_backup(backup_dir=args.dir, pages=args.pages, step_sleep=args.sleep,
+                       compress=args.compress, keep=args.keep)
+    print(format_stats(stats))
+
+
+if __name__ == '__main__':
+    main()
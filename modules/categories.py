@@ -0,0 +1,161 @@
+import argparse
+from datetime import date
+from modules.archive import report_sources
+from modules.database import Database
+from modules.party_store import display_name, normalize_name
+from modules.queries import CATEGORY_SALES, CATEGORY_STOCK
+
+SEPARATOR = " > "  # between levels of a category's full name, e.g. "Marlboro > Lights"
+# Between levels of name_key. Normalised names never contain a tab and it sorts
+# before every character they can hold, so ORDER BY name_key is tree order.
+KEY_SEPARATOR = "\t"
+
+
+def split_path(path):
+    """Category ids from the root down, from a materialised path like '/3/17/'"""
+    return [int(part) for part in (path or "").strip("/").split("/") if part]
+
+
+def parse_category(text):
+    """Level names from 'Brand > Type' text, tidied; empty levels dropped"""
+    return [display_name(part) for part in (text or "").split(">") if display_name(part)]
+
+
+def category_key(levels):
+    return KEY_SEPARATOR.join(normalize_name(level) for level in levels)
+
+
+def resolve_category(cursor, text):
+    """Return (id, path, full name) for 'Brand > Type', creating missing levels.
+
+    Levels are matched on their normalised names, so 'marlboro > lights'
+    finds 'Marlboro > Lights' and keeps the first spelling. Returns None
+    for blank text.
+    """
+    levels = parse_category(text)
+    if not levels:
+        return None
+
+    parent_id, path, full_name = None, "/", ""
+    for depth, name in enumerate(levels):
+        key = category_key(levels[:depth + 1])
+        cursor.execute("SELECT id, path, full_name FROM categories WHERE name_key = ?", (key,))
+        row = cursor.fetchone()
+        if row:
+            parent_id, path, full_name = row
+            continue
+
+        full_name = f"{full_name}{SEPARATOR}{name}" if full_name else name
+        cursor.execute("""
+            INSERT INTO categories (parent_id, name, full_name, name_key, depth)
+            VALUES (?, ?, ?, ?, ?)
+        """, (parent_id, name, full_name, key, depth))
+        parent_id = cursor.lastrowid
+        path = f"{path}{parent_id}/"
+        cursor.execute("UPDATE categories SET path = ? WHERE id = ?", (path, parent_id))
+        cursor.execute("INSERT INTO category_stock (category_id) VALUES (?)", (parent_id,))
+    return parent_id, path, full_name
+
+
+def add_category_sales(cursor, path, day, sales_count, units, revenue):
+    """Add to a category's daily sales roll-up and every ancestor's"""
+    cursor.executemany("""
+        INSERT INTO category_sales (category_id, day, sales_count, units, revenue)
+        VALUES (?, substr(?, 1, 10), ?, ?, ?)
+        ON CONFLICT (day, category_id) DO UPDATE SET
+            sales_count = sales_count + excluded.sales_count,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue
+    """, [(category_id, day, sales_count, units, revenue) for category_id in split_path(path)])
+
+
+def move_product(cursor, product_id, category):
+    """Put a product in `category` (a resolve_category result, or None).
+
+    The product's sales history, archived years included, moves from the
+    old category's roll-up to the new one in one grouped pass over its
+    sales; the stock roll-up follows through the products triggers.
+    """
+    cursor.execute("""
+        SELECT p.category_id, c.path FROM products p
+        LEFT JOIN categories c ON c.id = p.category_id
+        WHERE p.id = ?
+    """, (product_id,))
+    old_id, old_path = cursor.fetchone()
+    new_id, new_path, full_name = category or (None, None, None)
+    if old_id == new_id:
+        return
+
+    sales = report_sources(cursor.connection, "0001-01-01", date.today().isoformat())['sales']
+    cursor.execute(f"""
+        SELECT substr(sale_date, 1, 10), COUNT(*), SUM(quantity), SUM(total_amount)
+        FROM {sales} WHERE product_id = ?
+        GROUP BY substr(sale_date, 1, 10)
+    """, (product_id,))
+    history = cursor.fetchall()
+    for day, sales_count, units, revenue in history:
+        if old_path:
+            add_category_sales(cursor, old_path, day, -sales_count, -units, -revenue)
+        if new_path:
+            add_category_sales(cursor, new_path, day, sales_count, units, revenue)
+    if old_path and history:
+        cursor.execute("DELETE FROM category_sales WHERE sales_count <= 0")
+
+    cursor.execute("UPDATE products SET category_id = ?, category = ? WHERE id = ?",
+                   (new_id, full_name, product_id))
+
+
+def category_names(conn):
+    """Every category's full name, parents before their children"""
+    return [name for name, in conn.execute("SELECT full_name FROM categories ORDER BY name_key")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Product categories (brand > type) and their roll-ups")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show the category tree with stock and product counts")
+    add_cmd = commands.add_parser("add", help="create a category, e.g. 'Marlboro > Lights'")
+    add_cmd.add_argument("category")
+    assign_cmd = commands.add_parser("assign", help="put a product in a category ('' for none)")
+    assign_cmd.add_argument("product")
+    assign_cmd.add_argument("category")
+    sales_cmd = commands.add_parser("sales", help="sales per category over a date range")
+    sales_cmd.add_argument("--from", dest="from_date", default=date.today().replace(day=1).isoformat())
+    sales_cmd.add_argument("--to", dest="to_date", default=date.today().isoformat())
+    commands.add_parser("rebuild", help="recompute both roll-ups from products and sales")
+    args = parser.parse_args()
+
+    db = Database()
+    db.init_database()
+    conn = db.get_connection()
+    try:
+        if args.command == "list":
+            for full_name, depth, products, units, value in conn.execute(CATEGORY_STOCK):
+                print(f"{'  ' * depth}{full_name.split(SEPARATOR)[-1]:<30} {products:>6} products "
+                      f"{units:>8} units  Rs.{value:,.2f}")
+        elif args.command == "add":
+            category = resolve_category(conn.cursor(), args.category)
+            print(f"Category #{category[0]}: {category[2]}" if category else "Nothing to add")
+        elif args.command == "assign":
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM products WHERE name = ?", (args.product,))
+            row = cursor.fetchone()
+            if not row:
+                parser.error(f"Unknown product: {args.product}")
+            move_product(cursor, row[0], resolve_category(cursor, args.category))
+            print(f"{args.product}: {args.category or 'no category'}")
+        elif args.command == "sales":
+            for full_name, depth, count, units, revenue in conn.execute(CATEGORY_SALES,
+                                                                        (args.from_date, args.to_date)):
+                print(f"{'  ' * depth}{full_name.split(SEPARATOR)[-1]:<30} {count:>6} sales "
+                      f"{units:>8} units  Rs.{revenue:,.2f}")
+        else:
+            db.rebuild_category_aggregates(conn.cursor())
+            print("Category roll-ups rebuilt")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
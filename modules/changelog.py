@@ -0,0 +1,67 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+# Fields of each write command that are shipped to other terminals; the
+# remote side replays them through the same record_* function
+REPLICATED_FIELDS = {
+    'sale': ('txn_id', 'product_name', 'customer_name', 'quantity', 'unit_price', 'payment_type', 'sale_date'),
+    'purchase': ('product_name', 'barcode', 'supplier', 'quantity', 'unit_cost', 'payment_type', 'purchase_date',
+                 'category', 'batch_code', 'expiry_date'),
+    'payment': ('customer_name', 'amount', 'payment_type', 'payment_date', 'note'),
+    'supplier_payment': ('supplier', 'amount', 'payment_type', 'payment_date', 'note'),
+}
+
+
+def node_id(cursor):
+    """This database's replication origin id, created on first use"""
+    cursor.execute("SELECT value FROM sync_state WHERE key = 'node_id'")
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    node = uuid.uuid4().hex[:12]
+    cursor.execute("INSERT INTO sync_state (key, value) VALUES ('node_id', ?)", (node,))
+    return node
+
+
+def get_state(cursor, key, default=None):
+    cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else default
+
+
+def set_state(cursor, key, value):
+    cursor.execute("""
+        INSERT INTO sync_state (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    """, (key, str(value)))
+
+
+def log_change(cursor, kind, data, product=None):
+    """Append one committed write to the changelog inside the caller's transaction.
+
+    Local writes get a new change id under this node's origin. Changes
+    applied from another terminal carry data['change'] = {'change_id',
+    'origin', 'created_at'} and are logged under that origin instead, which
+    both de-duplicates them and keeps them from being shipped back.
+    Returns False when the change was already logged.
+    """
+    remote = data.get('change')
+    if remote:
+        change_id, origin, created_at = remote['change_id'], remote['origin'], remote['created_at']
+    else:
+        origin = node_id(cursor)
+        change_id = f"{origin}:{uuid.uuid4().hex[:12]}"
+        created_at = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+
+    payload = {field: data.get(field) for field in REPLICATED_FIELDS[kind] if data.get(field) is not None}
+    cursor.execute("""
+        INSERT OR IGNORE INTO changelog (change_id, origin, kind, product, payload, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (change_id, origin, kind, product, json.dumps(payload, separators=(',', ':')), created_at))
+    return cursor.rowcount > 0
+
+
+def is_logged(cursor, change_id):
+    cursor.execute("SELECT 1 FROM changelog WHERE change_id = ?", (change_id,))
+    return cursor.fetchone() is not None
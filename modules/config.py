@@ -0,0 +1,88 @@
+import configparser
+import os
+import sys
+
+DEFAULT_DB_NAME = "tobacco_inventory.db"
+CONFIG_NAME = "tobacco_inventory.ini"
+
+# Connection string of the RAM-backed database; every connection in the
+# process opening this URI shares the same memory image (memdb VFS)
+MEMORY_URI = "file:/tobacco_inventory?vfs=memdb"
+
+
+class Settings:
+    """Where the database lives and how it is opened.
+
+    db_path is the file on disk (also the persistence target in memory
+    mode), or ":memory:" for a throwaway database that never touches disk.
+    """
+
+    def __init__(self, db_path, in_memory=False, persist_interval=60):
+        self.db_path = db_path
+        self.in_memory = in_memory or db_path == ":memory:"
+        self.persist_interval = persist_interval
+
+    @property
+    def persistent(self):
+        return self.db_path != ":memory:"
+
+
+def app_dir():
+    """Folder of the executable (PyInstaller build) or of the source checkout"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_config_file(path=None, section="database"):
+    """One section of the config file as a dict, or {} when there is none"""
+    path = path or os.environ.get("TOBACCO_CONFIG") or os.path.join(app_dir(), CONFIG_NAME)
+    parser = configparser.ConfigParser()
+    if not parser.read(path, encoding="utf-8") or not parser.has_section(section):
+        return {}
+    return dict(parser.items(section))
+
+
+def resolve_settings(db=None, data_dir=None, memory=None, config_path=None):
+    """Combine CLI values, environment and config file; earlier sources win.
+
+    CLI flags (--db, --data-dir, --memory) > TOBACCO_DB / TOBACCO_DATA_DIR /
+    TOBACCO_DB_MODE > [database] path / data_dir / mode in the config file >
+    tobacco_inventory.db next to the application.
+    """
+    config = read_config_file(config_path)
+    env = os.environ
+
+    db = db or env.get("TOBACCO_DB") or config.get("path")
+    data_dir = data_dir or env.get("TOBACCO_DATA_DIR") or config.get("data_dir") or app_dir()
+    if memory is None:
+        memory = (env.get("TOBACCO_DB_MODE") or config.get("mode", "disk")).lower() == "memory"
+    interval = int(env.get("TOBACCO_PERSIST_INTERVAL") or config.get("persist_interval", 60))
+
+    if db != ":memory:":
+        db = os.path.abspath(os.path.join(os.path.expanduser(data_dir), db or DEFAULT_DB_NAME))
+    return Settings(db, memory, interval)
+
+
+_settings = None
+
+
+def configure(**options):
+    """Fix the process-wide settings (call before the first Database())"""
+    global _settings
+    _settings = resolve_settings(**options)
+    return _settings
+
+
+def get_settings():
+    if _settings is None:
+        configure()
+    return _settings
+
+
+def add_arguments(parser):
+    """Add --db / --data-dir / --memory to an argparse parser"""
+    parser.add_argument("--db", help="database file, or :memory: for a throwaway in-memory database")
+    parser.add_argument("--data-dir", help="folder holding the database (default: next to the application)")
+    parser.add_argument("--memory", action="store_true", default=None,
+                        help="run from RAM, persisting to the database file periodically and at exit")
@@ -1,46 +1,38 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QPushButton, QGridLayout, QFrame)
-from PyQt5.QtCore import Qt
+                             QPushButton, QGridLayout, QFrame, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
+from modules.database import Database
+from modules.events import change_bus
+from modules.kpi import KpiCounters
 from modules.purchase import PurchaseWindow
 from modules.sale import SaleWindow
 from modules.inventory import InventoryWindow
 from modules.reports import ReportsWindow
+from modules.payment import PaymentWindow
+from modules.profiling import profiling_app
+from modules.windows import get_window_manager
 
 class DashboardWindow(QWidget):
     def __init__(self, user_data):
         super().__init__()
         self.user_data = user_data
+        self.windows = get_window_manager()
+        self.kpi = KpiCounters(Database())
         self.init_ui()
+        
+        # Live tiles: adjust on every committed write, reconcile periodically
+        change_bus.sale_recorded.connect(self.on_sale_recorded)
+        change_bus.products_changed.connect(self.on_products_changed)
+        self.reconcile_timer = QTimer(self)
+        self.reconcile_timer.timeout.connect(self.reconcile_kpis)
+        self.reconcile_timer.start(60 * 1000)
+        self.reconcile_kpis()
     
     def init_ui(self):
         self.setWindowTitle("Tobacco Inventory - Dashboard")
-        self.setFixedSize(800, 600)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: Arial, sans-serif;
-            }
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                padding: 15px;
-                border: none;
-                border-radius: 10px;
-                font-size: 16px;
-                font-weight: bold;
-                min-height: 80px;
-                min-width: 150px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QFrame {
-                background-color: white;
-                border-radius: 10px;
-                padding: 20px;
-            }
-        """)
+        self.setFixedSize(800, 870)
+        self.setObjectName("DashboardWindow")
         
         main_layout = QVBoxLayout()
         main_layout.setSpacing(20)
@@ -50,7 +42,28 @@ class DashboardWindow(QWidget):
         header = QLabel(f"Welcome, {self.user_data[1]}! 👋")
         header.setAlignment(Qt.AlignCenter)
         header.setFont(QFont("Arial", 20, QFont.Bold))
-        header.setStyleSheet("color: #2c3e50; margin-bottom: 20px;")
+        header.setObjectName("header")
+        
+        # KPI tiles
+        tiles_frame = QFrame()
+        tiles_layout = QHBoxLayout(tiles_frame)
+        tiles_layout.setSpacing(15)
+        
+        self.tiles = {}
+        tiles = [
+            ("revenue", "Today's Revenue"),
+            ("units", "Units Sold Today"),
+            ("stock_value", "Stock Value"),
+            ("low_stock", "Low Stock Items"),
+        ]
+        
+        for key, caption in tiles:
+            tile = QLabel()
+            tile.setAlignment(Qt.AlignCenter)
+            tile.setObjectName(f"tile_{key}")
+            tile.setProperty("caption", caption)
+            self.tiles[key] = tile
+            tiles_layout.addWidget(tile)
         
         # Menu buttons
         menu_frame = QFrame()
@@ -59,51 +72,76 @@ class DashboardWindow(QWidget):
         
         # Create buttons
         buttons = [
-            ("📦 Purchase Entry", self.open_purchase, "#e74c3c"),
-            ("💰 Sale Entry", self.open_sale, "#27ae60"),
-            ("📋 Inventory", self.open_inventory, "#9b59b6"),
-            ("📊 Reports", self.open_reports, "#f39c12"),
+            ("purchase", "📦 Purchase Entry", self.open_purchase),
+            ("sale", "💰 Sale Entry", self.open_sale),
+            ("inventory", "📋 Inventory", self.open_inventory),
+            ("reports", "📊 Reports", self.open_reports),
+            ("payment", "💳 Receive Payment", self.open_payment),
+            ("supplier_payment", "🧾 Pay Supplier", self.open_supplier_payment),
         ]
         
-        for i, (text, handler, color) in enumerate(buttons):
+        for i, (key, text, handler) in enumerate(buttons):
             btn = QPushButton(text)
             btn.clicked.connect(handler)
-            btn.setStyleSheet(f"""
-                QPushButton {{
-                    background-color: {color};
-                    color: white;
-                    padding: 20px;
-                    border: none;
-                    border-radius: 10px;
-                    font-size: 16px;
-                    font-weight: bold;
-                    min-height: 100px;
-                    min-width: 180px;
-                }}
-                QPushButton:hover {{
-                    background-color: {color}dd;
-                }}
-            """)
+            btn.setObjectName(f"menu_{key}")
             row, col = i // 2, i % 2
             menu_layout.addWidget(btn, row, col)
         
         main_layout.addWidget(header)
+        main_layout.addWidget(tiles_frame)
         main_layout.addWidget(menu_frame)
         
+        # Admins can profile every click from here (python -m modules.profiling summarises)
+        app = profiling_app()
+        if self.user_data[3] == 'admin' and app is not None:
+            profile_toggle = QCheckBox("Profile UI actions")
+            profile_toggle.setObjectName("profileToggle")
+            profile_toggle.setChecked(app.profiler is not None)
+            profile_toggle.toggled.connect(app.set_profiling)
+            main_layout.addWidget(profile_toggle, alignment=Qt.AlignRight)
+        
         self.setLayout(main_layout)
     
+    def reconcile_kpis(self):
+        """Re-read the KPI counters from the database"""
+        try:
+            self.kpi.reconcile()
+        except Exception as e:
+            print(f"Error reconciling dashboard figures: {e}")
+        self.update_tiles()
+    
+    def on_sale_recorded(self, sale):
+        self.kpi.apply_sale(sale)
+        self.update_tiles()
+    
+    def on_products_changed(self, changes):
+        self.kpi.apply_product_changes(changes)
+        self.update_tiles()
+    
+    def update_tiles(self):
+        values = {
+            "revenue": f"Rs.{self.kpi.revenue_today:.2f}",
+            "units": str(self.kpi.units_today),
+            "stock_value": f"Rs.{self.kpi.stock_value:.2f}",
+            "low_stock": str(self.kpi.low_stock),
+        }
+        for key, tile in self.tiles.items():
+            tile.setText(f"{tile.property('caption')}<br><b style='font-size: 18px;'>{values[key]}</b>")
+    
     def open_purchase(self):
-        self.pur_win = PurchaseWindow()
-        self.pur_win.show()
+        self.windows.open(PurchaseWindow)
     
     def open_sale(self):
-        self.sale_win = SaleWindow()
-        self.sale_win.show()
+        self.windows.open(SaleWindow)
     
     def open_inventory(self):
-        self.inv_win = InventoryWindow()
-        self.inv_win.show()
+        self.windows.open(InventoryWindow)
     
     def open_reports(self):
-        self.rep_win = ReportsWindow()
-        self.rep_win.show()
+        self.windows.open(ReportsWindow)
+    
+    def open_payment(self):
+        self.windows.open(PaymentWindow, 'customers')
+    
+    def open_supplier_payment(self):
+        self.windows.open(PaymentWindow, 'suppliers')
@@ -1,15 +1,43 @@
+import os
 import sqlite3
-from datetime import datetime
+import tempfile
+from datetime import date, datetime
+from modules.config import MEMORY_URI, get_settings
+from modules.memstore import get_memory_store
+from modules.party_store import display_name, migrate_parties, normalize_name
+
+# Every category paired with itself and each of its ancestors, for use after
+# WITH RECURSIVE; roll-ups join products to it to count them at every level
+CATEGORY_LINEAGE = '''
+    lineage (category_id, ancestor_id) AS (
+        SELECT id, id FROM categories
+        UNION ALL
+        SELECT l.category_id, c.parent_id FROM lineage l JOIN categories c ON c.id = l.ancestor_id
+        WHERE c.parent_id IS NOT NULL
+    )
+'''
+
+NO_EXPIRY = '9999-12-31'  # expiry stored for lots without a shelf life, so they sort after every dated lot
 
 class Database:
-    def __init__(self):
-        self.db_name = "tobacco_inventory.db"
+    def __init__(self, db_name=None):
+        # Without an explicit file, use the configured location and mode
+        settings = get_settings()
+        self.in_memory = db_name is None and settings.in_memory
+        self.db_name = db_name or settings.db_path
+        if self.db_name == ":memory:":
+            self.journal_path = os.path.join(tempfile.gettempdir(), f"tobacco_{os.getpid()}_sales.journal")
+        else:
+            self.journal_path = os.path.splitext(self.db_name)[0] + "_sales.journal"
     
     def init_database(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
+        # WAL lets windows keep reading while the background writer commits
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         # Products table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS products (
@@ -52,6 +80,367 @@ class Database:
             )
         ''')
         
+        # Barcode / EAN lookup for scanner entry
+        self.add_column(cursor, 'products', 'barcode', 'TEXT')
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_barcode ON products (barcode)")
+        
+        # Client-generated transaction ids make journal replay idempotent
+        self.add_column(cursor, 'sales', 'txn_id', 'TEXT')
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_txn ON sales (txn_id)")
+        
+        # Date indexes used by dashboard and report range queries
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (sale_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases (purchase_date)")
+        
+        # Covering indexes for the per-product stock reconciliation pass
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_product ON sales (product_id, quantity)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchases_product ON purchases (product_id, quantity)")
+        
+        # Customer and supplier dimensions keyed by normalised name
+        for table in ('customers', 'suppliers'):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        self.add_column(cursor, 'sales', 'customer_id', 'INTEGER REFERENCES customers (id)')
+        self.add_column(cursor, 'purchases', 'supplier_id', 'INTEGER REFERENCES suppliers (id)')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales (customer_id, sale_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchases_supplier ON purchases (supplier_id, purchase_date)")
+        migrate_parties(cursor)
+        
+        # Receivables: running balance per customer plus the payments against it
+        if self.add_column(cursor, 'customers', 'balance', 'REAL DEFAULT 0'):
+            cursor.execute('''
+                UPDATE customers SET balance = (
+                    SELECT COALESCE(SUM(total_amount), 0) FROM sales
+                    WHERE customer_id = customers.id AND payment_type = 'Credit'
+                )
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS customer_payments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                payment_type TEXT,
+                payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                note TEXT,
+                FOREIGN KEY (customer_id) REFERENCES customers (id)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_payments ON customer_payments (customer_id, payment_date)")
+        
+        # Aging reads only credit sales, straight from this index
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_sales_credit ON sales (customer_id, sale_date, total_amount)
+            WHERE payment_type = 'Credit'
+        ''')
+        
+        # Payables: what we owe each supplier and the payments made to them
+        if self.add_column(cursor, 'suppliers', 'balance', 'REAL DEFAULT 0'):
+            cursor.execute('''
+                UPDATE suppliers SET balance = (
+                    SELECT COALESCE(SUM(total_cost), 0) FROM purchases
+                    WHERE supplier_id = suppliers.id AND payment_type = 'Credit'
+                )
+            ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS supplier_payments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                supplier_id INTEGER NOT NULL,
+                amount REAL NOT NULL,
+                payment_type TEXT,
+                payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                note TEXT,
+                FOREIGN KEY (supplier_id) REFERENCES suppliers (id)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_supplier_payments ON supplier_payments (supplier_id, payment_date)")
+        
+        # Per (supplier, product) purchase totals and last cost, kept by record_purchase
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='supplier_product_costs'")
+        backfill_costs = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS supplier_product_costs (
+                supplier_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                purchase_count INTEGER DEFAULT 0,
+                quantity INTEGER DEFAULT 0,
+                total_cost REAL DEFAULT 0,
+                last_cost REAL,
+                last_purchase_date TIMESTAMP,
+                PRIMARY KEY (supplier_id, product_id)
+            )
+        ''')
+        if backfill_costs:
+            self.rebuild_supplier_costs(cursor)
+        
+        # Per-day sales totals maintained by record_sale; charts bin these
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='daily_sales'")
+        backfill_daily = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_sales (
+                day TEXT PRIMARY KEY,
+                sales_count INTEGER DEFAULT 0,
+                units INTEGER DEFAULT 0,
+                revenue REAL DEFAULT 0
+            )
+        ''')
+        if backfill_daily:
+            self.rebuild_daily_sales(cursor)
+        
+        # Replication: every recorded write, local or applied from another
+        # terminal, keyed by a globally unique change id
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                change_id TEXT NOT NULL UNIQUE,
+                origin TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                product TEXT,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_changelog_origin ON changelog (origin, seq)")
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_changelog_purchases ON changelog (product, created_at)
+            WHERE kind = 'purchase'
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Background maintenance jobs (see modules/jobs.py) and their run log
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                name TEXT PRIMARY KEY,
+                description TEXT,
+                interval_seconds INTEGER NOT NULL,
+                enabled INTEGER DEFAULT 1,
+                last_run TIMESTAMP,
+                last_status TEXT,
+                last_duration_ms REAL,
+                next_run TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                duration_ms REAL,
+                status TEXT,
+                detail TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_history ON job_history (started_at)")
+        
+        # Closed years moved out into sales_YYYY.db files
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archives (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                sales_rows INTEGER DEFAULT 0,
+                purchase_rows INTEGER DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Category tree (brand > type; products are the SKUs). path is the
+        # materialised id path from the root, e.g. '/3/17/', so a subtree is
+        # a prefix range and the ancestors are the ids in the path.
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='categories'")
+        backfill_categories = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                parent_id INTEGER REFERENCES categories (id),
+                name TEXT NOT NULL,
+                full_name TEXT NOT NULL,
+                name_key TEXT NOT NULL UNIQUE,
+                path TEXT NOT NULL DEFAULT '',
+                depth INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_path ON categories (path)")
+        self.add_column(cursor, 'products', 'category_id', 'INTEGER REFERENCES categories (id)')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id)")
+        
+        # Roll-ups per category, each product counted in its category and every
+        # ancestor: stock via the triggers below, sales by record_sale
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_stock (
+                category_id INTEGER PRIMARY KEY,
+                products INTEGER DEFAULT 0,
+                units INTEGER DEFAULT 0,
+                stock_value REAL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_sales (
+                category_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                sales_count INTEGER DEFAULT 0,
+                units INTEGER DEFAULT 0,
+                revenue REAL DEFAULT 0,
+                PRIMARY KEY (day, category_id)
+            )
+        ''')
+        
+        # Stock changes come from sales, purchases, replication and the stock
+        # audit, so the stock roll-up is kept by triggers rather than by each writer.
+        # A product counts in its category and each ancestor, found by walking up
+        # parent_id one primary-key lookup per level.
+        ancestors = '''
+            WITH RECURSIVE up (id) AS (
+                SELECT {row}.category_id
+                UNION ALL
+                SELECT c.parent_id FROM up JOIN categories c ON c.id = up.id WHERE c.parent_id IS NOT NULL
+            )
+            SELECT id FROM up
+        '''
+        # Databases created earlier carry triggers that matched every category's path prefix
+        cursor.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'trigger' AND name LIKE 'category_stock_%' AND sql LIKE '%substr(c.path%'
+        ''')
+        for name, in cursor.fetchall():
+            cursor.execute(f"DROP TRIGGER {name}")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS category_stock_insert AFTER INSERT ON products
+            WHEN new.category_id IS NOT NULL
+            BEGIN
+                UPDATE category_stock SET products = products + 1,
+                    units = units + COALESCE(new.stock_quantity, 0),
+                    stock_value = stock_value + COALESCE(new.stock_quantity, 0) * COALESCE(new.unit_price, 0)
+                WHERE category_id IN ({ancestors.format(row='new')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS category_stock_update
+            AFTER UPDATE OF stock_quantity, unit_price, category_id ON products
+            WHEN (old.category_id IS NOT NULL OR new.category_id IS NOT NULL)
+             AND (old.stock_quantity IS NOT new.stock_quantity OR old.unit_price IS NOT new.unit_price
+                  OR old.category_id IS NOT new.category_id)
+            BEGIN
+                UPDATE category_stock SET products = products - 1,
+                    units = units - COALESCE(old.stock_quantity, 0),
+                    stock_value = stock_value - COALESCE(old.stock_quantity, 0) * COALESCE(old.unit_price, 0)
+                WHERE category_id IN ({ancestors.format(row='old')});
+                UPDATE category_stock SET products = products + 1,
+                    units = units + COALESCE(new.stock_quantity, 0),
+                    stock_value = stock_value + COALESCE(new.stock_quantity, 0) * COALESCE(new.unit_price, 0)
+                WHERE category_id IN ({ancestors.format(row='new')});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS category_stock_delete AFTER DELETE ON products
+            WHEN old.category_id IS NOT NULL
+            BEGIN
+                UPDATE category_stock SET products = products - 1,
+                    units = units - COALESCE(old.stock_quantity, 0),
+                    stock_value = stock_value - COALESCE(old.stock_quantity, 0) * COALESCE(old.unit_price, 0)
+                WHERE category_id IN ({ancestors.format(row='old')});
+            END
+        ''')
+        if backfill_categories:
+            self.migrate_category_text(cursor)
+            self.rebuild_category_aggregates(cursor)
+        
+        # Stock lots: one per purchase, with batch code and expiry. Both
+        # indexes are partial so exhausted lots drop out: sales take the
+        # first row of idx_lots_fefo, the expiry report reads idx_lots_expiry
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='lots'")
+        backfill_lots = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL REFERENCES products (id),
+                purchase_id INTEGER REFERENCES purchases (id),
+                batch_code TEXT,
+                expiry_date TEXT NOT NULL,
+                quantity_received INTEGER NOT NULL,
+                quantity_remaining INTEGER NOT NULL,
+                unit_cost REAL,
+                received_date TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_lots_fefo ON lots (product_id, expiry_date, id)
+            WHERE quantity_remaining > 0
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_lots_expiry ON lots (expiry_date)
+            WHERE quantity_remaining > 0
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sale_lots (
+                sale_id INTEGER NOT NULL,
+                lot_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL,
+                PRIMARY KEY (sale_id, lot_id)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sale_lots_lot ON sale_lots (lot_id)")
+        if backfill_lots:
+            self.open_stock_lots(cursor)
+        
+        # Change tracking for products: every insert or update stamps the row
+        # with the next value of a shared counter, and deletes leave a
+        # tombstone, so a view can ask for just what changed since it last looked
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS revisions (
+                name TEXT PRIMARY KEY,
+                revision INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO revisions (name, revision) VALUES ('products', 0)")
+        self.add_column(cursor, 'products', 'revision', 'INTEGER NOT NULL DEFAULT 0')
+        self.add_column(cursor, 'products', 'updated_at', 'TIMESTAMP')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_revision ON products (revision)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS product_tombstones (
+                product_id INTEGER PRIMARY KEY,
+                revision INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_tombstones_revision ON product_tombstones (revision)")
+        stamp = '''
+                UPDATE revisions SET revision = revision + 1 WHERE name = 'products';
+                UPDATE products SET revision = (SELECT revision FROM revisions WHERE name = 'products'),
+                                    updated_at = datetime('now', 'localtime')
+                WHERE id = new.id;
+        '''
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS products_revision_insert AFTER INSERT ON products
+            BEGIN
+                {stamp}
+            END
+        ''')
+        # The stamp itself changes revision, so it does not trigger another one
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS products_revision_update AFTER UPDATE ON products
+            WHEN new.revision IS old.revision
+            BEGIN
+                {stamp}
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS products_revision_delete AFTER DELETE ON products
+            BEGIN
+                UPDATE revisions SET revision = revision + 1 WHERE name = 'products';
+                INSERT OR REPLACE INTO product_tombstones (product_id, revision)
+                SELECT old.id, revision FROM revisions WHERE name = 'products';
+            END
+        ''')
+        
         # Users table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -71,5 +460,106 @@ class Database:
         conn.commit()
         conn.close()
     
+    def sales_history(self, cursor):
+        """Sales source spanning the hot table and every archived year"""
+        # Imported here: modules.archive builds on this module
+        from modules.archive import report_sources
+        return report_sources(cursor.connection, "0001-01-01", date.today().isoformat())['sales']
+    
+    def rebuild_daily_sales(self, cursor):
+        """Recompute the daily_sales aggregate from all sales, archived years included"""
+        cursor.execute("DELETE FROM daily_sales")
+        cursor.execute(f'''
+            INSERT INTO daily_sales (day, sales_count, units, revenue)
+            SELECT substr(sale_date, 1, 10), COUNT(*), SUM(quantity), SUM(total_amount)
+            FROM {self.sales_history(cursor)}
+            GROUP BY substr(sale_date, 1, 10)
+        ''')
+    
+    def rebuild_supplier_costs(self, cursor):
+        """Recompute supplier_product_costs from the purchases table"""
+        cursor.execute("DELETE FROM supplier_product_costs")
+        cursor.execute('''
+            INSERT INTO supplier_product_costs
+                (supplier_id, product_id, purchase_count, quantity, total_cost, last_cost, last_purchase_date)
+            SELECT supplier_id, product_id, COUNT(*), SUM(quantity), SUM(total_cost),
+                   (SELECT unit_cost FROM purchases latest
+                    WHERE latest.supplier_id = p.supplier_id AND latest.product_id = p.product_id
+                    ORDER BY purchase_date DESC, id DESC LIMIT 1),
+                   MAX(purchase_date)
+            FROM purchases p
+            WHERE supplier_id IS NOT NULL
+            GROUP BY supplier_id, product_id
+        ''')
+    
+    def migrate_category_text(self, cursor):
+        """Turn free-text products.category values into top-level categories"""
+        cursor.execute("SELECT DISTINCT category FROM products WHERE category IS NOT NULL AND category_id IS NULL")
+        for name, in cursor.fetchall():
+            key = normalize_name(name)
+            if not key:
+                continue
+            cursor.execute("SELECT id FROM categories WHERE name_key = ?", (key,))
+            row = cursor.fetchone()
+            if row:
+                category_id = row[0]
+            else:
+                cursor.execute("INSERT INTO categories (name, full_name, name_key) VALUES (?, ?, ?)",
+                               (display_name(name), display_name(name), key))
+                category_id = cursor.lastrowid
+                cursor.execute("UPDATE categories SET path = ? WHERE id = ?", (f"/{category_id}/", category_id))
+            cursor.execute("UPDATE products SET category_id = ?, category = ? WHERE category = ?",
+                           (category_id, display_name(name), name))
+    
+    def open_stock_lots(self, cursor):
+        """Put stock received before lot tracking into one opening lot per product, without expiry"""
+        cursor.execute('''
+            INSERT INTO lots (product_id, expiry_date, quantity_received, quantity_remaining,
+                              unit_cost, received_date)
+            SELECT id, ?, stock_quantity, stock_quantity, unit_price, ?
+            FROM products WHERE stock_quantity > 0
+        ''', (NO_EXPIRY, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    
+    def rebuild_category_aggregates(self, cursor):
+        """Recompute category_stock and category_sales from products and all sales"""
+        cursor.execute("DELETE FROM category_stock")
+        cursor.execute(f'''
+            WITH RECURSIVE {CATEGORY_LINEAGE}
+            INSERT INTO category_stock (category_id, products, units, stock_value)
+            SELECT c.id, COUNT(p.id), COALESCE(SUM(p.stock_quantity), 0),
+                   COALESCE(SUM(COALESCE(p.stock_quantity, 0) * COALESCE(p.unit_price, 0)), 0)
+            FROM categories c
+            JOIN lineage g ON g.ancestor_id = c.id
+            LEFT JOIN products p ON p.category_id = g.category_id
+            GROUP BY c.id
+        ''')
+        # Sales are grouped per leaf category and day before being spread to ancestors
+        cursor.execute("DELETE FROM category_sales")
+        cursor.execute(f'''
+            WITH RECURSIVE {CATEGORY_LINEAGE},
+            leaf AS (
+                SELECT p.category_id, substr(s.sale_date, 1, 10) AS day, COUNT(*) AS sales_count,
+                       SUM(s.quantity) AS units, SUM(s.total_amount) AS revenue
+                FROM {self.sales_history(cursor)} s JOIN products p ON p.id = s.product_id
+                WHERE p.category_id IS NOT NULL
+                GROUP BY p.category_id, substr(s.sale_date, 1, 10)
+            )
+            INSERT INTO category_sales (category_id, day, sales_count, units, revenue)
+            SELECT g.ancestor_id, l.day, SUM(l.sales_count), SUM(l.units), SUM(l.revenue)
+            FROM leaf l JOIN lineage g ON g.category_id = l.category_id
+            GROUP BY g.ancestor_id, l.day
+        ''')
+    
+    def add_column(self, cursor, table, column, definition):
+        """Add a column to an existing table if it is missing; True when added"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column in [row[1] for row in cursor.fetchall()]:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
\ No newline at end of file
+        if self.in_memory:
+            get_memory_store()  # loads the file into RAM on first use
+            return sqlite3.connect(MEMORY_URI, uri=True, timeout=30)
+        return sqlite3.connect(self.db_name, timeout=30)
\ No newline at end of file
@@ -0,0 +1,13 @@
+def product_change(product_id, name, stock_quantity, stock_delta, unit_price,
+                   previous_unit_price=None, created=False, barcode=None):
+    """Build the payload describing one product row after a write"""
+    return {
+        'product_id': product_id,
+        'name': name,
+        'stock_quantity': stock_quantity,
+        'stock_delta': stock_delta,
+        'unit_price': unit_price,
+        'previous_unit_price': unit_price if previous_unit_price is None else previous_unit_price,
+        'created': created,
+        'barcode': barcode,
+    }
@@ -0,0 +1,41 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class ChangeBus(QObject):
+    """Application-wide publish/subscribe hub for committed data changes.
+
+    Write paths emit after their transaction commits; open windows connect
+    to the signals and patch only the rows that changed instead of
+    re-querying whole tables.
+    """
+
+    # List of product change dicts (see event_payloads.product_change)
+    products_changed = pyqtSignal(list)
+    # Committed sale / purchase record dicts
+    sale_recorded = pyqtSignal(dict)
+    purchase_recorded = pyqtSignal(dict)
+    # Committed customer / supplier payment record dicts
+    payment_recorded = pyqtSignal(dict)
+    supplier_payment_recorded = pyqtSignal(dict)
+
+
+class CallbackRelay(QObject):
+    """Runs callbacks from worker threads on the GUI thread"""
+
+    deliver = pyqtSignal(object, object, object)
+
+    def __init__(self):
+        super().__init__()
+        self.deliver.connect(self.call)
+
+    def call(self, callback, result, error):
+        callback(result, error)
+
+
+def gui_callback(callback):
+    """Wrap callback(result, error) so it is invoked on the GUI thread"""
+    return lambda result, error: _relay.deliver.emit(callback, result, error)
+
+
+change_bus = ChangeBus()
+_relay = CallbackRelay()
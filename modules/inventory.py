@@ -4,55 +4,28 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor
 from modules.database import Database
+from modules.events import change_bus
+from bisect import bisect_left
 
 class InventoryWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.db = Database()
+        self.row_names = []
+        self.names = {}
+        self.row_values = {}
+        self.revision = 0  # products.revision the table is current up to
+        self.stats = {'total_products': 0, 'total_value': 0, 'out_of_stock': 0, 'low_stock': 0}
         self.init_ui()
         self.load_inventory()
+        
+        # Keep the table current without reloading every row
+        change_bus.products_changed.connect(self.on_products_changed)
     
     def init_ui(self):
         self.setWindowTitle("Inventory Management")
         self.setFixedSize(900, 650)  # Slightly larger for better view
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: Arial, sans-serif;
-            }
-            QTableWidget {
-                background-color: white;
-                border: 1px solid #bdc3c7;
-                gridline-color: #ecf0f1;
-                font-size: 14px;
-            }
-            QHeaderView::section {
-                background-color: #3498db;
-                color: white;
-                padding: 12px;
-                border: none;
-                font-weight: bold;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #2ecc71;
-                color: white;
-                padding: 12px 20px;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #27ae60;
-            }
-            QLineEdit {
-                padding: 10px;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                font-size: 14px;
-            }
-        """)
+        self.setObjectName("InventoryWindow")
         
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -60,7 +33,7 @@ class InventoryWindow(QWidget):
         
         # Title
         title = QLabel("📋 Current Inventory")
-        title.setStyleSheet("font-size: 20px; font-weight: bold; color: #2c3e50; margin-bottom: 10px;")
+        title.setObjectName("title")
         
         # Search and controls bar
         controls_layout = QHBoxLayout()
@@ -70,24 +43,11 @@ class InventoryWindow(QWidget):
         self.search_box.textChanged.connect(self.filter_inventory)
         
         refresh_btn = QPushButton("🔄 Refresh")
-        refresh_btn.clicked.connect(self.load_inventory)
+        refresh_btn.clicked.connect(self.refresh_inventory)
         
         export_btn = QPushButton("📊 Export")
         export_btn.clicked.connect(self.export_inventory)
-        export_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #9b59b6;
-                color: white;
-                padding: 12px 20px;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #8e44ad;
-            }
-        """)
+        export_btn.setObjectName("exportButton")
         
         controls_layout.addWidget(self.search_box)
         controls_layout.addWidget(refresh_btn)
@@ -113,14 +73,7 @@ class InventoryWindow(QWidget):
         
         # Summary label
         self.summary_label = QLabel()
-        self.summary_label.setStyleSheet("""
-            font-size: 14px; 
-            font-weight: bold; 
-            color: #2c3e50;
-            padding: 10px;
-            background-color: #ecf0f1;
-            border-radius: 5px;
-        """)
+        self.summary_label.setObjectName("summary")
         
         layout.addWidget(title)
         layout.addLayout(controls_layout)
@@ -129,13 +82,20 @@ class InventoryWindow(QWidget):
         
         self.setLayout(layout)
     
+    def reset(self):
+        """Rows are patched live by the change bus; pick up writes from other processes and clear the search"""
+        self.search_box.clear()
+        self.refresh_inventory()
+    
     def load_inventory(self):
         try:
             conn = self.db.get_connection()
             cursor = conn.cursor()
+            # Read the revision first: rows changed meanwhile are fetched again on refresh
+            cursor.execute("SELECT revision FROM revisions WHERE name = 'products'")
+            revision = cursor.fetchone()[0]
             cursor.execute("""
-                SELECT name, stock_quantity, unit_price, 
-                       (stock_quantity * unit_price) as total_value
+                SELECT id, name, stock_quantity, unit_price
                 FROM products 
                 ORDER BY name
             """)
@@ -144,57 +104,148 @@ class InventoryWindow(QWidget):
             
             self.table.setRowCount(len(products))
             
-            total_products = len(products)
-            total_value = 0
-            out_of_stock = 0
-            low_stock = 0
+            # Row bookkeeping used to patch single rows on change events
+            self.row_names = []
+            self.names = {}
+            self.row_values = {}
+            self.stats = {'total_products': 0, 'total_value': 0, 'out_of_stock': 0, 'low_stock': 0}
+            self.revision = revision
             
-            for row, (name, stock, price, total_value_item) in enumerate(products):
-                # Product name
-                self.table.setItem(row, 0, QTableWidgetItem(name))
-                
-                # Stock quantity
-                stock_item = QTableWidgetItem(str(stock))
-                stock_item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row, 1, stock_item)
-                
-                # Unit price
-                price_item = QTableWidgetItem(f"Rs.{price:.2f}")
-                price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.table.setItem(row, 2, price_item)
-                
-                # Total value
-                value_item = QTableWidgetItem(f"Rs.{total_value_item:.2f}")
-                value_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.table.setItem(row, 3, value_item)
-                
-                # Status based on stock level
-                if stock == 0:
-                    status = "Out of Stock"
-                    color = QColor("#e74c3c")  # Red
-                    out_of_stock += 1
-                elif stock < 10:
-                    status = "Low Stock"
-                    color = QColor("#f39c12")  # Orange
-                    low_stock += 1
-                else:
-                    status = "In Stock"
-                    color = QColor("#27ae60")  # Green
-                
-                status_item = QTableWidgetItem(status)
-                status_item.setTextAlignment(Qt.AlignCenter)
-                status_item.setForeground(QColor("white"))
-                status_item.setBackground(color)
-                self.table.setItem(row, 4, status_item)
-                
-                total_value += total_value_item
+            for row, (product_id, name, stock, price) in enumerate(products):
+                self.row_names.append(name)
+                self.names[product_id] = name
+                self.set_row(row, product_id, name, stock, price)
+                self.count_product(stock, price, 1)
             
             # Update summary
-            self.update_summary(total_products, total_value, out_of_stock, low_stock)
+            self.show_stats()
+            self.filter_inventory()
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load inventory: {str(e)}")
     
+    def refresh_inventory(self):
+        """Patch only the products added, changed or deleted since the last load or refresh"""
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT revision FROM revisions WHERE name = 'products'")
+            revision = cursor.fetchone()[0]
+            if revision == self.revision:
+                conn.close()
+                return
+            cursor.execute("""
+                SELECT id, name, stock_quantity, unit_price
+                FROM products
+                WHERE revision > ?
+                ORDER BY revision
+            """, (self.revision,))
+            changed = cursor.fetchall()
+            cursor.execute("SELECT product_id FROM product_tombstones WHERE revision > ?", (self.revision,))
+            deleted = [product_id for product_id, in cursor.fetchall()]
+            conn.close()
+            
+            for product_id in deleted:
+                self.remove_product(product_id)
+            for product_id, name, stock, price in changed:
+                self.patch_product(product_id, name, stock, price)
+            self.revision = revision
+            self.show_stats()
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to refresh inventory: {str(e)}")
+    
+    def set_row(self, row, product_id, name, stock, price):
+        """Fill one table row from product values"""
+        self.row_values[product_id] = (stock, price)
+        
+        # Product name
+        self.table.setItem(row, 0, QTableWidgetItem(name))
+        
+        # Stock quantity
+        stock_item = QTableWidgetItem(str(stock))
+        stock_item.setTextAlignment(Qt.AlignCenter)
+        self.table.setItem(row, 1, stock_item)
+        
+        # Unit price
+        price_item = QTableWidgetItem(f"Rs.{price:.2f}")
+        price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.table.setItem(row, 2, price_item)
+        
+        # Total value
+        value_item = QTableWidgetItem(f"Rs.{stock * price:.2f}")
+        value_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.table.setItem(row, 3, value_item)
+        
+        # Status based on stock level
+        status, color = self.stock_status(stock)
+        status_item = QTableWidgetItem(status)
+        status_item.setTextAlignment(Qt.AlignCenter)
+        status_item.setForeground(QColor("white"))
+        status_item.setBackground(QColor(color))
+        self.table.setItem(row, 4, status_item)
+    
+    def stock_status(self, stock):
+        """Return the status label and colour for a stock level"""
+        if stock == 0:
+            return "Out of Stock", "#e74c3c"  # Red
+        elif stock < 10:
+            return "Low Stock", "#f39c12"  # Orange
+        return "In Stock", "#27ae60"  # Green
+    
+    def count_product(self, stock, price, sign):
+        """Add (sign=1) or remove (sign=-1) one product from the summary statistics"""
+        self.stats['total_products'] += sign
+        self.stats['total_value'] += sign * stock * price
+        if stock == 0:
+            self.stats['out_of_stock'] += sign
+        elif stock < 10:
+            self.stats['low_stock'] += sign
+    
+    def on_products_changed(self, changes):
+        """Patch only the rows named in a change event"""
+        for change in changes:
+            self.patch_product(change['product_id'], change['name'], change['stock_quantity'],
+                               change['unit_price'])
+        self.show_stats()
+    
+    def patch_product(self, product_id, name, stock, price):
+        """Add or update one product's row and its share of the statistics.
+
+        Rows stay in name order, so a row is found by bisecting the names
+        rather than by searching the table.
+        """
+        if self.names.get(product_id, name) != name:
+            self.remove_product(product_id)  # renamed: it moves to its new place
+        
+        row = bisect_left(self.row_names, name)
+        if product_id in self.names:
+            self.count_product(*self.row_values[product_id], -1)
+        else:
+            self.row_names.insert(row, name)
+            self.names[product_id] = name
+            self.table.insertRow(row)
+        
+        self.set_row(row, product_id, name, stock, price)
+        self.count_product(stock, price, 1)
+        
+        search_text = self.search_box.text().lower()
+        self.table.setRowHidden(row, search_text not in name.lower())
+    
+    def remove_product(self, product_id):
+        """Drop a product's row and take it out of the statistics"""
+        name = self.names.pop(product_id, None)
+        if name is None:
+            return
+        row = bisect_left(self.row_names, name)
+        del self.row_names[row]
+        self.count_product(*self.row_values.pop(product_id), -1)
+        self.table.removeRow(row)
+    
+    def show_stats(self):
+        self.update_summary(self.stats['total_products'], self.stats['total_value'],
+                            self.stats['out_of_stock'], self.stats['low_stock'])
+    
     def update_summary(self, total_products, total_value, out_of_stock, low_stock):
         """Update the summary label with inventory statistics"""
         in_stock = total_products - out_of_stock - low_stock
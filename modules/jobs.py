@@ -0,0 +1,255 @@
+import argparse
+import threading
+import time
+from datetime import date, datetime, timedelta
+from modules.aggregates import drift_count, format_drift, refresh_aggregates
+from modules.archive import report_sources
+from modules.backup import format_stats, run_backup
+from modules.database import Database
+from modules.reconcile import format_discrepancies, reconcile_stock
+
+
+def run_checkpoint(scheduler):
+    """Fold the WAL back into the database file without waiting on readers"""
+    conn = scheduler.db.get_connection()
+    try:
+        busy, wal_pages, moved = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    finally:
+        conn.close()
+    if wal_pages < 0:
+        return "Not in WAL mode (in-memory database)"
+    return f"{moved} of {wal_pages} WAL pages checkpointed" + (" (readers busy)" if busy else "")
+
+
+def run_optimize(scheduler):
+    """Refresh query planner statistics where SQLite thinks they are stale"""
+    conn = scheduler.db.get_connection()
+    try:
+        conn.execute("PRAGMA analysis_limit = 1000")  # bound ANALYZE to sampled pages
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return "PRAGMA optimize done"
+
+
+def run_prewarm(scheduler):
+    """Read the pages the default reports touch so the first one opens warm.
+
+    The Reports window opens on the last 30 days; its summaries, the
+    charts' daily_sales and the stock report's products table are read
+    here so those pages are in the OS cache instead of on disk.
+    """
+    today = date.today()
+    from_date, to_date = (today - timedelta(days=30)).isoformat(), today.isoformat()
+    conn = scheduler.db.get_connection()
+    try:
+        sources = report_sources(conn, from_date, to_date)
+        conn.execute(f"""
+            SELECT COUNT(*), SUM(s.total_amount), SUM(p.stock_quantity)
+            FROM {sources['sales']} s JOIN products p ON p.id = s.product_id
+            WHERE s.sale_date BETWEEN ? AND ?
+        """, (from_date, to_date)).fetchone()
+        conn.execute(f"SELECT COUNT(*), SUM(total_cost) FROM {sources['purchases']} "
+                     f"WHERE purchase_date BETWEEN ? AND ?", (from_date, to_date)).fetchone()
+        conn.execute("SELECT COUNT(*), SUM(revenue) FROM daily_sales").fetchone()
+        conn.execute("SELECT COUNT(*), SUM(stock_quantity * unit_price) FROM products").fetchone()
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    return f"Report pages warmed ({pages} pages in database)"
+
+
+def run_aggregate_refresh(scheduler):
+    drift = refresh_aggregates(scheduler.db, scheduler.write_queue)
+    if drift_count(drift):
+        print(f"Aggregate drift repaired:\n{format_drift(drift)}")
+    return f"{drift_count(drift)} aggregate row(s) repaired"
+
+
+def run_stock_reconcile(scheduler):
+    """Report stock counters that disagree with history; repairing them is left to
+    python -m modules.reconcile --repair, after someone has looked at the list"""
+    discrepancies, _, seconds = reconcile_stock(scheduler.db)
+    if discrepancies:
+        print(f"Stock reconciliation ({seconds:.2f}s):\n{format_discrepancies(discrepancies)}")
+    return f"{len(discrepancies)} stock counter(s) disagree with history"
+
+
+def run_scheduled_backup(scheduler):
+    stats = run_backup(scheduler.db, write_queue=scheduler.write_queue, compress=True)
+    print(format_stats(stats))
+    return f"{stats['size_mb']:.2f} MB backup, integrity {stats['integrity']}"
+
+
+# name: (function, default interval in seconds, delay before the first run, description)
+JOBS = {
+    'checkpoint': (run_checkpoint, 15 * 60, 5 * 60, "Checkpoint the WAL into the database file"),
+    'optimize': (run_optimize, 6 * 3600, 10 * 60, "Refresh query planner statistics"),
+    'prewarm_reports': (run_prewarm, 3600, 0, "Pre-read pages used by the default reports"),
+    'refresh_aggregates': (run_aggregate_refresh, 24 * 3600, 3600,
+                           "Verify daily sales, supplier costs and balances; repair drift"),
+    'reconcile_stock': (run_stock_reconcile, 24 * 3600, 24 * 3600,
+                        "Audit stock counters against purchase/sale history (report only)"),
+    'backup': (run_scheduled_backup, 24 * 3600, 24 * 3600, "Compressed online backup"),
+}
+
+
+def timestamp(moment=None):
+    return (moment or datetime.now()).isoformat(sep=' ', timespec='seconds')
+
+
+class JobScheduler:
+    """Runs maintenance jobs on a background thread while the tills are idle.
+
+    Jobs, their intervals and next run times live in the jobs table (edit
+    `interval_seconds` or `enabled` there to tune them); every run is
+    logged to job_history with its duration. A job only starts once the
+    write queue has been idle for `idle_seconds`, and the scheduler
+    re-checks before each job, so maintenance never competes with a
+    sale being saved. Jobs that modify data submit their repairs to the
+    write queue instead of opening their own write transaction.
+    """
+
+    def __init__(self, db=None, write_queue=None, idle_seconds=60, tick=30, history_days=90):
+        self.db = db or Database()
+        self.write_queue = write_queue
+        self.idle_seconds = idle_seconds
+        self.tick = tick
+        self.history_days = history_days
+        self.running = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="jobs", daemon=True)
+        self.register_jobs()
+
+    def register_jobs(self):
+        conn = self.db.get_connection()
+        now = datetime.now()
+        conn.executemany("""
+            INSERT OR IGNORE INTO jobs (name, description, interval_seconds, next_run)
+            VALUES (?, ?, ?, ?)
+        """, [(name, description, interval, timestamp(now + timedelta(seconds=first_delay)))
+              for name, (_, interval, first_delay, description) in JOBS.items()])
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def idle(self):
+        return self.write_queue is None or self.write_queue.idle_seconds() >= self.idle_seconds
+
+    def due_jobs(self):
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT name FROM jobs
+                WHERE enabled = 1 AND next_run <= ?
+                ORDER BY next_run
+            """, (timestamp(),)).fetchall()
+        finally:
+            conn.close()
+        return [name for name, in rows if name in JOBS]
+
+    def run(self):
+        while not self.stopped.wait(self.tick):
+            try:
+                for name in self.due_jobs():
+                    if self.stopped.is_set() or not self.idle():
+                        break  # try again on a later tick
+                    self.run_job(name)
+            except Exception as e:
+                print(f"Job scheduler error: {e}")
+
+    def run_job(self, name):
+        """Run one job now and record it; returns (status, detail, duration_ms)"""
+        function = JOBS[name][0]
+        self.running = name
+        started_at = timestamp()
+        started = time.perf_counter()
+        try:
+            status, detail = 'ok', function(self)
+        except Exception as e:
+            status, detail = 'failed', str(e)
+            print(f"Job {name} failed: {e}")
+        finally:
+            self.running = None
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.record(name, started_at, status, detail, duration_ms)
+        return status, detail, duration_ms
+
+    def record(self, name, started_at, status, detail, duration_ms):
+        conn = self.db.get_connection()
+        try:
+            conn.execute("""
+                INSERT INTO job_history (job, started_at, duration_ms, status, detail)
+                VALUES (?, ?, ?, ?, ?)
+            """, (name, started_at, duration_ms, status, detail))
+            conn.execute("""
+                UPDATE jobs SET last_run = ?, last_status = ?, last_duration_ms = ?,
+                                next_run = datetime(?, '+' || interval_seconds || ' seconds')
+                WHERE name = ?
+            """, (started_at, status, duration_ms, timestamp(), name))
+            conn.execute("DELETE FROM job_history WHERE started_at < datetime('now', 'localtime', ?)",
+                         (f"-{self.history_days} days",))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def job_summary(conn):
+    """Per job: name, description, interval, enabled, last run/status/duration, next run, avg ms, runs"""
+    return conn.execute("""
+        SELECT j.name, j.description, j.interval_seconds, j.enabled, j.last_run, j.last_status,
+               j.last_duration_ms, j.next_run, AVG(h.duration_ms), COUNT(h.id)
+        FROM jobs j
+        LEFT JOIN job_history h ON h.job = j.name
+        GROUP BY j.name
+        ORDER BY j.name
+    """).fetchall()
+
+
+def job_history(conn, limit=50, job=None):
+    sql = "SELECT job, started_at, duration_ms, status, detail FROM job_history"
+    params = []
+    if job:
+        sql += " WHERE job = ?"
+        params.append(job)
+    sql += " ORDER BY started_at DESC, id DESC LIMIT ?"
+    return conn.execute(sql, params + [limit]).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background maintenance jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="show jobs, schedules and average durations")
+    history_cmd = commands.add_parser("history", help="show recent runs")
+    history_cmd.add_argument("--job")
+    history_cmd.add_argument("--limit", type=int, default=50)
+    run_cmd = commands.add_parser("run", help="run a job now")
+    run_cmd.add_argument("name", choices=list(JOBS))
+    args = parser.parse_args()
+
+    db = Database()
+    db.init_database()
+    if args.command == "run":
+        status, detail, duration_ms = JobScheduler(db).run_job(args.name)
+        print(f"{args.name}: {status} in {duration_ms:.0f} ms - {detail}")
+        return
+
+    conn = db.get_connection()
+    if args.command == "list":
+        for name, _, interval, enabled, last_run, status, last_ms, next_run, avg_ms, runs in job_summary(conn):
+            last = f"last {last_run} {status} {last_ms:.0f} ms" if last_run else "never run"
+            average = f", avg {avg_ms:.0f} ms over {runs} run(s)" if runs else ""
+            print(f"{name:<20} every {interval}s{'' if enabled else ' (disabled)'}: {last}{average}, next {next_run}")
+    else:
+        for job, started_at, duration_ms, status, detail in job_history(conn, args.limit, args.job):
+            print(f"{started_at}  {job:<20} {status:<7} {duration_ms:>9.0f} ms  {detail}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import json
+import os
+import sqlite3
+import struct
+import zlib
+from modules.transactions import record_sale
+
+HEADER = struct.Struct('<II')  # payload length, crc32
+
+
+class SaleJournal:
+    """Append-only, fsync'd journal of sales that could not reach the database.
+
+    Each record is a length-prefixed, CRC-checked JSON payload. A torn or
+    corrupt record at the tail (crash mid-append) ends the readable part
+    of the journal; everything before it is intact.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, sale):
+        payload = json.dumps(sale, separators=(',', ':')).encode('utf-8')
+        record = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with open(self.path, 'ab') as f:
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def has_pending(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def read(self):
+        """Return (records, valid_length) for the intact prefix of the journal"""
+        if not os.path.exists(self.path):
+            return [], 0
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        records = []
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            length, checksum = HEADER.unpack_from(data, offset)
+            start = offset + HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            records.append(json.loads(payload.decode('utf-8')))
+            offset = start + length
+
+        if offset < len(data):
+            print(f"Journal {self.path}: ignoring {len(data) - offset} bytes of torn/corrupt tail")
+        return records, offset
+
+    def recover(self):
+        """Cut off a torn tail left by a crash so new records stay readable"""
+        if not os.path.exists(self.path):
+            return
+        _, valid_length = self.read()
+        if valid_length < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_length)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Empty the journal once every record has been replayed"""
+        with open(self.path, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def reject(self, sale, reason):
+        """Keep records that can never be applied for manual follow-up"""
+        with open(self.path + '.rejected', 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'sale': sale, 'reason': reason}) + '\n')
+
+
+def replay_journal(journal, conn, batch_size=200):
+    """Drain journalled sales into SQLite in batched transactions.
+
+    Replay is idempotent: sales carry a client-generated txn_id and ones
+    already in the database are skipped, so a crash part-way through
+    simply replays the remainder next time. Returns the list of
+    (record, change) results that were newly applied.
+    """
+    records, _ = journal.read()
+    applied = []
+    cursor = conn.cursor()
+
+    for start in range(0, len(records), batch_size):
+        batch_applied = []
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for sale in records[start:start + batch_size]:
+                cursor.execute("SAVEPOINT replay")
+                try:
+                    result = record_sale(cursor, sale, enforce_stock=False)
+                    cursor.execute("RELEASE replay")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO replay")
+                    cursor.execute("RELEASE replay")
+                    if isinstance(e, sqlite3.OperationalError):
+                        raise
+                    journal.reject(sale, str(e))
+                    continue
+                if result is not None:
+                    batch_applied.append(result)
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        applied.extend(batch_applied)
+
+    journal.clear()
+    return applied
@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+LOW_STOCK_LEVEL = 10
+
+
+class KpiCounters:
+    """Running dashboard aggregates kept current from change events.
+
+    Each committed sale/purchase adjusts the counters by its delta;
+    reconcile() re-reads the true values from SQLite so any drift
+    (writes from another terminal, missed events) is corrected.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.day = date.today().isoformat()
+        self.revenue_today = 0.0
+        self.units_today = 0
+        self.stock_value = 0.0
+        self.low_stock = 0
+
+    def reconcile(self):
+        """Recompute every counter from the database"""
+        today = date.today()
+        tomorrow = (today + timedelta(days=1)).isoformat()
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        # Range predicate so both 'yyyy-MM-dd' and timestamp values match
+        cursor.execute("""
+            SELECT COALESCE(SUM(total_amount), 0), COALESCE(SUM(quantity), 0)
+            FROM sales
+            WHERE sale_date >= ? AND sale_date < ?
+        """, (today.isoformat(), tomorrow))
+        revenue, units = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT COALESCE(SUM(stock_quantity * unit_price), 0),
+                   COALESCE(SUM(stock_quantity < ?), 0)
+            FROM products
+        """, (LOW_STOCK_LEVEL,))
+        stock_value, low_stock = cursor.fetchone()
+        conn.close()
+
+        self.day = today.isoformat()
+        self.revenue_today = revenue
+        self.units_today = units
+        self.stock_value = stock_value
+        self.low_stock = low_stock
+
+    def roll_day(self):
+        """Reset the per-day counters once the date changes"""
+        today = date.today().isoformat()
+        if today != self.day:
+            self.day = today
+            self.revenue_today = 0.0
+            self.units_today = 0
+
+    def apply_sale(self, sale):
+        self.roll_day()
+        if sale['sale_date'][:10] == self.day:
+            self.revenue_today += sale['total_amount']
+            self.units_today += sale['quantity']
+
+    def apply_product_changes(self, changes):
+        for change in changes:
+            stock = change['stock_quantity']
+            self.stock_value += stock * change['unit_price']
+            self.low_stock += stock < LOW_STOCK_LEVEL
+
+            if not change['created']:
+                previous_stock = stock - change['stock_delta']
+                self.stock_value -= previous_stock * change['previous_unit_price']
+                self.low_stock -= previous_stock < LOW_STOCK_LEVEL
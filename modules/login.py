@@ -14,34 +14,7 @@ class LoginWindow(QWidget):
     def init_ui(self):
         self.setWindowTitle("Tobacco Inventory - Login")
         self.setFixedSize(400, 300)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f0f0f0;
-                font-family: Arial, sans-serif;
-            }
-            QLineEdit {
-                padding: 10px;
-                border: 2px solid #ccc;
-                border-radius: 5px;
-                font-size: 14px;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                padding: 10px;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            QLabel {
-                color: #333;
-                font-size: 16px;
-            }
-        """)
+        self.setObjectName("LoginWindow")
         
         layout = QVBoxLayout()
         layout.setSpacing(20)
@@ -51,7 +24,7 @@ class LoginWindow(QWidget):
         title = QLabel("🚬 Tobacco Inventory System")
         title.setAlignment(Qt.AlignCenter)
         title.setFont(QFont("Arial", 18, QFont.Bold))
-        title.setStyleSheet("color: #2c3e50; margin-bottom: 20px;")
+        title.setObjectName("loginTitle")
         
         # Input fields
         self.username = QLineEdit()
@@ -0,0 +1,130 @@
+import argparse
+from datetime import date, timedelta
+from modules.database import NO_EXPIRY, Database
+
+EXPIRY_WINDOW_DAYS = 90  # how far ahead the expiring stock report looks
+ADJUSTMENT_BATCH = "ADJUSTMENT"  # batch code of lots booked by stock corrections
+
+# Lots with stock left expiring on or before a date, soonest first
+EXPIRING_LOTS = """
+    SELECT p.name, l.batch_code, l.expiry_date, l.quantity_remaining, l.unit_cost, l.received_date
+    FROM lots l
+    JOIN products p ON p.id = l.product_id
+    WHERE l.quantity_remaining > 0 AND l.expiry_date <= ?
+    ORDER BY l.expiry_date, l.id
+"""
+
+
+def receive_lot(cursor, product_id, purchase_id, quantity, unit_cost, received_date, batch_code=None,
+                expiry_date=None):
+    """Record the lot a purchase brought in; returns its id"""
+    cursor.execute("""
+        INSERT INTO lots (product_id, purchase_id, batch_code, expiry_date, quantity_received,
+                          quantity_remaining, unit_cost, received_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (product_id, purchase_id, batch_code or None, expiry_date or NO_EXPIRY, quantity, quantity,
+          unit_cost, received_date))
+    return cursor.lastrowid
+
+
+def consume_lots(cursor, product_id, quantity):
+    """Take units from the product's lots, first expiring first out.
+
+    Each step is one seek on idx_lots_fefo, which only holds lots with
+    stock left, so the cost does not grow with the number of lots ever
+    received. Units no lot covers (stock older than lot tracking, or an
+    offline sale that oversold) stay unallocated. Returns [(lot id, units)].
+    """
+    allocated = []
+    while quantity > 0:
+        cursor.execute("""
+            SELECT id, quantity_remaining FROM lots
+            WHERE product_id = ? AND quantity_remaining > 0
+            ORDER BY expiry_date, id
+            LIMIT 1
+        """, (product_id,))
+        lot = cursor.fetchone()
+        if not lot:
+            break
+        lot_id, remaining = lot
+        units = min(remaining, quantity)
+        cursor.execute("UPDATE lots SET quantity_remaining = quantity_remaining - ? WHERE id = ?",
+                       (units, lot_id))
+        allocated.append((lot_id, units))
+        quantity -= units
+    return allocated
+
+
+def allocate_lots(cursor, product_id, sale_id, quantity):
+    """Take a sale's units from the product's lots and record which lots they came from"""
+    allocated = consume_lots(cursor, product_id, quantity)
+    cursor.executemany("INSERT INTO sale_lots (sale_id, lot_id, quantity) VALUES (?, ?, ?)",
+                       [(sale_id, lot_id, units) for lot_id, units in allocated])
+    return allocated
+
+
+def adjust_lots(cursor, product_id, delta, adjusted_date):
+    """Keep the lots in step with a stock correction of `delta` units.
+
+    Units found are booked as an adjustment lot without expiry, at the
+    latest purchase cost; units lost come out of the lots FEFO.
+    """
+    if delta > 0:
+        cursor.execute("""
+            SELECT unit_cost FROM purchases WHERE product_id = ?
+            ORDER BY purchase_date DESC, id DESC LIMIT 1
+        """, (product_id,))
+        row = cursor.fetchone()
+        receive_lot(cursor, product_id, None, delta, row[0] if row else None, adjusted_date,
+                    batch_code=ADJUSTMENT_BATCH)
+    elif delta < 0:
+        consume_lots(cursor, product_id, -delta)
+
+
+def expiring_lots(conn, as_of, days=EXPIRY_WINDOW_DAYS):
+    """Lots with stock left that expire within `days` of as_of (or already have).
+
+    Rows are dicts ordered by expiry, soonest first.
+    """
+    until = (date.fromisoformat(as_of) + timedelta(days=days)).isoformat()
+    rows = conn.execute(EXPIRING_LOTS, (until,)).fetchall()
+    return [{
+        'product': product,
+        'batch_code': batch_code or "",
+        'expiry_date': expiry_date,
+        'days_left': (date.fromisoformat(expiry_date) - date.fromisoformat(as_of)).days,
+        'quantity': remaining,
+        'value': remaining * (unit_cost or 0),
+        'received_date': str(received_date)[:10],
+    } for product, batch_code, expiry_date, remaining, unit_cost, received_date in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock lots: expiring stock and per-product FEFO order")
+    parser.add_argument("--days", type=int, default=EXPIRY_WINDOW_DAYS, help="how far ahead to look for expiry")
+    parser.add_argument("--product", help="list this product's lots in the order sales will use them")
+    args = parser.parse_args()
+
+    conn = Database().get_connection()
+    try:
+        if args.product:
+            for batch_code, expiry_date, remaining, received in conn.execute("""
+                SELECT l.batch_code, l.expiry_date, l.quantity_remaining, l.received_date
+                FROM lots l JOIN products p ON p.id = l.product_id
+                WHERE p.name = ? AND l.quantity_remaining > 0
+                ORDER BY l.expiry_date, l.id
+            """, (args.product,)):
+                expiry = "no expiry" if expiry_date == NO_EXPIRY else f"expires {expiry_date}"
+                print(f"{batch_code or '-':<16} {expiry:<20} {remaining:>6} units  received {str(received)[:10]}")
+        else:
+            today = date.today().isoformat()
+            for lot in expiring_lots(conn, today, args.days):
+                when = f"expired {-lot['days_left']}d ago" if lot['days_left'] < 0 else f"{lot['days_left']}d left"
+                print(f"{lot['expiry_date']} ({when:>15}) {lot['product']:<30} {lot['batch_code'] or '-':<16} "
+                      f"{lot['quantity']:>6} units  Rs.{lot['value']:,.2f}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from modules.config import MEMORY_URI, get_settings
+
+
+class MemoryStore:
+    """Holds the RAM-backed database open and mirrors it to the database file.
+
+    load() copies the file into memory once at startup. persist() copies
+    the memory image back with the SQLite backup API, but only when
+    something was committed since the last copy (PRAGMA data_version), so
+    an idle terminal never rewrites its file. A background thread persists
+    every `interval` seconds and a final copy is made at exit.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        # Keeps the shared in-memory image alive for the life of the process
+        self.holder = sqlite3.connect(MEMORY_URI, uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.persisted_version = None
+        self.stats = {'persists': 0, 'skipped': 0, 'last_persist_ms': 0.0}
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def load(self):
+        if self.settings.persistent and os.path.exists(self.settings.db_path):
+            disk = sqlite3.connect(self.settings.db_path, timeout=30)
+            try:
+                # memdb cannot open a WAL-format image, so copy it out of a
+                # rollback-journal header and put the file back in WAL after
+                disk.execute("PRAGMA journal_mode=DELETE")
+                disk.backup(self.holder)
+                disk.execute("PRAGMA journal_mode=WAL")
+            finally:
+                disk.close()
+        self.persisted_version = self.data_version()
+
+    def data_version(self):
+        return self.holder.execute("PRAGMA data_version").fetchone()[0]
+
+    def persist(self):
+        """Copy the memory image to disk if it changed; True when written"""
+        if not self.settings.persistent:
+            return False
+        with self.lock:
+            version = self.data_version()
+            if version == self.persisted_version:
+                self.stats['skipped'] += 1
+                return False
+            started = time.perf_counter()
+            disk = sqlite3.connect(self.settings.db_path, timeout=30)
+            try:
+                self.holder.backup(disk)
+            finally:
+                disk.close()
+            self.persisted_version = version
+            self.stats['persists'] += 1
+            self.stats['last_persist_ms'] = (time.perf_counter() - started) * 1000
+        return True
+
+    def start(self, interval=None):
+        interval = interval or self.settings.persist_interval
+        self.thread = threading.Thread(target=self.run, args=(interval,), name="db-persist", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the timer and make the final copy"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(10)
+        self.persist()
+
+    def run(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.persist()
+            except sqlite3.Error as e:
+                print(f"Persisting in-memory database failed: {e}")
+
+
+_store = None
+
+
+def get_memory_store():
+    """Return the process-wide memory store, loading the database on first use"""
+    global _store
+    if _store is None:
+        _store = MemoryStore(get_settings())
+        _store.load()
+        atexit.register(_store.persist)
+    return _store
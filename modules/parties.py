@@ -0,0 +1,48 @@
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QStringListModel
+from PyQt5.QtWidgets import QCompleter
+from modules.party_store import PARTY_TABLES, display_name, normalize_name
+
+
+class PartyIndex:
+    """In-memory, sorted index of customer or supplier names for autocompletion.
+
+    Loaded once per window; new names recorded by the writer are slotted
+    in from change-bus signals, so typing never queries the database.
+    """
+
+    def __init__(self, db, table):
+        if table not in PARTY_TABLES:
+            raise ValueError(f"Unknown party table: {table}")
+        self.keys = []
+        self.names = {}
+        self.model = QStringListModel()
+
+        conn = db.get_connection()
+        rows = conn.execute(f"SELECT name, name_key FROM {table} ORDER BY name_key").fetchall()
+        conn.close()
+
+        self.keys = [key for _, key in rows]
+        self.names = {key: name for name, key in rows}
+        self.model.setStringList([name for name, _ in rows])
+
+    def add(self, name):
+        """Insert a newly recorded name at its sorted position"""
+        key = normalize_name(name)
+        if not key or key in self.names:
+            return
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.names[key] = display_name(name)
+        self.model.insertRows(position, 1)
+        self.model.setData(self.model.index(position), display_name(name))
+
+    def canonical(self, name):
+        """Stored spelling for a typed name, or the tidied text if it is new"""
+        return self.names.get(normalize_name(name), display_name(name))
+
+    def completer(self, parent=None):
+        completer = QCompleter(self.model, parent)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchContains)
+        return completer
@@ -0,0 +1,64 @@
+# Dimension tables and the (table, text column, id column) that reference them
+PARTY_TABLES = {
+    'customers': ('sales', 'customer_name', 'customer_id'),
+    'suppliers': ('purchases', 'supplier', 'supplier_id'),
+}
+
+
+def normalize_name(name):
+    """Unique key for a customer/supplier name: trimmed, single-spaced, casefolded"""
+    return " ".join((name or "").split()).casefold()
+
+
+def display_name(name):
+    """Name as stored for display: trimmed and single-spaced, case kept"""
+    return " ".join((name or "").split())
+
+
+def resolve_party(cursor, table, name):
+    """Return (id, stored name) for a customer/supplier, creating it if new.
+
+    Names are matched on their normalised key, so "Ali Traders" and
+    "ali traders " resolve to the same row and keep the first spelling.
+    """
+    if table not in PARTY_TABLES:
+        raise ValueError(f"Unknown party table: {table}")
+
+    key = normalize_name(name)
+    cursor.execute(f"SELECT id, name FROM {table} WHERE name_key = ?", (key,))
+    row = cursor.fetchone()
+    if row:
+        return row
+
+    cursor.execute(f"INSERT INTO {table} (name, name_key) VALUES (?, ?)", (display_name(name), key))
+    return cursor.lastrowid, display_name(name)
+
+
+def migrate_parties(cursor):
+    """Fill customers/suppliers from existing free text and link the rows.
+
+    Spellings that normalise to the same key collapse into one party
+    (the earliest one seen wins) and the text column is rewritten to that
+    canonical name. Only rows without an id yet are touched, so running
+    it again is cheap.
+    """
+    for table, (source, text_column, id_column) in PARTY_TABLES.items():
+        cursor.execute(f"""
+            SELECT {text_column} FROM {source}
+            WHERE {id_column} IS NULL AND {text_column} IS NOT NULL
+            GROUP BY {text_column}
+            ORDER BY MIN(id)
+        """)
+        spellings = [row[0] for row in cursor.fetchall()]
+        if not spellings:
+            continue
+
+        ids = {}
+        for spelling in spellings:
+            if normalize_name(spelling):
+                ids[spelling] = resolve_party(cursor, table, spelling)
+
+        cursor.executemany(f"""
+            UPDATE {source} SET {id_column} = ?, {text_column} = ?
+            WHERE {text_column} = ? AND {id_column} IS NULL
+        """, [(party_id, name, spelling) for spelling, (party_id, name) in ids.items()])
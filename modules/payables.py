@@ -0,0 +1,62 @@
+import argparse
+from modules.database import Database
+
+
+def supplier_balances(conn):
+    """(supplier_id, name, balance) for every supplier we owe, largest first"""
+    return conn.execute("""
+        SELECT id, name, balance FROM suppliers
+        WHERE balance > 0.005
+        ORDER BY balance DESC
+    """).fetchall()
+
+
+def supplier_costs(conn, supplier_id=None):
+    """Per (supplier, product) cost figures from the maintained aggregate.
+
+    Reads supplier_product_costs, which record_purchase keeps current, so
+    this is one indexed row per pair instead of a pass over purchases.
+    Returns dicts with supplier, product, purchases, quantity, last_cost,
+    avg_cost, last_purchase_date and the supplier's balance.
+    """
+    query = """
+        SELECT s.name, p.name, c.purchase_count, c.quantity, c.last_cost,
+               c.total_cost / NULLIF(c.quantity, 0), c.last_purchase_date, s.balance
+        FROM supplier_product_costs c
+        JOIN suppliers s ON s.id = c.supplier_id
+        JOIN products p ON p.id = c.product_id
+    """
+    params = ()
+    if supplier_id is not None:
+        query += " WHERE c.supplier_id = ?"
+        params = (supplier_id,)
+    query += " ORDER BY s.name, p.name"
+
+    keys = ('supplier', 'product', 'purchases', 'quantity', 'last_cost',
+            'avg_cost', 'last_purchase_date', 'balance')
+    return [dict(zip(keys, row)) for row in conn.execute(query, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supplier payables and purchase costs")
+    parser.add_argument("--costs", action="store_true", help="also list last/average cost per product")
+    args = parser.parse_args()
+
+    conn = Database().get_connection()
+    balances = supplier_balances(conn)
+    print(f"{'Supplier':<30}{'We owe':>12}")
+    for _, name, balance in balances:
+        print(f"{name:<30}{balance:>12.2f}")
+    print(f"{'Total':<30}{sum(balance for _, _, balance in balances):>12.2f}")
+
+    if args.costs:
+        print()
+        print(f"{'Supplier':<24}{'Product':<24}{'Qty':>8}{'Last cost':>12}{'Avg cost':>12}")
+        for row in supplier_costs(conn):
+            print(f"{row['supplier']:<24}{row['product']:<24}{row['quantity']:>8}"
+                  f"{row['last_cost']:>12.2f}{row['avg_cost'] or 0:>12.2f}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
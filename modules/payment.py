@@ -0,0 +1,189 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
+                             QPushButton, QLabel, QMessageBox, QComboBox, 
+                             QDoubleSpinBox, QDateEdit, QFormLayout)
+from PyQt5.QtCore import QDate
+from modules.database import Database
+from modules.events import change_bus, gui_callback
+from modules.parties import PartyIndex
+from modules.party_store import normalize_name
+from modules.transactions import TransactionError
+from modules.writer import get_write_queue
+
+# Per-party settings: customers pay us, we pay suppliers
+PAYMENT_FORMS = {
+    'customers': {
+        'title': "💳 Receive Payment",
+        'kind': 'payment',
+        'field': 'customer_name',
+        'label': "Customer:",
+        'placeholder': "Enter credit customer name",
+        'balance': "Outstanding",
+        'recorded': 'payment_recorded',
+        'activity': 'sale_recorded',
+    },
+    'suppliers': {
+        'title': "🧾 Pay Supplier",
+        'kind': 'supplier_payment',
+        'field': 'supplier',
+        'label': "Supplier:",
+        'placeholder': "Enter supplier name",
+        'balance': "We owe",
+        'recorded': 'supplier_payment_recorded',
+        'activity': 'purchase_recorded',
+    },
+}
+
+class PaymentWindow(QWidget):
+    def __init__(self, party='customers'):
+        super().__init__()
+        self.db = Database()
+        self.party = party
+        self.form = PAYMENT_FORMS[party]
+        self.init_ui()
+    
+    def init_ui(self):
+        self.setWindowTitle(self.form['title'][2:])
+        self.setFixedSize(600, 560)
+        self.setObjectName("PaymentWindow")
+        
+        # Main layout
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(20)
+        main_layout.setContentsMargins(30, 30, 30, 30)
+        
+        # Title
+        title = QLabel(self.form['title'])
+        title.setObjectName("title")
+        
+        # Form layout for better organization
+        form_layout = QFormLayout()
+        form_layout.setSpacing(15)
+        form_layout.setFieldGrowthPolicy(QFormLayout.ExpandingFieldsGrow)
+        
+        # Form fields
+        self.party_name = QLineEdit()
+        self.party_name.setPlaceholderText(self.form['placeholder'])
+        self.parties = PartyIndex(self.db, self.party)
+        self.party_name.setCompleter(self.parties.completer(self))
+        
+        self.amount = QDoubleSpinBox()
+        self.amount.setRange(0.01, 9999999.99)
+        self.amount.setPrefix("Rs. ")
+        self.amount.setDecimals(2)
+        
+        self.payment_type = QComboBox()
+        self.payment_type.addItems(["Cash", "Bank Transfer", "UPI", "Cheque"])
+        
+        self.payment_date = QDateEdit()
+        self.payment_date.setDate(QDate.currentDate())
+        self.payment_date.setCalendarPopup(True)
+        
+        self.note = QLineEdit()
+        self.note.setPlaceholderText("Optional note")
+        
+        # Add fields to form layout
+        form_layout.addRow(self.form['label'], self.party_name)
+        form_layout.addRow("Amount:", self.amount)
+        form_layout.addRow("Payment Type:", self.payment_type)
+        form_layout.addRow("Payment Date:", self.payment_date)
+        form_layout.addRow("Note:", self.note)
+        
+        # Outstanding balance for the selected customer/supplier
+        self.balance_label = QLabel(f"{self.form['balance']}: Rs. 0.00")
+        self.balance_label.setObjectName("total")
+        
+        self.party_name.textChanged.connect(self.show_balance)
+        getattr(change_bus, self.form['recorded']).connect(self.on_payment_recorded)
+        getattr(change_bus, self.form['activity']).connect(self.on_activity_recorded)
+        
+        # Buttons layout
+        button_layout = QHBoxLayout()
+        button_layout.setSpacing(15)
+        
+        self.save_btn = QPushButton("💾 Save Payment")
+        self.save_btn.clicked.connect(self.save_payment)
+        
+        cancel_btn = QPushButton("❌ Cancel")
+        cancel_btn.clicked.connect(self.close)
+        cancel_btn.setObjectName("cancelButton")
+        
+        button_layout.addWidget(self.save_btn)
+        button_layout.addWidget(cancel_btn)
+        
+        # Add everything to main layout
+        main_layout.addWidget(title)
+        main_layout.addLayout(form_layout)
+        main_layout.addWidget(self.balance_label)
+        main_layout.addLayout(button_layout)
+        main_layout.addStretch()  # Push everything to top
+        
+        self.setLayout(main_layout)
+        
+        # Set focus to first field
+        self.party_name.setFocus()
+    
+    def reset(self):
+        """Clear the form for the next payment"""
+        self.party_name.clear()
+        self.amount.setValue(self.amount.minimum())
+        self.payment_type.setCurrentIndex(0)
+        self.payment_date.setDate(QDate.currentDate())
+        self.note.clear()
+        self.save_btn.setEnabled(True)
+        self.party_name.setFocus()
+    
+    def show_balance(self):
+        """Look up the maintained balance; no summing of past sales"""
+        key = normalize_name(self.party_name.text())
+        balance = 0.0
+        if key in self.parties.names:
+            try:
+                conn = self.db.get_connection()
+                row = conn.execute(f"SELECT balance FROM {self.party} WHERE name_key = ?", (key,)).fetchone()
+                conn.close()
+                balance = row[0] if row else 0.0
+            except Exception as e:
+                print(f"Debug - Balance lookup error: {e}")
+        self.balance_label.setText(f"{self.form['balance']}: Rs. {balance:.2f}")
+    
+    def on_activity_recorded(self, record):
+        """A sale/purchase may have added a new party or changed the balance"""
+        name = record[self.form['field']]
+        self.parties.add(name)
+        if normalize_name(name) == normalize_name(self.party_name.text()):
+            self.show_balance()
+    
+    def on_payment_recorded(self, payment):
+        if normalize_name(payment[self.form['field']]) == normalize_name(self.party_name.text()):
+            self.balance_label.setText(f"{self.form['balance']}: Rs. {payment['balance']:.2f}")
+    
+    def save_payment(self):
+        # Validate inputs
+        if not self.party_name.text().strip():
+            QMessageBox.warning(self, "Error", f"Please enter {self.form['label'][:-1].lower()} name")
+            return
+        
+        payment = {
+            self.form['field']: self.parties.canonical(self.party_name.text()),
+            'amount': self.amount.value(),
+            'payment_type': self.payment_type.currentText(),
+            'payment_date': self.payment_date.date().toString("yyyy-MM-dd"),
+            'note': self.note.text().strip(),
+        }
+        
+        # Commit on the background writer so the window never blocks on disk I/O
+        self.save_btn.setEnabled(False)
+        get_write_queue().submit(self.form['kind'], payment, gui_callback(self.on_payment_saved))
+    
+    def on_payment_saved(self, payment, error):
+        self.save_btn.setEnabled(True)
+        if error is not None:
+            if isinstance(error, TransactionError):
+                QMessageBox.warning(self, "Error", str(error))
+            else:
+                QMessageBox.critical(self, "Error", f"Failed to save payment: {str(error)}")
+            return
+        
+        QMessageBox.information(self, "Success",
+                                f"Payment saved. {self.form['balance']}: Rs. {payment['balance']:.2f}")
+        self.close()
\ No newline at end of file
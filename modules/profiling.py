@@ -0,0 +1,282 @@
+import argparse
+import cProfile
+import csv
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+from PyQt5.QtCore import QEvent, Qt, QTimer
+from PyQt5.QtWidgets import QAbstractButton, QApplication, QWidget
+from modules.config import get_settings
+
+ACTION_KEYS = (Qt.Key_Return, Qt.Key_Enter)
+CSV_FIELDS = ['started', 'action', 'wall_ms', 'handler_ms', 'sql_ms', 'qt_ms', 'python_ms', 'paint_ms',
+              'other_ms', 'peak_kb', 'report']
+MAX_STACK_DEPTH = 40
+
+
+def default_profile_dir():
+    settings = get_settings()
+    base = os.path.dirname(settings.db_path) if settings.persistent else os.getcwd()
+    return os.path.join(base, "profiles")
+
+
+def action_name(receiver):
+    """'WindowObjectName/Button text' for the widget an action started on"""
+    window = receiver.window()
+    where = window.objectName() or type(window).__name__
+    label = receiver.text() if isinstance(receiver, QAbstractButton) else ""
+    label = re.sub(r"[^\w ]+", "", label).strip() or receiver.objectName() or type(receiver).__name__
+    return f"{where}/{label}"
+
+
+# sip-wrapped Qt methods show up in cProfile as '<built-in method setItem>', with no module
+QT_CALL = re.compile(r"<built-in method \w+>$|PyQt5\.")
+
+
+def split_builtin_time(stats):
+    """(sql seconds, qt seconds) spent inside sqlite3 and PyQt5 C calls"""
+    sql = qt = 0.0
+    for (filename, _, name), (_, _, own_time, _, _) in stats.items():
+        if filename != '~':
+            continue
+        if 'sqlite3.' in name:
+            sql += own_time
+        elif QT_CALL.search(name):
+            qt += own_time
+    return sql, qt
+
+
+def function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name.strip('<>')
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats):
+    """Flamegraph 'collapsed' lines (frame;frame;frame microseconds) from a profile.
+
+    cProfile only keeps caller->callee edges, so each function's own time
+    is spread over the paths leading to it in proportion to the time
+    spent along each edge - the usual approximation for pstats input.
+    """
+    children = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children[caller][func] = edge[3]
+    roots = [func for func, entry in stats.items() if not entry[4]]
+
+    lines = Counter()
+
+    def walk(func, path, on_path, budget):
+        total = stats[func][3]
+        scale = budget / total if total else 0.0
+        path = path + [function_label(func)]
+        own = stats[func][2] * scale
+        if own > 0:
+            lines[";".join(path)] += own
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in children.get(func, {}).items():
+            share = edge_time * scale
+            if callee not in on_path and share > 1e-6:
+                walk(callee, path, on_path | {callee}, share)
+
+    for root in roots:
+        walk(root, [], {root}, stats[root][3])
+    return [f"{stack} {int(seconds * 1_000_000)}" for stack, seconds in lines.most_common()
+            if seconds >= 1e-6]
+
+
+class ActionSpan:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.handler_ms = 0.0
+        self.paint_ms = 0.0
+        self.handler_paint_ms = 0.0
+        self.in_handler = True
+        self.profile = cProfile.Profile()
+        self.snapshot = None
+
+
+class ActionProfiler:
+    """Profiles one UI action at a time and writes a report per action.
+
+    An action starts with a click on a button (or Return/Enter) and lasts
+    until the event loop is idle again, so the repaint it causes is part
+    of it. Wall time is split into SQL (time inside sqlite3 calls), Qt
+    (time inside PyQt calls, including modal dialogs), Python (the rest
+    of the handler) and painting (paint events dispatched during the
+    action). Each action leaves NAME.pstats, NAME.collapsed (for
+    flamegraph.pl / speedscope) and NAME.txt in the output folder, plus a
+    row in actions.csv.
+    """
+
+    def __init__(self, out_dir=None, memory_frames=10):
+        self.out_dir = out_dir or default_profile_dir()
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.span = None
+        self.memory_frames = memory_frames
+        self.owns_tracemalloc = not tracemalloc.is_tracing()
+        if self.owns_tracemalloc:
+            tracemalloc.start(memory_frames)
+
+    def close(self):
+        if self.owns_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def begin(self, name):
+        self.span = ActionSpan(name)
+        tracemalloc.reset_peak()
+        self.span.snapshot = tracemalloc.take_snapshot()
+        self.span.profile.enable()
+
+    def end_handler(self):
+        span = self.span
+        span.profile.disable()
+        span.handler_ms = (time.perf_counter() - span.started) * 1000
+        span.in_handler = False
+        # Whatever the action queued (layout, repaint) runs before this fires
+        QTimer.singleShot(0, self.finish)
+
+    def add_paint(self, ms):
+        self.span.paint_ms += ms
+        if self.span.in_handler:
+            self.span.handler_paint_ms += ms
+
+    def finish(self):
+        span, self.span = self.span, None
+        if span is None:
+            return
+        wall_ms = (time.perf_counter() - span.started) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().compare_to(span.snapshot, 'lineno')[:10]
+        try:
+            self.write_report(span, wall_ms, peak, allocations)
+        except OSError as e:
+            print(f"Debug - could not write profile for {span.name}: {e}")
+
+    def write_report(self, span, wall_ms, peak, allocations):
+        stats = pstats.Stats(span.profile)
+        sql_s, qt_s = split_builtin_time(stats.stats)
+        sql_ms, qt_ms = sql_s * 1000, qt_s * 1000
+        python_ms = max(0.0, span.handler_ms - sql_ms - qt_ms - span.handler_paint_ms)
+        other_ms = max(0.0, wall_ms - span.handler_ms - (span.paint_ms - span.handler_paint_ms))
+
+        slug = re.sub(r"\W+", "_", span.name).strip("_")
+        base = os.path.join(self.out_dir, f"{span.started_at:%Y%m%d_%H%M%S_%f}_{slug}")
+        stats.dump_stats(base + ".pstats")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(collapsed_stacks(stats.stats)) + "\n")
+
+        split = (f"wall {wall_ms:.1f} ms: SQL {sql_ms:.1f}, Qt calls {qt_ms:.1f}, Python {python_ms:.1f}, "
+                 f"painting {span.paint_ms:.1f}, other events {other_ms:.1f}")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"{span.name} at {span.started_at:%Y-%m-%d %H:%M:%S}\n{split}\n")
+            f.write(f"Peak traced memory: {peak / 1024:.0f} KB\n\nTop allocations:\n")
+            for stat in allocations:
+                f.write(f"  {stat}\n")
+            f.write("\nTop functions by cumulative time:\n")
+            stats.stream = f
+            stats.sort_stats('cumulative').print_stats(25)
+
+        csv_path = os.path.join(self.out_dir, "actions.csv")
+        new_file = not os.path.exists(csv_path)
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(CSV_FIELDS)
+            writer.writerow([f"{span.started_at:%Y-%m-%d %H:%M:%S}", span.name, f"{wall_ms:.2f}",
+                             f"{span.handler_ms:.2f}", f"{sql_ms:.2f}", f"{qt_ms:.2f}", f"{python_ms:.2f}",
+                             f"{span.paint_ms:.2f}", f"{other_ms:.2f}", f"{peak / 1024:.0f}",
+                             os.path.basename(base)])
+        print(f"Profiled {span.name}: {split}")
+
+
+class ProfilingApplication(QApplication):
+    """QApplication whose event dispatch can be profiled per user action.
+
+    With no profiler attached notify() only forwards the event.
+    """
+
+    profiler = None
+
+    def set_profiling(self, enabled, out_dir=None):
+        if enabled and self.profiler is None:
+            self.profiler = ActionProfiler(out_dir)
+            print(f"Profiling UI actions into {self.profiler.out_dir}")
+        elif not enabled and self.profiler is not None:
+            profiler, self.profiler = self.profiler, None
+            profiler.finish()
+            profiler.close()
+
+    def notify(self, receiver, event):
+        profiler = self.profiler
+        if profiler is None:
+            return super().notify(receiver, event)
+
+        kind = event.type()
+        if profiler.span is None and self.starts_action(receiver, event, kind):
+            profiler.begin(action_name(receiver))
+            try:
+                return super().notify(receiver, event)
+            finally:
+                profiler.end_handler()
+
+        if profiler.span is not None and kind == QEvent.Paint:
+            started = time.perf_counter()
+            try:
+                return super().notify(receiver, event)
+            finally:
+                if profiler.span is not None:
+                    profiler.add_paint((time.perf_counter() - started) * 1000)
+        return super().notify(receiver, event)
+
+    def starts_action(self, receiver, event, kind):
+        if kind == QEvent.MouseButtonRelease:
+            return isinstance(receiver, QAbstractButton) and receiver.isEnabled()
+        if kind == QEvent.KeyPress:
+            return isinstance(receiver, QWidget) and event.key() in ACTION_KEYS
+        return False
+
+
+def profiling_app():
+    """The running ProfilingApplication, or None under a plain QApplication"""
+    app = QApplication.instance()
+    return app if isinstance(app, ProfilingApplication) else None
+
+
+def summarize(out_dir):
+    """Per action: count and median of each time column from actions.csv"""
+    with open(os.path.join(out_dir, "actions.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    by_action = defaultdict(list)
+    for row in rows:
+        by_action[row['action']].append(row)
+
+    columns = ['wall_ms', 'sql_ms', 'qt_ms', 'python_ms', 'paint_ms']
+    lines = [f"{'Action':<40}{'Runs':>6}" + "".join(f"{column[:-3] + ' ms':>12}" for column in columns)]
+    for action, samples in sorted(by_action.items(), key=lambda item: -len(item[1])):
+        medians = []
+        for column in columns:
+            values = sorted(float(sample[column]) for sample in samples)
+            medians.append(values[len(values) // 2])
+        lines.append(f"{action:<40}{len(samples):>6}" + "".join(f"{value:>12.1f}" for value in medians))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise UI action profiles (median ms per action)")
+    parser.add_argument("dir", nargs="?", help="profile folder (default: profiles/ next to the database)")
+    args = parser.parse_args()
+    print(summarize(args.dir or default_profile_dir()))
+
+
+if __name__ == '__main__':
+    main()
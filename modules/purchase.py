@@ -3,6 +3,10 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
                              QSpinBox, QDoubleSpinBox, QDateEdit, QFormLayout)
 from PyQt5.QtCore import QDate
 from modules.database import Database
+from modules.events import change_bus, gui_callback
+from modules.writer import get_write_queue
+from modules.parties import PartyIndex
+from modules.categories import category_names
 
 class PurchaseWindow(QWidget):
     def __init__(self):
@@ -12,39 +16,8 @@ class PurchaseWindow(QWidget):
     
     def init_ui(self):
         self.setWindowTitle("Purchase Entry")
-        self.setFixedSize(600, 550)  # Increased size
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: Arial, sans-serif;
-            }
-            QLineEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit {
-                padding: 10px;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                font-size: 14px;
-                min-height: 20px;
-            }
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: #2c3e50;
-                margin-bottom: 5px;
-            }
-            QPushButton {
-                background-color: #27ae60;
-                color: white;
-                padding: 12px;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #219a52;
-            }
-        """)
+        self.setFixedSize(600, 760)  # Increased size
+        self.setObjectName("PurchaseWindow")
         
         # Main layout
         main_layout = QVBoxLayout()
@@ -53,7 +26,7 @@ class PurchaseWindow(QWidget):
         
         # Title
         title = QLabel("📦 Purchase Entry")
-        title.setStyleSheet("font-size: 20px; font-weight: bold; color: #2c3e50; margin-bottom: 20px;")
+        title.setObjectName("title")
         
         # Form layout for better organization
         form_layout = QFormLayout()
@@ -64,8 +37,20 @@ class PurchaseWindow(QWidget):
         self.product_name = QLineEdit()
         self.product_name.setPlaceholderText("Enter product name")
         
+        self.barcode = QLineEdit()
+        self.barcode.setPlaceholderText("Scan or enter barcode (optional)")
+        
+        # Existing categories to pick from; typing a new "Brand > Type" creates it
+        self.category = QComboBox()
+        self.category.setEditable(True)
+        self.category.setInsertPolicy(QComboBox.NoInsert)
+        self.category.lineEdit().setPlaceholderText("Brand > Type (optional)")
+        self.load_categories()
+        
         self.supplier = QLineEdit()
         self.supplier.setPlaceholderText("Enter supplier name")
+        self.suppliers = PartyIndex(self.db, 'suppliers')
+        self.supplier.setCompleter(self.suppliers.completer(self))
         
         self.quantity = QSpinBox()
         self.quantity.setRange(1, 10000)
@@ -85,30 +70,39 @@ class PurchaseWindow(QWidget):
         self.purchase_date.setDate(QDate.currentDate())
         self.purchase_date.setCalendarPopup(True)
         
+        # Lot details; the earliest date doubles as "no expiry"
+        self.batch_code = QLineEdit()
+        self.batch_code.setPlaceholderText("Batch / lot number (optional)")
+        
+        self.expiry_date = QDateEdit()
+        self.expiry_date.setCalendarPopup(True)
+        self.expiry_date.setMinimumDate(QDate(2000, 1, 1))
+        self.expiry_date.setSpecialValueText("No expiry")
+        self.expiry_date.setDate(self.expiry_date.minimumDate())
+        
         # Add fields to form layout
         form_layout.addRow("Product Name:", self.product_name)
+        form_layout.addRow("Barcode:", self.barcode)
+        form_layout.addRow("Category:", self.category)
         form_layout.addRow("Supplier:", self.supplier)
         form_layout.addRow("Quantity:", self.quantity)
         form_layout.addRow("Unit Cost:", self.unit_cost)
         form_layout.addRow("Payment Type:", self.payment_type)
         form_layout.addRow("Purchase Date:", self.purchase_date)
+        form_layout.addRow("Batch Code:", self.batch_code)
+        form_layout.addRow("Expiry Date:", self.expiry_date)
         
         # Calculate total automatically
         self.total_cost = QLabel("Total: Rs. 0.00")
-        self.total_cost.setStyleSheet("""
-            font-size: 18px; 
-            font-weight: bold; 
-            color: #e74c3c;
-            padding: 10px;
-            background-color: #ecf0f1;
-            border-radius: 5px;
-            margin: 10px 0;
-        """)
+        self.total_cost.setObjectName("total")
         
         # Connect signals for auto-calculation
         self.quantity.valueChanged.connect(self.calculate_total)
         self.unit_cost.valueChanged.connect(self.calculate_total)
         
+        # Suppliers recorded elsewhere while this window is open
+        change_bus.purchase_recorded.connect(self.on_purchase_recorded)
+        
         # Calculate initial total
         self.calculate_total()
         
@@ -116,28 +110,14 @@ class PurchaseWindow(QWidget):
         button_layout = QHBoxLayout()
         button_layout.setSpacing(15)
         
-        save_btn = QPushButton("💾 Save Purchase")
-        save_btn.clicked.connect(self.save_purchase)
+        self.save_btn = QPushButton("💾 Save Purchase")
+        self.save_btn.clicked.connect(self.save_purchase)
         
         cancel_btn = QPushButton("❌ Cancel")
         cancel_btn.clicked.connect(self.close)
-        cancel_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                padding: 12px;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
-        
-        button_layout.addWidget(save_btn)
+        cancel_btn.setObjectName("cancelButton")
+        
+        button_layout.addWidget(self.save_btn)
         button_layout.addWidget(cancel_btn)
         
         # Add everything to main layout
@@ -152,6 +132,35 @@ class PurchaseWindow(QWidget):
         # Set focus to first field
         self.product_name.setFocus()
     
+    def reset(self):
+        """Clear the form for the next purchase"""
+        self.product_name.clear()
+        self.barcode.clear()
+        self.load_categories()  # pick up categories added since the window opened
+        self.supplier.clear()
+        self.quantity.setValue(1)
+        self.unit_cost.setValue(1.00)
+        self.payment_type.setCurrentIndex(0)
+        self.purchase_date.setDate(QDate.currentDate())
+        self.batch_code.clear()
+        self.expiry_date.setDate(self.expiry_date.minimumDate())
+        self.save_btn.setEnabled(True)
+        self.product_name.setFocus()
+    
+    def load_categories(self):
+        self.category.clear()
+        conn = self.db.get_connection()
+        try:
+            self.category.addItems(category_names(conn))
+        except Exception as e:
+            print(f"Debug - Error loading categories: {e}")
+        finally:
+            conn.close()
+        self.category.setEditText("")
+    
+    def on_purchase_recorded(self, purchase):
+        self.suppliers.add(purchase['supplier'])
+    
     def calculate_total(self):
         total = self.quantity.value() * self.unit_cost.value()
         self.total_cost.setText(f"Total: Rs. {total:.2f}")
@@ -166,44 +175,33 @@ class PurchaseWindow(QWidget):
             QMessageBox.warning(self, "Error", "Please enter supplier name")
             return
         
-        try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Check if product exists, if not create it
-            cursor.execute("SELECT id FROM products WHERE name = ?", (self.product_name.text().strip(),))
-            product = cursor.fetchone()
-            
-            if not product:
-                cursor.execute("""
-                    INSERT INTO products (name, stock_quantity, unit_price) 
-                    VALUES (?, ?, ?)
-                """, (self.product_name.text().strip(), 0, self.unit_cost.value()))
-                product_id = cursor.lastrowid
-            else:
-                product_id = product[0]
-            
-            # Insert purchase record
-            total_cost = self.quantity.value() * self.unit_cost.value()
-            cursor.execute("""
-                INSERT INTO purchases (product_id, supplier, quantity, unit_cost, total_cost, payment_type, purchase_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (product_id, self.supplier.text().strip(), self.quantity.value(), 
-                  self.unit_cost.value(), total_cost, self.payment_type.currentText(),
-                  self.purchase_date.date().toString("yyyy-MM-dd")))
-            
-            # Update product stock
-            cursor.execute("""
-                UPDATE products 
-                SET stock_quantity = stock_quantity + ?, unit_price = ?
-                WHERE id = ?
-            """, (self.quantity.value(), self.unit_cost.value(), product_id))
-            
-            conn.commit()
-            conn.close()
-            
-            QMessageBox.information(self, "Success", "Purchase record saved successfully!")
-            self.close()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save purchase: {str(e)}")
\ No newline at end of file
+        has_expiry = self.expiry_date.date() != self.expiry_date.minimumDate()
+        if has_expiry and self.expiry_date.date() <= self.purchase_date.date():
+            QMessageBox.warning(self, "Error", "Expiry date must be after the purchase date")
+            return
+        
+        purchase = {
+            'product_name': self.product_name.text().strip(),
+            'barcode': self.barcode.text().strip(),
+            'supplier': self.suppliers.canonical(self.supplier.text()),
+            'quantity': self.quantity.value(),
+            'unit_cost': self.unit_cost.value(),
+            'payment_type': self.payment_type.currentText(),
+            'purchase_date': self.purchase_date.date().toString("yyyy-MM-dd"),
+            'category': self.category.currentText().strip() or None,
+            'batch_code': self.batch_code.text().strip() or None,
+            'expiry_date': self.expiry_date.date().toString("yyyy-MM-dd") if has_expiry else None,
+        }
+        
+        # Commit on the background writer so the window never blocks on disk I/O
+        self.save_btn.setEnabled(False)
+        get_write_queue().submit('purchase', purchase, gui_callback(self.on_purchase_saved))
+    
+    def on_purchase_saved(self, purchase, error):
+        self.save_btn.setEnabled(True)
+        if error is not None:
+            QMessageBox.critical(self, "Error", f"Failed to save purchase: {str(error)}")
+            return
+        
+        QMessageBox.information(self, "Success", "Purchase record saved successfully!")
+        self.close()
\ No newline at end of file
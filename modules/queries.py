@@ -0,0 +1,179 @@
+from modules.analytics import TREND_PERIODS, binned_sales, trend_columns
+from modules.archive import report_sources
+from modules.jobs import job_history, job_summary
+from modules.lots import expiring_lots
+from modules.payables import supplier_balances, supplier_costs
+from modules.receivables import aging_report
+
+PAGE_SIZE = 200  # rows per keyset page of a detail report
+
+# SQL issued by the Reports window. {sales} and {purchases} stand for the
+# table (or archive view) from archive.report_sources; detail queries also
+# take a {keyset} slot, empty for the first page and "AND <predicate>" after
+# it. python -m modules.query_plans checks every query in CATALOGUE.
+
+SALES_TOTALS = """
+    SELECT COUNT(*), SUM(total_amount), AVG(total_amount)
+    FROM {sales}
+    WHERE sale_date BETWEEN ? AND ?
+"""
+
+SALES_PAGE = """
+    SELECT s.sale_date, p.name, s.customer_name, s.quantity,
+           s.unit_price, s.total_amount, s.payment_type, s.id
+    FROM {sales} s
+    JOIN products p ON s.product_id = p.id
+    WHERE s.sale_date BETWEEN ? AND ? {keyset}
+    ORDER BY s.sale_date DESC, s.id DESC
+    LIMIT ?
+"""
+SALES_KEYSET = "(s.sale_date, s.id) < (?, ?)"
+
+PURCHASE_TOTALS = """
+    SELECT COUNT(*), SUM(total_cost), AVG(total_cost)
+    FROM {purchases}
+    WHERE purchase_date BETWEEN ? AND ?
+"""
+
+PURCHASE_PAGE = """
+    SELECT p.purchase_date, pr.name, p.supplier, p.quantity,
+           p.unit_cost, p.total_cost, p.payment_type, p.id
+    FROM {purchases} p
+    JOIN products pr ON p.product_id = pr.id
+    WHERE p.purchase_date BETWEEN ? AND ? {keyset}
+    ORDER BY p.purchase_date DESC, p.id DESC
+    LIMIT ?
+"""
+PURCHASE_KEYSET = "(p.purchase_date, p.id) < (?, ?)"
+
+STOCK_ROWS = """
+    SELECT name, stock_quantity, unit_price,
+           (stock_quantity * unit_price) as stock_value
+    FROM products
+    ORDER BY stock_quantity ASC
+"""
+
+STOCK_TOTALS = """
+    SELECT COUNT(*), SUM(stock_quantity), SUM(stock_quantity * unit_price)
+    FROM products
+"""
+
+SUMMARY_SALES = """
+    SELECT COUNT(*), COALESCE(SUM(total_amount), 0)
+    FROM {sales} WHERE sale_date BETWEEN ? AND ?
+"""
+
+SUMMARY_PURCHASES = """
+    SELECT COUNT(*), COALESCE(SUM(total_cost), 0)
+    FROM {purchases} WHERE purchase_date BETWEEN ? AND ?
+"""
+
+SUMMARY_PRODUCTS = """
+    SELECT COUNT(*), COALESCE(SUM(stock_quantity), 0)
+    FROM products
+"""
+
+TOP_PRODUCTS = """
+    SELECT p.name, SUM(s.quantity) as total_sold, SUM(s.total_amount) as revenue
+    FROM {sales} s
+    JOIN products p ON s.product_id = p.id
+    WHERE s.sale_date BETWEEN ? AND ?
+    GROUP BY p.name
+    ORDER BY total_sold DESC
+    LIMIT 5
+"""
+
+CHART_TOTALS = """
+    SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(revenue), 0), COALESCE(SUM(units), 0)
+    FROM daily_sales
+    WHERE day BETWEEN ? AND ?
+"""
+
+# Category roll-ups, each category counting its whole subtree; name_key
+# order lists every category right after its parent
+CATEGORY_SALES = """
+    SELECT c.full_name, c.depth, SUM(k.sales_count), SUM(k.units), SUM(k.revenue)
+    FROM category_sales k
+    JOIN categories c ON c.id = k.category_id
+    WHERE k.day BETWEEN ? AND ?
+    GROUP BY c.id
+    ORDER BY c.name_key
+"""
+
+CATEGORY_STOCK = """
+    SELECT c.full_name, c.depth, k.products, k.units, k.stock_value
+    FROM categories c
+    JOIN category_stock k ON k.category_id = c.id
+    ORDER BY c.name_key
+"""
+
+UNCATEGORISED_STOCK = """
+    SELECT COUNT(*), COALESCE(SUM(stock_quantity), 0), COALESCE(SUM(stock_quantity * unit_price), 0)
+    FROM products
+    WHERE category_id IS NULL
+"""
+
+CATALOGUE = {
+    'sales_totals': SALES_TOTALS,
+    'sales_page': SALES_PAGE,
+    'purchase_totals': PURCHASE_TOTALS,
+    'purchase_page': PURCHASE_PAGE,
+    'stock_rows': STOCK_ROWS,
+    'stock_totals': STOCK_TOTALS,
+    'summary_sales': SUMMARY_SALES,
+    'summary_purchases': SUMMARY_PURCHASES,
+    'summary_products': SUMMARY_PRODUCTS,
+    'top_products': TOP_PRODUCTS,
+    'chart_totals': CHART_TOTALS,
+    'category_sales': CATEGORY_SALES,
+    'category_stock': CATEGORY_STOCK,
+    'uncategorised_stock': UNCATEGORISED_STOCK,
+}
+
+KEYSETS = {'sales_page': SALES_KEYSET, 'purchase_page': PURCHASE_KEYSET}
+
+
+def page_query(query, sources, keyset=None):
+    """A detail query for the first page, or for the page after `keyset`"""
+    return query.format(keyset=f"AND {keyset}" if keyset else "", **sources)
+
+
+def run_report(conn, report_type, from_date, to_date):
+    """Issue the queries the Reports window runs to show `report_type`"""
+    sources = report_sources(conn, from_date, to_date)
+    dates = (from_date, to_date)
+    if report_type == "Sales Report":
+        conn.execute(SALES_TOTALS.format(**sources), dates).fetchone()
+        conn.execute(page_query(SALES_PAGE, sources), dates + (PAGE_SIZE,)).fetchall()
+    elif report_type == "Purchase Report":
+        conn.execute(PURCHASE_TOTALS.format(**sources), dates).fetchone()
+        conn.execute(page_query(PURCHASE_PAGE, sources), dates + (PAGE_SIZE,)).fetchall()
+    elif report_type == "Stock Report":
+        conn.execute(STOCK_ROWS).fetchall()
+        conn.execute(STOCK_TOTALS).fetchone()
+    elif report_type == "Summary Report":
+        conn.execute(SUMMARY_SALES.format(**sources), dates).fetchone()
+        conn.execute(SUMMARY_PURCHASES.format(**sources), dates).fetchone()
+        conn.execute(SUMMARY_PRODUCTS).fetchone()
+        conn.execute(TOP_PRODUCTS.format(**sources), dates).fetchall()
+    elif report_type in TREND_PERIODS:
+        trend_columns(conn, sources['sales'], TREND_PERIODS[report_type], from_date, to_date)
+    elif report_type == "Sales Charts":
+        conn.execute(CHART_TOTALS, dates).fetchone()
+        binned_sales(conn, from_date, to_date, 1)
+    elif report_type == "Category Sales":
+        conn.execute(CATEGORY_SALES, dates).fetchall()
+        conn.execute(CHART_TOTALS, dates).fetchone()
+    elif report_type == "Category Stock":
+        conn.execute(CATEGORY_STOCK).fetchall()
+        conn.execute(UNCATEGORISED_STOCK).fetchone()
+    elif report_type == "Expiring Stock":
+        expiring_lots(conn, to_date)
+    elif report_type == "Receivables Aging":
+        aging_report(conn, to_date)
+    elif report_type == "Supplier Payables":
+        supplier_balances(conn)
+        supplier_costs(conn)
+    elif report_type == "Maintenance Jobs":
+        job_summary(conn)
+        job_history(conn, limit=200)
@@ -0,0 +1,284 @@
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from modules.analytics import TREND_PERIODS
+from modules.archive import report_sources
+from modules.categories import resolve_category
+from modules.database import Database
+from modules.queries import CATALOGUE, KEYSETS, PAGE_SIZE, page_query, run_report
+
+# query: (index the plan must use, tables it may read in full, budget in ms on the seeded database)
+EXPECTATIONS = {
+    'sales_totals': ('idx_sales_date', (), 50),
+    'sales_page': ('idx_sales_date', (), 10),
+    'purchase_totals': ('idx_purchases_date', (), 10),
+    'purchase_page': ('idx_purchases_date', (), 10),
+    'stock_rows': (None, ('products',), 25),
+    'stock_totals': (None, ('products',), 10),
+    'summary_sales': ('idx_sales_date', (), 50),
+    'summary_purchases': ('idx_purchases_date', (), 10),
+    'summary_products': (None, ('products',), 10),
+    'top_products': ('idx_sales_date', (), 80),
+    'chart_totals': ('sqlite_autoindex_daily_sales_1', (), 5),
+    'category_sales': ('sqlite_autoindex_category_sales_1', (), 10),
+    'category_stock': (None, ('categories',), 10),
+    'uncategorised_stock': ('idx_products_category', (), 10),
+}
+
+# report type: (index one of its queries must use, budget in ms for the whole report)
+REPORTS = {
+    "Sales Report": ('idx_sales_date', 60),
+    "Purchase Report": ('idx_purchases_date', 20),
+    "Stock Report": (None, 25),
+    "Summary Report": ('idx_sales_date', 120),
+    **{report_type: ('idx_sales_date', 150) for report_type in TREND_PERIODS},
+    "Sales Charts": ('sqlite_autoindex_daily_sales_1', 10),
+    "Category Sales": ('sqlite_autoindex_category_sales_1', 20),
+    "Category Stock": ('idx_products_category', 20),
+    "Expiring Stock": ('idx_lots_expiry', 30),
+    "Receivables Aging": ('idx_sales_credit', 150),
+    "Supplier Payables": (None, 200),
+    "Maintenance Jobs": (None, 10),
+}
+HISTORY_TABLES = ('sales', 'purchases')  # grow without bound, so never read in full
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+TABLE_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|JOIN|ON|GROUP|ORDER|LIMIT|LEFT)(\w+))?",
+                         re.IGNORECASE)
+
+
+def seed_database(path, sales=200_000, purchases=20_000, products=2_000, customers=500, suppliers=40,
+                  brands=40, days=730, seed=7):
+    """A scratch database shaped like a busy shop: `days` of history up to today"""
+    rng = random.Random(seed)
+    db = Database(path)
+    db.init_database()
+    today = date.today()
+    day = lambda: (today - timedelta(days=rng.randrange(days))).isoformat()
+
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany("INSERT INTO products (name, stock_quantity, unit_price, barcode) VALUES (?, ?, ?, ?)",
+                       [(f"Product {i}", rng.randrange(500), rng.choice([8.0, 12.5, 20.0, 45.0]),
+                         f"89{i:011d}") for i in range(products)])
+    cursor.executemany("INSERT INTO customers (name, name_key) VALUES (?, ?)",
+                       [(f"Customer {i}", f"customer {i}") for i in range(customers)])
+    cursor.executemany("INSERT INTO suppliers (name, name_key) VALUES (?, ?)",
+                       [(f"Supplier {i}", f"supplier {i}") for i in range(suppliers)])
+
+    rows = []
+    for _ in range(sales):
+        quantity, price = rng.randint(1, 5), rng.choice([8.0, 12.5, 20.0, 45.0])
+        customer = rng.randrange(1, customers + 1)
+        rows.append((rng.randrange(1, products + 1), customer, f"Customer {customer - 1}", quantity, price,
+                     quantity * price, rng.choice(['Cash', 'Cash', 'Card', 'Credit']), day()))
+    cursor.executemany("""
+        INSERT INTO sales (product_id, customer_id, customer_name, quantity, unit_price, total_amount,
+                           payment_type, sale_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+    rows = []
+    for _ in range(purchases):
+        quantity, cost = rng.randint(10, 200), rng.choice([5.0, 9.0, 15.0, 30.0])
+        supplier = rng.randrange(1, suppliers + 1)
+        rows.append((rng.randrange(1, products + 1), supplier, f"Supplier {supplier - 1}", quantity, cost,
+                     quantity * cost, rng.choice(['Cash', 'Credit']), day()))
+    cursor.executemany("""
+        INSERT INTO purchases (product_id, supplier_id, supplier, quantity, unit_cost, total_cost,
+                               payment_type, purchase_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+    # Brand > type categories for nine products in ten, the rest left uncategorised
+    leaves = [resolve_category(cursor, f"Brand {b} > {kind}")[0]
+              for b in range(brands) for kind in ("Regular", "Lights", "Menthol")]
+    cursor.executemany("UPDATE products SET category_id = ? WHERE id = ?",
+                       [(rng.choice(leaves), i) for i in range(1, products + 1) if rng.random() < 0.9])
+
+    # A lot per purchase expiring within two years of it; nine in ten already sold out
+    cursor.execute("SELECT id, product_id, quantity, unit_cost, purchase_date FROM purchases")
+    cursor.executemany("""
+        INSERT INTO lots (product_id, purchase_id, batch_code, expiry_date, quantity_received,
+                          quantity_remaining, unit_cost, received_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(product_id, purchase_id, f"B{purchase_id}",
+           (date.fromisoformat(bought) + timedelta(days=rng.randrange(30, 730))).isoformat(),
+           quantity, quantity if rng.random() < 0.1 else 0, cost, bought)
+          for purchase_id, product_id, quantity, cost, bought in cursor.fetchall()])
+
+    db.rebuild_daily_sales(cursor)
+    db.rebuild_supplier_costs(cursor)
+    db.rebuild_category_aggregates(cursor)
+    for table, history, amount, party in (('customers', 'sales', 'total_amount', 'customer_id'),
+                                          ('suppliers', 'purchases', 'total_cost', 'supplier_id')):
+        cursor.execute(f"""
+            UPDATE {table} SET balance = (
+                SELECT COALESCE(SUM({amount}), 0) FROM {history}
+                WHERE {party} = {table}.id AND payment_type = 'Credit'
+            )
+        """)
+    conn.commit()
+    conn.close()
+    return db
+
+
+def plan_of(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def full_scans(sql, plan):
+    """Tables (not aliases) the plan reads from end to end"""
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    scanned = []
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match:
+            scanned.append(aliases.get(match.group(1).lower(), match.group(1).lower()))
+    return scanned
+
+
+def timed(conn, sql, params, runs=3):
+    """Median milliseconds to run a query and fetch every row"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def catalogue_cases(conn, from_date, to_date):
+    """(label, query name, sql, params) for every catalogue query, second pages included"""
+    sources = report_sources(conn, from_date, to_date)
+    dates = (from_date, to_date)
+    cases = []
+    for name, query in CATALOGUE.items():
+        if name in KEYSETS:
+            cases.append((name, name, page_query(query, sources), dates + (PAGE_SIZE,)))
+            cases.append((f"{name} (next page)", name, page_query(query, sources, KEYSETS[name]),
+                          dates + (to_date, 2 ** 62, PAGE_SIZE)))
+        elif '?' in query:
+            cases.append((name, name, query.format(**sources), dates))
+        else:
+            cases.append((name, name, query, ()))
+    return cases
+
+
+def check_catalogue(conn, from_date, to_date, budget_factor):
+    """Failure messages for catalogue queries that lost their index or their speed"""
+    failures = []
+    for label, name, sql, params in catalogue_cases(conn, from_date, to_date):
+        index, may_scan, budget_ms = EXPECTATIONS[name]
+        plan = plan_of(conn, sql, params)
+        problems = []
+        if index and not any(f"INDEX {index}" in detail for detail in plan):
+            problems.append(f"does not use {index}")
+        problems += [f"full scan of {table}" for table in full_scans(sql, plan) if table not in may_scan]
+        elapsed = timed(conn, sql, params)
+        if elapsed > budget_ms * budget_factor:
+            problems.append(f"{elapsed:.1f} ms over its {budget_ms * budget_factor:.0f} ms budget")
+        status = "FAIL" if problems else "ok"
+        print(f"  {status:<4} {label:<32} {elapsed:>8.2f} ms  {' | '.join(plan)}")
+        failures += [f"{label}: {problem}" for problem in problems]
+    return failures
+
+
+def check_reports(conn, from_date, to_date, budget_factor):
+    """Run every report type, EXPLAIN each statement it issued and time the whole report"""
+    failures = []
+    for report_type, (index, budget_ms) in REPORTS.items():
+        statements = []
+        conn.set_trace_callback(statements.append)
+        started = time.perf_counter()
+        try:
+            run_report(conn, report_type, from_date, to_date)
+        finally:
+            conn.set_trace_callback(None)
+        elapsed = (time.perf_counter() - started) * 1000
+
+        problems, used = [], False
+        for sql in statements:
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            plan = plan_of(conn, sql, ())
+            used = used or any(f"INDEX {index}" in detail for detail in plan)
+            scanned = [table for table in full_scans(sql, plan) if table in HISTORY_TABLES]
+            problems += [f"full scan of {table} in: {' '.join(sql.split())[:120]}" for table in scanned]
+        if index and not used:
+            problems.append(f"no query uses {index}")
+        if elapsed > budget_ms * budget_factor:
+            problems.append(f"{elapsed:.1f} ms over its {budget_ms * budget_factor:.0f} ms budget")
+        print(f"  {'FAIL' if problems else 'ok':<4} {report_type:<32} {elapsed:>8.2f} ms  "
+              f"{len(statements)} statement(s)")
+        failures += [f"{report_type}: {problem}" for problem in problems]
+    return failures
+
+
+def run_checks(db, days=30, budget_factor=1.0):
+    """Check plans and budgets before and after ANALYZE; returns failure messages.
+
+    Queries run for the Reports window's default range (the last `days`
+    days). Both passes matter: a new database has no planner statistics
+    until the optimize job has run.
+    """
+    to_date = date.today().isoformat()
+    from_date = (date.today() - timedelta(days=days)).isoformat()
+    conn = db.get_connection()
+    failures = []
+    try:
+        for stage in ("without statistics", "after ANALYZE"):
+            if stage == "after ANALYZE":
+                conn.execute("ANALYZE")
+                conn.commit()
+            print(f"Catalogue queries, {from_date} to {to_date}, {stage}:")
+            failures += [f"[{stage}] {failure}" for failure in
+                         check_catalogue(conn, from_date, to_date, budget_factor)]
+            print(f"Reports, {stage}:")
+            failures += [f"[{stage}] {failure}" for failure in
+                         check_reports(conn, from_date, to_date, budget_factor)]
+    finally:
+        conn.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check report query plans and timings on a seeded database")
+    parser.add_argument("--sales", type=int, default=200_000, help="sales rows to seed")
+    parser.add_argument("--purchases", type=int, default=20_000, help="purchase rows to seed")
+    parser.add_argument("--products", type=int, default=2_000, help="products to seed")
+    parser.add_argument("--days", type=int, default=30, help="report range to check, ending today")
+    parser.add_argument("--budget-factor", type=float, default=1.0,
+                        help="multiply every time budget (e.g. 3 on a slow machine)")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="query_plans_")
+    try:
+        started = time.perf_counter()
+        db = seed_database(os.path.join(folder, "plans.db"), sales=args.sales, purchases=args.purchases,
+                           products=args.products)
+        print(f"Seeded {args.sales} sales, {args.purchases} purchases, {args.products} products "
+              f"in {time.perf_counter() - started:.1f}s")
+        failures = run_checks(db, args.days, args.budget_factor)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll report queries use their expected plans within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+import argparse
+from datetime import date
+from modules.archive import report_sources
+from modules.database import Database
+
+# Aging buckets as (label, oldest age in days, or None for open-ended)
+AGING_BUCKETS = [
+    ("0-30 days", 30),
+    ("31-60 days", 60),
+    ("61-90 days", 90),
+    ("90+ days", None),
+]
+
+# Balances closer than this to each other are treated as equal
+TOLERANCE = 0.005
+
+
+def all_history(conn, as_of=None):
+    """Sales source spanning every archived year up to as_of"""
+    return report_sources(conn, "0001-01-01", as_of or date.today().isoformat())['sales']
+
+
+def customer_balance(conn, customer_id):
+    """Outstanding balance straight from the maintained column"""
+    row = conn.execute("SELECT balance FROM customers WHERE id = ?", (customer_id,)).fetchone()
+    return row[0] if row else 0.0
+
+
+def aging_report(conn, as_of=None):
+    """Split every outstanding balance into age buckets as of a date.
+
+    Credit sales are summed per (customer, bucket) in one grouped pass.
+    Payments are taken to settle the oldest sales first, so each balance
+    is then allocated to that customer's buckets newest first. Returns
+    a list of {'customer_id', 'name', 'balance', 'buckets'} dicts, largest
+    balance first.
+    """
+    as_of = as_of or date.today().isoformat()
+    sales = all_history(conn, as_of)
+    limits = [limit for _, limit in AGING_BUCKETS if limit is not None]
+    bucket_case = " ".join(f"WHEN age <= {limit} THEN {index}" for index, limit in enumerate(limits))
+
+    cursor = conn.execute(f"""
+        SELECT customer_id, CASE {bucket_case} ELSE {len(limits)} END AS bucket, SUM(total_amount)
+        FROM (
+            SELECT customer_id, total_amount, julianday(?) - julianday(sale_date) AS age
+            FROM {sales}
+            WHERE payment_type = 'Credit' AND sale_date <= ?
+              AND customer_id IN (SELECT id FROM customers WHERE balance > ?)
+        )
+        GROUP BY customer_id, bucket
+    """, (as_of, as_of, TOLERANCE))
+    credit = {}
+    for customer_id, bucket, amount in cursor:
+        credit.setdefault(customer_id, [0.0] * len(AGING_BUCKETS))[bucket] = amount
+
+    rows = []
+    for customer_id, name, balance in conn.execute(
+            "SELECT id, name, balance FROM customers WHERE balance > ? ORDER BY balance DESC",
+            (TOLERANCE,)):
+        buckets = [0.0] * len(AGING_BUCKETS)
+        remaining = balance
+        for index, amount in enumerate(credit.get(customer_id, [0.0] * len(AGING_BUCKETS))):
+            buckets[index] = min(amount, remaining)
+            remaining -= buckets[index]
+        # Anything not explained by credit sales (e.g. an opening balance) counts as oldest
+        buckets[-1] += remaining
+        rows.append({'customer_id': customer_id, 'name': name, 'balance': balance, 'buckets': buckets})
+    return rows
+
+
+def check_balances(conn, repair=False):
+    """Recompute every balance from the ledger and compare with the stored one.
+
+    One grouped pass over credit sales (including archives) and payments
+    rebuilds all balances. Runs inside an immediate transaction so the
+    writer cannot change balances mid-check; with repair=True mismatches
+    are corrected in the same transaction. Returns a list of
+    (customer_id, name, stored, computed) mismatches.
+    """
+    conn.isolation_level = None
+    sales = all_history(conn)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        mismatches = conn.execute(f"""
+            SELECT c.id, c.name, c.balance, COALESCE(ledger.owed, 0)
+            FROM customers c
+            LEFT JOIN (
+                SELECT customer_id, SUM(amount) AS owed
+                FROM (
+                    SELECT customer_id, total_amount AS amount FROM {sales} WHERE payment_type = 'Credit'
+                    UNION ALL
+                    SELECT customer_id, -amount FROM customer_payments
+                )
+                GROUP BY customer_id
+            ) ledger ON ledger.customer_id = c.id
+            WHERE abs(c.balance - COALESCE(ledger.owed, 0)) > ?
+            ORDER BY c.name
+        """, (TOLERANCE,)).fetchall()
+
+        if repair and mismatches:
+            conn.executemany("UPDATE customers SET balance = ? WHERE id = ?",
+                             [(computed, customer_id) for customer_id, _, _, computed in mismatches])
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer receivables: aging and balance checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check_cmd = commands.add_parser("check", help="verify stored balances against the ledger")
+    check_cmd.add_argument("--repair", action="store_true", help="overwrite wrong balances")
+    aging_cmd = commands.add_parser("aging", help="print the aging report")
+    aging_cmd.add_argument("--as-of", help="YYYY-MM-DD (default: today)")
+    args = parser.parse_args()
+
+    db = Database()
+    conn = db.get_connection()
+    if args.command == "check":
+        mismatches = check_balances(conn, repair=args.repair)
+        for customer_id, name, stored, computed in mismatches:
+            print(f"{name} (#{customer_id}): stored Rs.{stored:.2f}, ledger Rs.{computed:.2f}")
+        if not mismatches:
+            print("All customer balances match the ledger")
+        elif args.repair:
+            print(f"Repaired {len(mismatches)} balance(s)")
+    else:
+        print(f"{'Customer':<30}{'Balance':>12}" + "".join(f"{label:>14}" for label, _ in AGING_BUCKETS))
+        for row in aging_report(conn, args.as_of):
+            print(f"{row['name']:<30}{row['balance']:>12.2f}"
+                  + "".join(f"{amount:>14.2f}" for amount in row['buckets']))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
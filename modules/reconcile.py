@@ -0,0 +1,137 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, datetime
+from modules.archive import report_sources
+from modules.database import Database
+from modules.event_payloads import product_change
+from modules.lots import adjust_lots
+
+
+def find_discrepancies(conn):
+    """Compare every product's stock counter with the stock its history implies.
+
+    Expected stock is purchases minus sales (archives included), computed
+    in a single set-based pass: both histories are reduced per product
+    through their (product_id, quantity) covering indexes and joined to
+    products. Everything is read in one snapshot, so the counters and the
+    history agree with each other even while sales keep coming in.
+    Returns a list of (product_id, name, stock_quantity, expected) tuples.
+    """
+    sources = report_sources(conn, "0001-01-01", date.today().isoformat())
+    conn.execute("BEGIN")
+    try:
+        return conn.execute(f"""
+            SELECT p.id, p.name, p.stock_quantity, COALESCE(bought.units, 0) - COALESCE(sold.units, 0)
+            FROM products p
+            LEFT JOIN (SELECT product_id, SUM(quantity) AS units FROM {sources['purchases']}
+                       GROUP BY product_id) bought ON bought.product_id = p.id
+            LEFT JOIN (SELECT product_id, SUM(quantity) AS units FROM {sources['sales']}
+                       GROUP BY product_id) sold ON sold.product_id = p.id
+            WHERE p.stock_quantity != COALESCE(bought.units, 0) - COALESCE(sold.units, 0)
+            ORDER BY p.name
+        """).fetchall()
+    finally:
+        conn.execute("COMMIT")
+
+
+def repair_discrepancies(conn, discrepancies):
+    """Correct the counters, and the lots behind them, in one short write transaction.
+
+    Each product is moved by the difference measured in the snapshot
+    rather than overwritten, so sales committed since the check are kept.
+    Returns the product change dicts to publish on the change bus.
+    """
+    changes = []
+    adjusted = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.cursor()
+        for product_id, name, stock, expected in discrepancies:
+            conn.execute("UPDATE products SET stock_quantity = stock_quantity + ? WHERE id = ?",
+                         (expected - stock, product_id))
+            adjust_lots(cursor, product_id, expected - stock, adjusted)
+            row = conn.execute("SELECT stock_quantity, unit_price, barcode FROM products WHERE id = ?",
+                               (product_id,)).fetchone()
+            changes.append(product_change(product_id, name, row[0], expected - stock, row[1],
+                                          barcode=row[2]))
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    return changes
+
+
+def reconcile_stock(db=None, repair=False):
+    """Run the check (and optional repair); returns (discrepancies, changes, seconds)"""
+    db = db or Database()
+    started = time.perf_counter()
+    conn = db.get_connection()
+    conn.isolation_level = None  # transactions are managed explicitly
+    try:
+        discrepancies = find_discrepancies(conn)
+        changes = repair_discrepancies(conn, discrepancies) if repair and discrepancies else []
+    finally:
+        conn.close()
+    return discrepancies, changes, time.perf_counter() - started
+
+
+def format_discrepancies(discrepancies):
+    lines = [f"{name} (#{product_id}): counter {stock}, history says {expected} ({expected - stock:+d})"
+             for product_id, name, stock, expected in discrepancies]
+    return "\n".join(lines) or "All stock counters match purchase/sale history"
+
+
+def benchmark(transactions=10_000_000, products=500):
+    """Time a full check over a synthetic history of `transactions` rows"""
+    folder = tempfile.mkdtemp(prefix="reconcile_bench_")
+    db = Database(os.path.join(folder, "bench.db"))
+    db.init_database()
+
+    conn = db.get_connection()
+    conn.executemany("INSERT INTO products (name, stock_quantity) VALUES (?, 0)",
+                     [(f"Product {i}",) for i in range(products)])
+    purchases = transactions // 10
+    conn.executemany("""
+        INSERT INTO purchases (product_id, supplier, quantity, unit_cost, total_cost, payment_type, purchase_date)
+        VALUES (?, 'Bench', ?, 1, ?, 'Cash', '2025-01-01')
+    """, ((random.randint(1, products), 100, 100) for _ in range(purchases)))
+    conn.executemany("""
+        INSERT INTO sales (product_id, customer_name, quantity, unit_price, total_amount, payment_type, sale_date)
+        VALUES (?, 'Walk-in', ?, 1, ?, 'Cash', '2025-06-01')
+    """, ((random.randint(1, products), 1, 1) for _ in range(transactions - purchases)))
+    conn.commit()
+    conn.close()
+
+    size_mb = os.path.getsize(db.db_name) / (1024 * 1024)
+    print(f"History: {transactions} transactions, {products} products, {size_mb:.0f} MB")
+    discrepancies, changes, seconds = reconcile_stock(db, repair=True)
+    print(f"  Check + repair of {len(discrepancies)} products: {seconds:.2f}s")
+    discrepancies, _, seconds = reconcile_stock(db)
+    print(f"  Re-check: {len(discrepancies)} discrepancies in {seconds:.2f}s")
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit product stock counters against purchase/sale history")
+    parser.add_argument("--repair", action="store_true", help="correct the counters that drifted")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark on N synthetic transactions instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench)
+        return
+
+    discrepancies, changes, seconds = reconcile_stock(repair=args.repair)
+    print(format_discrepancies(discrepancies))
+    if changes:
+        print(f"Repaired {len(changes)} product(s)")
+    print(f"Finished in {seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
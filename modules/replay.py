@@ -0,0 +1,228 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from modules.api_loadtest import percentile
+from modules.config import add_arguments, configure
+from modules.database import Database
+from modules.queries import run_report
+from modules.transactions import TransactionError
+from modules.workload import load_workload
+from modules.writer import WriteQueue
+
+WRITER_TOTALS = ('commits', 'commands', 'failed_commits', 'journalled', 'lock_wait_ms', 'total_commit_ms')
+
+
+def copy_database(source_path, folder):
+    """Online copy of the database (and any year archives) to replay against"""
+    path = os.path.join(folder, os.path.basename(source_path))
+    src = sqlite3.connect(source_path)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+        archives = dst.execute("SELECT path FROM archives").fetchall() if dst.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='archives'").fetchone() else []
+    finally:
+        src.close()
+        dst.close()
+    source_dir = os.path.dirname(os.path.abspath(source_path))
+    for archive_path, in archives:
+        archive_file = os.path.join(source_dir, os.path.basename(archive_path))
+        if os.path.exists(archive_file):
+            shutil.copy2(archive_file, os.path.join(folder, os.path.basename(archive_path)))
+    return path
+
+
+def scale_workload(operations, repeat):
+    """The log played `repeat` times back to back"""
+    if repeat <= 1 or not operations:
+        return operations
+    span = operations[-1][0] + 1.0
+    return [(offset + span * i, kind, data) for i in range(repeat) for offset, kind, data in operations]
+
+
+class Cashier(threading.Thread):
+    """Replays its share of the log through the same write path as the windows"""
+
+    def __init__(self, db, write_queue, operations, started, speed):
+        super().__init__(daemon=True)
+        self.db = db
+        self.write_queue = write_queue
+        self.operations = operations
+        self.started = started
+        self.speed = speed
+        self.latencies = {}
+        self.outcomes = Counter()
+
+    def run(self):
+        conn = self.db.get_connection()
+        try:
+            for offset, kind, data in self.operations:
+                if self.speed:
+                    delay = self.started + offset / self.speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                began = time.perf_counter()
+                status = self.report(conn, data) if kind == 'report' else self.save(kind, data)
+                self.latencies.setdefault(kind, []).append((time.perf_counter() - began) * 1000)
+                self.outcomes[kind, status] += 1
+        finally:
+            conn.close()
+
+    def report(self, conn, data):
+        try:
+            run_report(conn, data['report_type'], data['from_date'], data['to_date'])
+        except sqlite3.Error as e:
+            print(f"Debug - replayed report failed: {e}")
+            return 'error'
+        return 'ok'
+
+    def save(self, kind, data):
+        if kind == 'sale':
+            data = dict(data, txn_id=uuid.uuid4().hex)
+        done = threading.Event()
+        outcome = {}
+
+        def saved(record, error):
+            outcome['record'], outcome['error'] = record, error
+            done.set()
+
+        self.write_queue.submit(kind, data, saved)
+        done.wait()
+        error = outcome['error']
+        if error is None:
+            return 'journalled' if outcome['record'] and outcome['record'].get('offline') else 'ok'
+        return 'rejected' if isinstance(error, (TransactionError, sqlite3.IntegrityError)) else 'error'
+
+
+def writer_totals(metrics):
+    totals = {name: metrics[name] for name in WRITER_TOTALS}
+    totals['max_lock_wait_ms'] = metrics['max_lock_wait_ms']
+    totals['max_commit_ms'] = metrics['max_commit_ms']
+    return totals
+
+
+def run_terminal(db_path, operations, cashiers, speed, start_at=None):
+    """One till process: a writer plus `cashiers` threads sharing it.
+
+    Returns (latencies by kind, outcome counts, writer totals). start_at is
+    a time.time() at which processes started together begin replaying.
+    """
+    db = Database(db_path)
+    # Terminals replaying side by side must not share an offline journal
+    db.journal_path = os.path.join(os.path.dirname(db_path), f"replay_{os.getpid()}_sales.journal")
+    write_queue = WriteQueue(db)
+    if start_at:
+        time.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    threads = [Cashier(db, write_queue, operations[i::cashiers], started, speed) for i in range(cashiers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_queue.stop()
+
+    latencies, outcomes = {}, Counter()
+    for thread in threads:
+        for kind, samples in thread.latencies.items():
+            latencies.setdefault(kind, []).extend(samples)
+        outcomes.update(thread.outcomes)
+    return latencies, outcomes, writer_totals(write_queue.metrics())
+
+
+def replay(db_path, operations, cashiers=4, processes=False, speed=0.0):
+    """Replay operations against db_path with `cashiers` simulated tills.
+
+    With processes=False the cashiers are threads sharing one writer,
+    like windows in a single app; with processes=True every cashier is a
+    separate terminal process with its own writer, so they contend for
+    the SQLite write lock the way several tills on one file would.
+    Returns (latencies by kind, outcome counts, writer totals, seconds).
+    """
+    started = time.perf_counter()
+    if not processes:
+        latencies, outcomes, writer = run_terminal(db_path, operations, cashiers, speed)
+        return latencies, outcomes, [writer], time.perf_counter() - started
+
+    latencies, outcomes, writers = {}, Counter(), []
+    start_at = time.time() + 1.0  # give every process time to open the database
+    with ProcessPoolExecutor(max_workers=cashiers) as pool:
+        futures = [pool.submit(run_terminal, db_path, operations[i::cashiers], 1, speed, start_at)
+                   for i in range(cashiers)]
+        for future in futures:
+            terminal_latencies, terminal_outcomes, writer = future.result()
+            for kind, samples in terminal_latencies.items():
+                latencies.setdefault(kind, []).extend(samples)
+            outcomes.update(terminal_outcomes)
+            writers.append(writer)
+    return latencies, outcomes, writers, time.perf_counter() - started - 1.0
+
+
+def format_results(latencies, outcomes, writers, elapsed, cashiers, processes):
+    total = sum(len(samples) for samples in latencies.values())
+    every = [ms for samples in latencies.values() for ms in samples]
+    mode = "processes" if processes else "threads"
+    lines = [
+        f"{total} operations in {elapsed:.1f}s with {cashiers} cashiers ({mode}): {total / elapsed:.0f} ops/s",
+        f"  all: p50 {percentile(every, 50):.2f} ms, p95 {percentile(every, 95):.2f} ms, "
+        f"p99 {percentile(every, 99):.2f} ms, max {max(every, default=0):.2f} ms",
+    ]
+    for kind, samples in sorted(latencies.items()):
+        statuses = ", ".join(f"{status} {count}" for (op, status), count in sorted(outcomes.items())
+                             if op == kind)
+        lines.append(f"  {kind}: {len(samples)} ({statuses}), {len(samples) / elapsed:.1f}/s, "
+                     f"p50 {percentile(samples, 50):.2f} ms, p95 {percentile(samples, 95):.2f} ms, "
+                     f"p99 {percentile(samples, 99):.2f} ms, max {max(samples):.2f} ms")
+
+    totals = {name: sum(writer[name] for writer in writers) for name in WRITER_TOTALS}
+    commits = totals['commits'] or 1
+    lines.append(f"  writer: {totals['commands']} commands in {totals['commits']} commits "
+                 f"(avg batch {totals['commands'] / commits:.1f}, avg commit {totals['total_commit_ms'] / commits:.2f} ms, "
+                 f"max {max(writer['max_commit_ms'] for writer in writers):.1f} ms)")
+    lines.append(f"  lock waits: {totals['lock_wait_ms']:.0f} ms total, avg {totals['lock_wait_ms'] / commits:.2f} ms "
+                 f"per commit, max {max(writer['max_lock_wait_ms'] for writer in writers):.1f} ms; "
+                 f"{totals['failed_commits']} commit(s) failed, {totals['journalled']} sale(s) journalled")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded workload against a copy of the database")
+    add_arguments(parser)
+    parser.add_argument("log", help="workload log written by main.py --record-workload")
+    parser.add_argument("--cashiers", type=int, default=4, help="simulated tills replaying in parallel")
+    parser.add_argument("--processes", action="store_true",
+                        help="one process (and writer) per cashier instead of threads sharing a writer")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="replay at this multiple of the recorded pace (default 0: as fast as possible)")
+    parser.add_argument("--repeat", type=int, default=1, help="play the log this many times back to back")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch copy of the database")
+    args = parser.parse_args()
+    settings = configure(db=args.db, data_dir=args.data_dir, memory=args.memory)
+    if not settings.persistent:
+        parser.error("replay needs a database file to copy (memory mode has none)")
+
+    operations = scale_workload(load_workload(args.log), args.repeat)
+    if not operations:
+        parser.error(f"no operations in {args.log}")
+
+    folder = tempfile.mkdtemp(prefix="replay_")
+    try:
+        db_path = copy_database(settings.db_path, folder)
+        Database(db_path).init_database()
+        print(f"Replaying {len(operations)} operations against a copy in {folder}")
+        latencies, outcomes, writers, elapsed = replay(db_path, operations, args.cashiers, args.processes,
+                                                       args.speed)
+        print(format_results(latencies, outcomes, writers, elapsed, args.cashiers, args.processes))
+    finally:
+        if not args.keep:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
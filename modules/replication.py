@@ -0,0 +1,446 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from modules.changelog import get_state, is_logged, node_id, set_state
+from modules.config import add_arguments, configure, read_config_file
+from modules.database import Database
+from modules.party_store import resolve_party
+from modules.transactions import (TransactionError, record_sale, record_purchase, record_payment,
+                                  record_supplier_payment)
+
+BATCH_SIZE = 500
+CHANGE_FIELDS = ('change_id', 'origin', 'kind', 'product', 'payload', 'created_at')
+
+
+def pack(changes):
+    """Compressed wire format of a list of change rows"""
+    return zlib.compress(json.dumps(changes, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+def hub_url_setting(url=None):
+    """Hub address: --hub, then TOBACCO_HUB_URL, then [replication] hub_url in the config file"""
+    return (url or os.environ.get("TOBACCO_HUB_URL")
+            or read_config_file(section="replication").get("hub_url"))
+
+
+# Applying changes from other terminals
+
+def apply_change(cursor, change):
+    """Replay one remote change through the normal record_* functions.
+
+    Conflict rules:
+      * stock moves by the remote quantity (stock is the sum of every
+        terminal's deltas, so concurrent sales of the same item both
+        count); remote sales have already happened, so they are applied
+        even when this terminal's counter would go negative;
+      * the product price follows the newest purchase across all
+        terminals (last writer wins on created_at, then origin);
+      * a product or customer unknown here is created on the fly.
+    Returns (kind, result) in the shape WriteQueue.publish expects, or
+    None when the change was already applied.
+    """
+    change_id, origin, kind, product, payload, created_at = change
+    if is_logged(cursor, change_id):
+        return None
+
+    data = json.loads(payload)
+    data['change'] = {'change_id': change_id, 'origin': origin, 'created_at': created_at}
+
+    if kind == 'sale':
+        cursor.execute("SELECT 1 FROM products WHERE name = ?", (product,))
+        if not cursor.fetchone():
+            cursor.execute("INSERT INTO products (name, stock_quantity, unit_price) VALUES (?, 0, ?)",
+                           (product, data['unit_price']))
+        return kind, record_sale(cursor, data, enforce_stock=False)
+
+    if kind == 'purchase':
+        try:
+            cursor.execute("SAVEPOINT remote_purchase")
+            result = record_purchase(cursor, data)
+            cursor.execute("RELEASE remote_purchase")
+        except sqlite3.IntegrityError:
+            # The barcode is already taken by another product here; keep the stock
+            cursor.execute("ROLLBACK TO remote_purchase")
+            cursor.execute("RELEASE remote_purchase")
+            data.pop('barcode', None)
+            result = record_purchase(cursor, data)
+
+        cursor.execute("""
+            SELECT payload FROM changelog
+            WHERE kind = 'purchase' AND product = ? AND (created_at, origin) > (?, ?)
+            ORDER BY created_at DESC, origin DESC LIMIT 1
+        """, (product, created_at, origin))
+        newer = cursor.fetchone()
+        if newer:
+            # A later purchase already set the price; keep it
+            unit_price = json.loads(newer[0])['unit_cost']
+            cursor.execute("UPDATE products SET unit_price = ? WHERE name = ?", (unit_price, product))
+            result[1]['unit_price'] = unit_price
+        return kind, result
+
+    if kind == 'payment':
+        resolve_party(cursor, 'customers', data['customer_name'])
+        return kind, record_payment(cursor, data)
+
+    if kind == 'supplier_payment':
+        resolve_party(cursor, 'suppliers', data['supplier'])
+        return kind, record_supplier_payment(cursor, data)
+
+    raise TransactionError(f"Unknown change kind: {kind}")
+
+
+def apply_remote_changes(cursor, batch):
+    """Write-queue handler: apply a pulled batch and advance the pull position.
+
+    batch is {'hub_seq': last hub sequence number, 'changes': [...]}. The
+    position is stored in the same transaction as the changes, so a batch
+    is applied exactly once even if the terminal crashes mid-sync.
+    Returns (summary, product changes).
+    """
+    summary = {'applied': 0, 'skipped': 0, 'rejected': 0, 'oversold': []}
+    product_changes = []
+    for change in batch['changes']:
+        cursor.execute("SAVEPOINT remote_change")
+        try:
+            result = apply_change(cursor, change)
+            cursor.execute("RELEASE remote_change")
+        except (TransactionError, sqlite3.IntegrityError, KeyError, ValueError) as e:
+            # One bad change must not hold up the rest of the shop's changes
+            cursor.execute("ROLLBACK TO remote_change")
+            cursor.execute("RELEASE remote_change")
+            print(f"Debug - rejected replicated change {change[0]}: {e}")
+            summary['rejected'] += 1
+            continue
+        if result is None or result[1] is None:
+            summary['skipped'] += 1
+            continue
+        summary['applied'] += 1
+        record, product_change = result[1]
+        if product_change is not None:
+            product_changes.append(product_change)
+            if product_change['stock_quantity'] < 0:
+                summary['oversold'].append(product_change['name'])
+    set_state(cursor, 'hub_seq', batch['hub_seq'])
+    return summary, product_changes
+
+
+# Hub stand-in
+
+class HubStore:
+    """Central change store: every terminal's changes in arrival order"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                change_id TEXT NOT NULL UNIQUE,
+                origin TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                product TEXT,
+                payload TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self.conn.commit()
+
+    def push(self, changes):
+        """Store a batch; re-sent changes are ignored. Returns how many were new."""
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.executemany(f"""
+                INSERT OR IGNORE INTO changes ({', '.join(CHANGE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)
+            """, changes)
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def pull(self, after, origin, limit=BATCH_SIZE):
+        """(last seq, changes) after `after` that did not come from `origin`"""
+        with self.lock:
+            rows = self.conn.execute(f"""
+                SELECT seq, {', '.join(CHANGE_FIELDS)} FROM changes
+                WHERE seq > ? AND origin != ? ORDER BY seq LIMIT ?
+            """, (after, origin, limit)).fetchall()
+        last = rows[-1][0] if rows else after
+        return last, [list(row[1:]) for row in rows]
+
+
+class HubHandler(BaseHTTPRequestHandler):
+    """POST /push with a packed batch; GET /pull?after=N&origin=ID returns one"""
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/push':
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            stored = self.server.store.push(unpack(body))
+        except (ValueError, zlib.error, sqlite3.Error) as e:
+            self.send_error(400, str(e))
+            return
+        self.reply({'stored': stored})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/pull':
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        last, changes = self.server.store.pull(int(query.get('after', ['0'])[0]),
+                                               query.get('origin', [''])[0])
+        self.reply({'hub_seq': last, 'changes': changes})
+
+    def reply(self, payload):
+        data = pack(payload)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_hub(path, host="127.0.0.1", port=8766):
+    """Run a hub in a background thread; returns the HTTP server"""
+    server = ThreadingHTTPServer((host, port), HubHandler)
+    server.store = HubStore(path)
+    threading.Thread(target=server.serve_forever, name="sync-hub", daemon=True).start()
+    return server
+
+
+# Terminal side
+
+class SyncEngine:
+    """Ships this terminal's changelog to the hub and applies everyone else's.
+
+    Selling never waits for the network: record_* only appends to the
+    local changelog. Every `interval` seconds (or on wake()) the engine
+    pushes unsent local changes in compressed batches and pulls remote
+    ones, which are applied through the write queue like any other write.
+    Pushes and pulls are idempotent on change_id, so a failed round is
+    simply retried.
+    """
+
+    def __init__(self, hub_url, db=None, write_queue=None, interval=5, timeout=10, apply_timeout=60):
+        self.hub_url = hub_url.rstrip('/')
+        self.db = db or Database()
+        self.write_queue = write_queue
+        self.interval = interval
+        self.timeout = timeout
+        self.apply_timeout = apply_timeout
+        self.stopped = threading.Event()
+        self.woken = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="sync", daemon=True)
+        self.stats = {'pushed': 0, 'pulled': 0, 'bytes_sent': 0, 'bytes_received': 0,
+                      'rounds': 0, 'last_round_ms': 0.0, 'oversold': []}
+        conn = self.db.get_connection()
+        self.node = node_id(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.woken.set()
+
+    def wake(self, *args):
+        """Sync now instead of waiting for the timer (e.g. after a sale)"""
+        self.woken.set()
+
+    def run(self):
+        offline = False
+        while not self.stopped.is_set():
+            try:
+                self.sync_once()
+                if offline:
+                    print(f"Sync with {self.hub_url} resumed")
+                offline = False
+            except (OSError, urllib.error.URLError, sqlite3.Error) as e:
+                # Keep selling locally; report once rather than every round
+                if not offline:
+                    print(f"Sync with {self.hub_url} deferred: {e}")
+                offline = True
+            self.woken.wait(self.interval)
+            self.woken.clear()
+
+    def request(self, method, path, data=None):
+        request = urllib.request.Request(self.hub_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/octet-stream'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        self.stats['bytes_received'] += len(body)
+        return unpack(body)
+
+    def sync_once(self):
+        """One push + pull round; returns (pushed, pulled)"""
+        started = time.perf_counter()
+        pushed, pulled = self.push(), self.pull()
+        self.stats['rounds'] += 1
+        self.stats['last_round_ms'] = (time.perf_counter() - started) * 1000
+        return pushed, pulled
+
+    def push(self):
+        conn = self.db.get_connection()
+        pushed = 0
+        try:
+            cursor = conn.cursor()
+            while True:
+                sent = int(get_state(cursor, 'pushed_seq', 0))
+                cursor.execute(f"""
+                    SELECT seq, {', '.join(CHANGE_FIELDS)} FROM changelog
+                    WHERE origin = ? AND seq > ? ORDER BY seq LIMIT ?
+                """, (self.node, sent, BATCH_SIZE))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                data = pack([list(row[1:]) for row in rows])
+                self.request('POST', '/push', data)
+                self.stats['bytes_sent'] += len(data)
+                set_state(cursor, 'pushed_seq', rows[-1][0])
+                conn.commit()
+                pushed += len(rows)
+        finally:
+            conn.close()
+        self.stats['pushed'] += pushed
+        return pushed
+
+    def pull(self):
+        pulled = 0
+        while True:
+            conn = self.db.get_connection()
+            try:
+                after = int(get_state(conn.cursor(), 'hub_seq', 0))
+            finally:
+                conn.close()
+            batch = self.request('GET', f"/pull?after={after}&origin={self.node}")
+            if not batch['changes']:
+                break
+            summary = self.apply(batch)
+            pulled += summary['applied']
+            self.stats['oversold'] = summary['oversold'] or self.stats['oversold']
+            if len(batch['changes']) < BATCH_SIZE:
+                break
+        self.stats['pulled'] += pulled
+        return pulled
+
+    def apply(self, batch):
+        """Apply a pulled batch on the writer thread (or directly when there is none)"""
+        if self.write_queue is None:
+            conn = self.db.get_connection()
+            conn.isolation_level = None
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                summary, _ = apply_remote_changes(conn.cursor(), batch)
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+            return summary
+
+        done = threading.Event()
+        outcome = {}
+
+        def callback(result, error):
+            outcome['result'], outcome['error'] = result, error
+            done.set()
+
+        self.write_queue.submit('replicated', batch, callback)
+        if not done.wait(self.apply_timeout):
+            # A stuck writer must not stall syncing for good. The round fails
+            # and the batch is pulled again next time; if the queued copy
+            # commits meanwhile, the repeat is skipped on change_id.
+            raise TimeoutError(f"Writer did not apply the pulled batch within {self.apply_timeout}s")
+        if outcome['error'] is not None:
+            raise outcome['error']
+        return outcome['result']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replicate sales, purchases and payments between terminals")
+    add_arguments(parser)
+    commands = parser.add_subparsers(dest="command", required=True)
+    hub_cmd = commands.add_parser("hub", help="run a hub that terminals sync through")
+    hub_cmd.add_argument("--store", default="hub.db", help="hub change store")
+    hub_cmd.add_argument("--host", default="127.0.0.1")
+    hub_cmd.add_argument("--port", type=int, default=8766)
+    sync_cmd = commands.add_parser("sync", help="push and pull once (or keep syncing with --watch)")
+    sync_cmd.add_argument("--hub", help="hub URL (default: $TOBACCO_HUB_URL or [replication] hub_url)")
+    sync_cmd.add_argument("--watch", type=float, metavar="SECONDS", help="keep syncing at this interval")
+    commands.add_parser("status", help="show this terminal's node id and sync position")
+    commands.add_parser("new-node", help="give a database copied from another terminal its own node id")
+    args = parser.parse_args()
+    configure(db=args.db, data_dir=args.data_dir, memory=args.memory)
+
+    if args.command == "hub":
+        server = start_hub(args.store, args.host, args.port)
+        print(f"Hub listening on http://{args.host}:{args.port} (store: {args.store})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    db = Database()
+    db.init_database()
+    if args.command == "new-node":
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        # The copied changelog is already on the hub under the old id
+        cursor.execute("DELETE FROM sync_state WHERE key = 'node_id'")
+        set_state(cursor, 'pushed_seq', cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM changelog").fetchone()[0])
+        print(f"New node id: {node_id(cursor)}")
+        conn.commit()
+        conn.close()
+        return
+
+    if args.command == "status":
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        node = node_id(cursor)
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM changelog WHERE origin = ? AND seq > ?",
+                       (node, int(get_state(cursor, 'pushed_seq', 0))))
+        print(f"Node {node}: {cursor.fetchone()[0]} local change(s) not yet pushed, "
+              f"pulled up to hub seq {get_state(cursor, 'hub_seq', 0)}")
+        conn.close()
+        return
+
+    hub_url = hub_url_setting(args.hub)
+    if not hub_url:
+        parser.error("no hub configured (use --hub, TOBACCO_HUB_URL or [replication] hub_url)")
+    engine = SyncEngine(hub_url, db)
+    while True:
+        pushed, pulled = engine.sync_once()
+        print(f"Pushed {pushed}, applied {pulled} change(s) in {engine.stats['last_round_ms']:.0f} ms "
+              f"({engine.stats['bytes_sent']} bytes sent, {engine.stats['bytes_received']} received)")
+        if engine.stats['oversold']:
+            print(f"  Oversold after merging: {', '.join(engine.stats['oversold'])}")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,264 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
                              QTableWidgetItem, QPushButton, QLabel, QMessageBox,
                              QDateEdit, QComboBox, QHeaderView, QTextEdit)
-from PyQt5.QtCore import QDate, Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import QDate, Qt, QPointF, QThread, pyqtSignal
+from PyQt5.QtGui import QFont, QPainter, QPen, QColor, QPolygonF
 from modules.database import Database
+from modules.archive import report_sources
+from modules.analytics import (TREND_PERIODS, trend_columns, bucket_totals,
+                               year_over_year, downsample_minmax, binned_sales,
+                               lttb, julian_to_iso)
+from modules.receivables import AGING_BUCKETS, aging_report
+from modules.payables import supplier_balances, supplier_costs
+from modules.jobs import job_summary, job_history
+from modules.workload import record_operation
+from modules.queries import (PAGE_SIZE, SALES_TOTALS, SALES_PAGE, SALES_KEYSET, PURCHASE_TOTALS,
+                             PURCHASE_PAGE, PURCHASE_KEYSET, STOCK_ROWS, STOCK_TOTALS, SUMMARY_SALES,
+                             SUMMARY_PURCHASES, SUMMARY_PRODUCTS, TOP_PRODUCTS, CHART_TOTALS, CATEGORY_SALES,
+                             CATEGORY_STOCK, UNCATEGORISED_STOCK, page_query)
+from modules.categories import SEPARATOR
+from modules.lots import EXPIRY_WINDOW_DAYS, expiring_lots
 import sqlite3
 import os
+import time
+
+SERIES_COLORS = ["#3498db", "#e74c3c", "#27ae60", "#f39c12", "#9b59b6", "#1abc9c"]
+
+
+class TrendChart(QWidget):
+    """Painted line chart downsampled to one min/max pair per pixel column"""
+    
+    def __init__(self):
+        super().__init__()
+        self.labels = []
+        self.series = []  # (name, values)
+        self.setMinimumHeight(180)
+    
+    def set_series(self, labels, series):
+        self.labels = labels
+        self.series = series
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor("white"))
+        
+        left, top, right, bottom = 70, 10, self.width() - 10, self.height() - 25
+        plot_width = max(right - left, 1)
+        peak = max((max(values) for _, values in self.series if values), default=0) or 1
+        
+        painter.setPen(QColor("#bdc3c7"))
+        painter.drawLine(left, bottom, right, bottom)
+        painter.drawLine(left, top, left, bottom)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(5, top + 10, f"{peak:,.0f}")
+        painter.drawText(5, bottom, "0")
+        if self.labels:
+            painter.drawText(left, self.height() - 5, self.labels[0])
+            painter.drawText(right - 80, self.height() - 5, self.labels[-1])
+        
+        def y_of(value):
+            return bottom - (bottom - top) * value / peak
+        
+        for index, (name, values) in enumerate(self.series):
+            pairs = downsample_minmax(values, plot_width)
+            if not pairs:
+                continue
+            color = QColor(SERIES_COLORS[index % len(SERIES_COLORS)])
+            step = plot_width / max(len(pairs) - 1, 1)
+            
+            # Min/max envelope per pixel column, joined through the midpoints
+            painter.setPen(QPen(color, 1))
+            line = QPolygonF()
+            for column, (low, high) in enumerate(pairs):
+                x = left + column * step
+                if high != low:
+                    painter.drawLine(QPointF(x, y_of(low)), QPointF(x, y_of(high)))
+                line.append(QPointF(x, y_of((low + high) / 2)))
+            painter.setPen(QPen(color, 2))
+            painter.drawPolyline(line)
+            
+            if len(self.series) > 1:
+                painter.drawText(left + 10 + index * 70, top + 12, name)
+        painter.end()
+
+
+class BinningWorker(QThread):
+    """Re-bins the visible chart range off the GUI thread"""
+    
+    ready = pyqtSignal(int, dict, float)
+    failed = pyqtSignal(int, str)
+    
+    def __init__(self, db, generation, from_date, to_date, bin_days):
+        super().__init__()
+        self.db = db
+        self.generation = generation
+        self.from_date = from_date
+        self.to_date = to_date
+        self.bin_days = bin_days
+    
+    def run(self):
+        try:
+            started = time.perf_counter()
+            conn = self.db.get_connection()
+            series = binned_sales(conn, self.from_date, self.to_date, self.bin_days)
+            conn.close()
+            self.ready.emit(self.generation, series, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+
+
+class SeriesChart(QWidget):
+    """Painted line chart of an already downsampled (x, y) series"""
+    
+    zoom_requested = pyqtSignal(float, float)  # factor, anchor (0..1 across the plot)
+    reset_requested = pyqtSignal()
+    
+    def __init__(self, title, color, money=False):
+        super().__init__()
+        self.title = title
+        self.color = QColor(color)
+        self.money = money
+        self.xs = []
+        self.ys = []
+        self.x_range = (0, 1)
+        self.setMinimumHeight(150)
+    
+    def plot_width(self):
+        return max(self.width() - 80, 10)
+    
+    def set_points(self, xs, ys, x_range):
+        self.xs = xs
+        self.ys = ys
+        self.x_range = x_range
+        self.update()
+    
+    def wheelEvent(self, event):
+        anchor = min(max((event.pos().x() - 70) / self.plot_width(), 0.0), 1.0)
+        self.zoom_requested.emit(0.8 if event.angleDelta().y() > 0 else 1.25, anchor)
+    
+    def mouseDoubleClickEvent(self, event):
+        self.reset_requested.emit()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor("white"))
+        
+        left, top, right, bottom = 70, 20, 70 + self.plot_width(), self.height() - 22
+        peak = max(self.ys, default=0) or 1
+        x0, x1 = self.x_range
+        span = (x1 - x0) or 1
+        
+        painter.setPen(QColor("#bdc3c7"))
+        painter.drawLine(left, bottom, right, bottom)
+        painter.drawLine(left, top, left, bottom)
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(left, 14, self.title)
+        painter.drawText(5, top + 10, f"Rs.{peak:,.0f}" if self.money else f"{peak:,.0f}")
+        painter.drawText(5, bottom, "0")
+        if not self.xs:
+            painter.drawText(left + 10, (top + bottom) // 2, "No data")
+            painter.end()
+            return
+        painter.drawText(left, self.height() - 5, julian_to_iso(x0))
+        painter.drawText(right - 75, self.height() - 5, julian_to_iso(x1))
+        
+        line = QPolygonF()
+        for x, y in zip(self.xs, self.ys):
+            line.append(QPointF(left + (right - left) * (x - x0) / span,
+                                bottom - (bottom - top) * y / peak))
+        painter.setPen(QPen(self.color, 2))
+        painter.drawPolyline(line)
+        painter.end()
+
+
+class ChartsPanel(QWidget):
+    """Revenue and units charts over pre-binned aggregates.
+    
+    Bins are sized so the visible range yields a few points per pixel,
+    then LTTB-downsampled to the plot width. Zooming (mouse wheel) or
+    resetting (double click) re-bins the new range on a worker thread.
+    """
+    
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self.generation = 0
+        self.workers = set()
+        self.full_range = (0, 1)
+        self.view_range = (0, 1)
+        self.series = {'x': [], 'revenue': [], 'units': []}
+        
+        self.revenue_chart = SeriesChart("Revenue", "#27ae60", money=True)
+        self.units_chart = SeriesChart("Units Sold", "#3498db")
+        self.status = QLabel()
+        self.status.setObjectName("status")
+        
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.revenue_chart)
+        layout.addWidget(self.units_chart)
+        layout.addWidget(self.status)
+        self.setLayout(layout)
+        
+        for chart in (self.revenue_chart, self.units_chart):
+            chart.zoom_requested.connect(self.zoom)
+            chart.reset_requested.connect(self.reset_zoom)
+    
+    def load(self, from_date, to_date):
+        start = QDate.fromString(from_date, "yyyy-MM-dd").toJulianDay() - 0.5
+        end = QDate.fromString(to_date, "yyyy-MM-dd").toJulianDay() + 0.5
+        self.full_range = (start, end)
+        self.request_bins(start, end)
+    
+    def zoom(self, factor, anchor):
+        x0, x1 = self.view_range
+        pivot = x0 + (x1 - x0) * anchor
+        new_x0 = max(self.full_range[0], pivot - (pivot - x0) * factor)
+        new_x1 = min(self.full_range[1], pivot + (x1 - pivot) * factor)
+        if new_x1 - new_x0 >= 2:
+            self.request_bins(new_x0, new_x1)
+    
+    def reset_zoom(self):
+        self.request_bins(*self.full_range)
+    
+    def request_bins(self, x0, x1):
+        """Re-bin [x0, x1] on a worker; results from superseded requests are dropped"""
+        self.generation += 1
+        self.view_range = (x0, x1)
+        
+        # A few bins per pixel, never finer than one day
+        bin_days = max(1, int((x1 - x0) / (self.revenue_chart.plot_width() * 2)))
+        worker = BinningWorker(self.db, self.generation, julian_to_iso(x0),
+                               julian_to_iso(x1), bin_days)
+        worker.ready.connect(self.on_bins_ready)
+        worker.failed.connect(self.on_bins_failed)
+        worker.finished.connect(lambda: self.workers.discard(worker))
+        self.workers.add(worker)
+        self.status.setText("Loading chart data...")
+        worker.start()
+    
+    def on_bins_ready(self, generation, series, query_ms):
+        if generation != self.generation:
+            return
+        self.series = series
+        
+        started = time.perf_counter()
+        width = self.revenue_chart.plot_width()
+        self.revenue_chart.set_points(*lttb(series['x'], series['revenue'], width), self.view_range)
+        self.units_chart.set_points(*lttb(series['x'], series['units'], width), self.view_range)
+        downsample_ms = (time.perf_counter() - started) * 1000
+        
+        self.status.setText(f"{len(series['x'])} bins -> {min(len(series['x']), width)} points | "
+                            f"query {query_ms:.1f} ms, downsample {downsample_ms:.1f} ms | "
+                            "wheel to zoom, double-click to reset")
+    
+    def on_bins_failed(self, generation, error):
+        if generation == self.generation:
+            self.status.setText(f"Failed to load chart data: {error}")
+
 
 class ReportsWindow(QWidget):
     def __init__(self):
@@ -16,43 +269,7 @@ class ReportsWindow(QWidget):
     def init_ui(self):
         self.setWindowTitle("Reports & Analytics")
         self.setFixedSize(1000, 700)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: Arial, sans-serif;
-            }
-            QTableWidget {
-                background-color: white;
-                border: 1px solid #bdc3c7;
-                gridline-color: #ecf0f1;
-            }
-            QHeaderView::section {
-                background-color: #3498db;
-                color: white;
-                padding: 8px;
-                border: none;
-                font-weight: bold;
-            }
-            QPushButton {
-                background-color: #9b59b6;
-                color: white;
-                padding: 10px 20px;
-                border: none;
-                border-radius: 5px;
-                font-weight: bold;
-                min-width: 120px;
-            }
-            QPushButton:hover {
-                background-color: #8e44ad;
-            }
-            QTextEdit {
-                background-color: white;
-                border: 1px solid #bdc3c7;
-                border-radius: 5px;
-                padding: 10px;
-                font-family: monospace;
-            }
-        """)
+        self.setObjectName("ReportsWindow")
         
         layout = QVBoxLayout()
         layout.setSpacing(15)
@@ -60,13 +277,20 @@ class ReportsWindow(QWidget):
         
         # Title
         title = QLabel("📊 Reports & Analytics")
-        title.setStyleSheet("font-size: 18px; font-weight: bold; color: #2c3e50;")
+        title.setObjectName("title")
         
         # Filter controls
         filter_layout = QHBoxLayout()
         
         self.report_type = QComboBox()
         self.report_type.addItems(["Sales Report", "Purchase Report", "Stock Report", "Summary Report"])
+        self.report_type.addItems(list(TREND_PERIODS))
+        self.report_type.addItem("Sales Charts")
+        self.report_type.addItems(["Category Sales", "Category Stock"])
+        self.report_type.addItem("Expiring Stock")
+        self.report_type.addItem("Receivables Aging")
+        self.report_type.addItem("Supplier Payables")
+        self.report_type.addItem("Maintenance Jobs")
         
         self.from_date = QDateEdit()
         self.from_date.setDate(QDate.currentDate().addDays(-30))
@@ -96,6 +320,15 @@ class ReportsWindow(QWidget):
         self.summary_text.setMaximumHeight(150)
         self.summary_text.setReadOnly(True)
         
+        # Chart for trend reports
+        self.chart = TrendChart()
+        self.chart.hide()
+        
+        # Zoomable revenue/units charts replace the table for "Sales Charts"
+        self.charts_panel = ChartsPanel(self.db)
+        self.charts_panel.hide()
+        self.detail_label = QLabel("Detailed Data:")
+        
         # Table for detailed data
         self.table = QTableWidget()
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
@@ -104,12 +337,18 @@ class ReportsWindow(QWidget):
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
         
+        # Detail rows are fetched in keyset pages as the table is scrolled
+        self.pager = None
+        self.table.verticalScrollBar().valueChanged.connect(self.on_table_scrolled)
+        
         layout.addWidget(title)
         layout.addLayout(filter_layout)
         layout.addWidget(QLabel("Summary:"))
         layout.addWidget(self.summary_text)
-        layout.addWidget(QLabel("Detailed Data:"))
+        layout.addWidget(self.chart)
+        layout.addWidget(self.detail_label)
         layout.addWidget(self.table)
+        layout.addWidget(self.charts_panel)
         
         self.setLayout(layout)
         
@@ -117,10 +356,16 @@ class ReportsWindow(QWidget):
         self.generate_report()
     
     def generate_report(self):
+        self.close_pager()
+        self.chart.hide()
+        self.charts_panel.hide()
+        self.detail_label.show()
+        self.table.show()
         try:
             report_type = self.report_type.currentText()
             from_date = self.from_date.date().toString("yyyy-MM-dd")
             to_date = self.to_date.date().toString("yyyy-MM-dd")
+            record_operation('report', {'report_type': report_type, 'from_date': from_date, 'to_date': to_date})
             
             if report_type == "Sales Report":
                 self.generate_sales_report(from_date, to_date)
@@ -130,6 +375,22 @@ class ReportsWindow(QWidget):
                 self.generate_stock_report()
             elif report_type == "Summary Report":
                 self.generate_summary_report(from_date, to_date)
+            elif report_type in TREND_PERIODS:
+                self.generate_trend_report(report_type, from_date, to_date)
+            elif report_type == "Sales Charts":
+                self.generate_charts_report(from_date, to_date)
+            elif report_type == "Category Sales":
+                self.generate_category_sales_report(from_date, to_date)
+            elif report_type == "Category Stock":
+                self.generate_category_stock_report()
+            elif report_type == "Expiring Stock":
+                self.generate_expiry_report(to_date)
+            elif report_type == "Receivables Aging":
+                self.generate_aging_report(to_date)
+            elif report_type == "Supplier Payables":
+                self.generate_payables_report()
+            elif report_type == "Maintenance Jobs":
+                self.generate_jobs_report()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to generate report: {str(e)}")
             print(f"Debug - Report generation error: {e}")
@@ -147,39 +408,18 @@ class ReportsWindow(QWidget):
                 conn.close()
                 return
             
-            # Get sales data
-            cursor.execute("""
-                SELECT s.sale_date, p.name, s.customer_name, s.quantity, 
-                       s.unit_price, s.total_amount, s.payment_type
-                FROM sales s
-                JOIN products p ON s.product_id = p.id
-                WHERE s.sale_date BETWEEN ? AND ?
-                ORDER BY s.sale_date DESC
-            """, (from_date, to_date))
+            # Older years may live in attached archive databases
+            sources = report_sources(conn, from_date, to_date)
             
-            sales_data = cursor.fetchall()
-            
-            # Calculate summary
-            cursor.execute("""
-                SELECT COUNT(*), SUM(total_amount), AVG(total_amount)
-                FROM sales
-                WHERE sale_date BETWEEN ? AND ?
-            """, (from_date, to_date))
+            # Calculate summary (separate aggregate so the detail rows can be paged)
+            cursor.execute(SALES_TOTALS.format(**sources), (from_date, to_date))
             
             summary = cursor.fetchone()
-            conn.close()
             
-            # Update table
+            # Update table one keyset page at a time; the pager owns the connection
             self.table.setColumnCount(7)
             self.table.setHorizontalHeaderLabels(["Date", "Product", "Customer", "Quantity", "Unit Price", "Total", "Payment"])
-            self.table.setRowCount(len(sales_data))
-            
-            for row, data in enumerate(sales_data):
-                for col, value in enumerate(data):
-                    if col in [4, 5]:  # Price columns
-                        self.table.setItem(row, col, QTableWidgetItem(f"Rs.{value:.2f}"))
-                    else:
-                        self.table.setItem(row, col, QTableWidgetItem(str(value)))
+            self.start_paging(conn, SALES_PAGE, sources, (from_date, to_date), SALES_KEYSET, [4, 5])
             
             # Update summary
             total_sales = summary[0] if summary[0] else 0
@@ -199,6 +439,73 @@ Average Sale Amount: Rs.{avg_amount:.2f}
             QMessageBox.critical(self, "Error", f"Failed to generate sales report: {str(e)}")
             print(f"Debug - Sales report error: {e}")
     
+    def start_paging(self, conn, query, sources, params, keyset, money_columns):
+        """Show the first page of a detail query and fetch the rest on scroll.
+        
+        query is a queries.py detail query: it selects the display columns
+        followed by the row id and orders by (date, id) descending; keyset
+        is the row-value predicate continuing after the last row shown.
+        """
+        self.close_pager()
+        self.pager = {
+            'conn': conn,
+            'query': query,
+            'sources': sources,
+            'params': params,
+            'keyset': keyset,
+            'money_columns': money_columns,
+            'last_key': None,
+            'done': False,
+        }
+        self.table.setRowCount(0)
+        self.fetch_next_page()
+    
+    def fetch_next_page(self):
+        pager = self.pager
+        if not pager or pager['done']:
+            return
+        
+        if pager['last_key']:
+            query = page_query(pager['query'], pager['sources'], pager['keyset'])
+            params = (*pager['params'], *pager['last_key'], PAGE_SIZE)
+        else:
+            query = page_query(pager['query'], pager['sources'])
+            params = (*pager['params'], PAGE_SIZE)
+        rows = pager['conn'].execute(query, params).fetchall()
+        
+        first_row = self.table.rowCount()
+        self.table.setRowCount(first_row + len(rows))
+        for row, data in enumerate(rows, first_row):
+            for col, value in enumerate(data[:-1]):
+                if col in pager['money_columns']:  # Price columns
+                    self.table.setItem(row, col, QTableWidgetItem(f"Rs.{value:.2f}"))
+                else:
+                    self.table.setItem(row, col, QTableWidgetItem(str(value)))
+        
+        if rows:
+            pager['last_key'] = (rows[-1][0], rows[-1][-1])
+        if len(rows) < PAGE_SIZE:
+            self.close_pager()
+    
+    def on_table_scrolled(self, value):
+        """Load the next page when the user nears the bottom of the table"""
+        scroll_bar = self.table.verticalScrollBar()
+        if self.pager and value >= scroll_bar.maximum() - 20:
+            try:
+                self.fetch_next_page()
+            except Exception as e:
+                self.close_pager()
+                QMessageBox.critical(self, "Error", f"Failed to load more rows: {str(e)}")
+    
+    def close_pager(self):
+        if self.pager:
+            self.pager['conn'].close()
+            self.pager = None
+    
+    def closeEvent(self, event):
+        self.close_pager()
+        super().closeEvent(event)
+    
     def create_empty_sales_report(self, from_date, to_date):
         # Create empty table
         self.table.setColumnCount(7)
@@ -228,39 +535,18 @@ Note: No sales data found for the selected period.
                 conn.close()
                 return
             
-            # Get purchase data
-            cursor.execute("""
-                SELECT p.purchase_date, pr.name, p.supplier, p.quantity, 
-                       p.unit_cost, p.total_cost, p.payment_type
-                FROM purchases p
-                JOIN products pr ON p.product_id = pr.id
-                WHERE p.purchase_date BETWEEN ? AND ?
-                ORDER BY p.purchase_date DESC
-            """, (from_date, to_date))
+            # Older years may live in attached archive databases
+            sources = report_sources(conn, from_date, to_date)
             
-            purchase_data = cursor.fetchall()
-            
-            # Calculate summary
-            cursor.execute("""
-                SELECT COUNT(*), SUM(total_cost), AVG(total_cost)
-                FROM purchases
-                WHERE purchase_date BETWEEN ? AND ?
-            """, (from_date, to_date))
+            # Calculate summary (separate aggregate so the detail rows can be paged)
+            cursor.execute(PURCHASE_TOTALS.format(**sources), (from_date, to_date))
             
             summary = cursor.fetchone()
-            conn.close()
             
-            # Update table
+            # Update table one keyset page at a time; the pager owns the connection
             self.table.setColumnCount(7)
             self.table.setHorizontalHeaderLabels(["Date", "Product", "Supplier", "Quantity", "Unit Cost", "Total", "Payment"])
-            self.table.setRowCount(len(purchase_data))
-            
-            for row, data in enumerate(purchase_data):
-                for col, value in enumerate(data):
-                    if col in [4, 5]:  # Price columns
-                        self.table.setItem(row, col, QTableWidgetItem(f"Rs.{value:.2f}"))
-                    else:
-                        self.table.setItem(row, col, QTableWidgetItem(str(value)))
+            self.start_paging(conn, PURCHASE_PAGE, sources, (from_date, to_date), PURCHASE_KEYSET, [4, 5])
             
             # Update summary
             total_purchases = summary[0] if summary[0] else 0
@@ -310,20 +596,12 @@ Note: No purchase data found for the selected period.
                 return
             
             # Get stock data
-            cursor.execute("""
-                SELECT name, stock_quantity, unit_price, 
-                       (stock_quantity * unit_price) as stock_value
-                FROM products
-                ORDER BY stock_quantity ASC
-            """)
+            cursor.execute(STOCK_ROWS)
             
             stock_data = cursor.fetchall()
             
             # Calculate summary
-            cursor.execute("""
-                SELECT COUNT(*), SUM(stock_quantity), SUM(stock_quantity * unit_price)
-                FROM products
-            """)
+            cursor.execute(STOCK_TOTALS)
             
             summary = cursor.fetchone()
             conn.close()
@@ -389,49 +667,35 @@ Note: No products found in inventory.
                 conn.close()
                 return
             
+            # Older years may live in attached archive databases
+            sources = report_sources(conn, from_date, to_date)
+            
             # Initialize default values
             total_sales = sales_revenue = total_purchases = purchase_cost = 0
             total_products = total_stock = 0
             
             # Get sales data if table exists
             if 'sales' in existing_tables:
-                cursor.execute("""
-                    SELECT COUNT(*), COALESCE(SUM(total_amount), 0)
-                    FROM sales WHERE sale_date BETWEEN ? AND ?
-                """, (from_date, to_date))
+                cursor.execute(SUMMARY_SALES.format(**sources), (from_date, to_date))
                 result = cursor.fetchone()
                 total_sales, sales_revenue = result if result else (0, 0)
             
             # Get purchase data if table exists
             if 'purchases' in existing_tables:
-                cursor.execute("""
-                    SELECT COUNT(*), COALESCE(SUM(total_cost), 0)
-                    FROM purchases WHERE purchase_date BETWEEN ? AND ?
-                """, (from_date, to_date))
+                cursor.execute(SUMMARY_PURCHASES.format(**sources), (from_date, to_date))
                 result = cursor.fetchone()
                 total_purchases, purchase_cost = result if result else (0, 0)
             
             # Get product data if table exists
             if 'products' in existing_tables:
-                cursor.execute("""
-                    SELECT COUNT(*), COALESCE(SUM(stock_quantity), 0)
-                    FROM products
-                """)
+                cursor.execute(SUMMARY_PRODUCTS)
                 result = cursor.fetchone()
                 total_products, total_stock = result if result else (0, 0)
             
             # Get top selling products if both sales and products tables exist
             top_products = []
             if 'sales' in existing_tables and 'products' in existing_tables:
-                cursor.execute("""
-                    SELECT p.name, SUM(s.quantity) as total_sold, SUM(s.total_amount) as revenue
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    WHERE s.sale_date BETWEEN ? AND ?
-                    GROUP BY p.name
-                    ORDER BY total_sold DESC
-                    LIMIT 5
-                """, (from_date, to_date))
+                cursor.execute(TOP_PRODUCTS.format(**sources), (from_date, to_date))
                 top_products = cursor.fetchall()
             
             conn.close()
@@ -507,6 +771,295 @@ Note: No data found for the selected period.
         """
         self.summary_text.setPlainText(summary_text)
     
+    def generate_trend_report(self, report_type, from_date, to_date):
+        try:
+            conn = self.db.get_connection()
+            sales = report_sources(conn, from_date, to_date)['sales']
+            
+            # Every bucket comes from one grouped pass over the range
+            columns = trend_columns(conn, sales, TREND_PERIODS[report_type], from_date, to_date)
+            conn.close()
+            totals = bucket_totals(columns)
+            
+            if report_type == "Year-over-Year":
+                years = year_over_year(totals)
+                months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+                
+                self.table.setColumnCount(1 + len(years))
+                self.table.setHorizontalHeaderLabels(["Month"] + [f"{year} Revenue" for year in years])
+                self.table.setRowCount(12)
+                for row, month in enumerate(months):
+                    self.table.setItem(row, 0, QTableWidgetItem(month))
+                    for col, revenue in enumerate(years.values(), 1):
+                        self.table.setItem(row, col, QTableWidgetItem(f"Rs.{revenue[row]:.2f}"))
+                
+                self.chart.set_series(months, list(years.items()))
+                lines = [f"  {year}: Rs.{sum(revenue):.2f}" for year, revenue in years.items()]
+            else:
+                self.table.setColumnCount(4)
+                self.table.setHorizontalHeaderLabels(["Period", "Units Sold", "Revenue", "Products Sold"])
+                self.table.setRowCount(len(totals['bucket']))
+                for row, bucket in enumerate(totals['bucket']):
+                    self.table.setItem(row, 0, QTableWidgetItem(bucket))
+                    self.table.setItem(row, 1, QTableWidgetItem(str(totals['units'][row])))
+                    self.table.setItem(row, 2, QTableWidgetItem(f"Rs.{totals['revenue'][row]:.2f}"))
+                    self.table.setItem(row, 3, QTableWidgetItem(str(totals['products'][row])))
+                
+                self.chart.set_series(totals['bucket'], [("Revenue", totals['revenue'])])
+                lines = [f"  Periods: {len(totals['bucket'])}"]
+                if totals['bucket']:
+                    best = max(range(len(totals['bucket'])), key=totals['revenue'].__getitem__)
+                    lines.append(f"  Best Period: {totals['bucket'][best]} (Rs.{totals['revenue'][best]:.2f})")
+            
+            self.chart.show()
+            title = f"{report_type.upper()} ({from_date} to {to_date})"
+            summary_text = f"""
+{title}
+{"=" * len(title)}
+Total Units Sold: {sum(totals['units'])}
+Total Revenue: Rs.{sum(totals['revenue']):.2f}
+""" + "\n".join(lines)
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate trend report: {str(e)}")
+            print(f"Debug - Trend report error: {e}")
+    
+    def show_category_rows(self, headers, rows, remainder):
+        """Fill the table with indented category rows plus an 'Uncategorised' line"""
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(rows) + (1 if remainder else 0))
+        for row, (full_name, depth, *values) in enumerate(rows):
+            self.table.setItem(row, 0, QTableWidgetItem("    " * depth + full_name.split(SEPARATOR)[-1]))
+            for col, value in enumerate(values, 1):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+        if remainder:
+            self.table.setItem(len(rows), 0, QTableWidgetItem("Uncategorised"))
+            for col, value in enumerate(remainder, 1):
+                self.table.setItem(len(rows), col, QTableWidgetItem(value))
+    
+    def generate_category_sales_report(self, from_date, to_date):
+        try:
+            # Read from the category_sales roll-up, never from the sales history
+            conn = self.db.get_connection()
+            rows = conn.execute(CATEGORY_SALES, (from_date, to_date)).fetchall()
+            count, revenue, units = conn.execute(CHART_TOTALS, (from_date, to_date)).fetchone()
+            conn.close()
+            
+            # Top-level categories together cover every categorised sale
+            top = [row for row in rows if row[1] == 0]
+            other_count = count - sum(row[2] for row in top)
+            other_units = units - sum(row[3] for row in top)
+            other_revenue = revenue - sum(row[4] for row in top)
+            share = lambda amount: f"{amount / revenue * 100:.1f}%" if revenue else "-"
+            self.show_category_rows(
+                ["Category", "Sales", "Units", "Revenue", "Share"],
+                [(name, depth, str(n), str(u), f"Rs.{r:.2f}", share(r)) for name, depth, n, u, r in rows],
+                (str(other_count), str(other_units), f"Rs.{other_revenue:.2f}", share(other_revenue))
+                if other_count else None)
+            
+            title = f"CATEGORY SALES ({from_date} to {to_date})"
+            summary_text = f"""
+{title}
+{"=" * len(title)}
+Total Sales: {count}
+Total Revenue: Rs.{revenue:.2f}
+Uncategorised: Rs.{other_revenue:.2f}
+""" + "\n".join(f"  {name}: Rs.{r:.2f} ({share(r)})" for name, _, _, _, r in top)
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate category sales report: {str(e)}")
+            print(f"Debug - Category sales report error: {e}")
+    
+    def generate_category_stock_report(self):
+        try:
+            conn = self.db.get_connection()
+            rows = conn.execute(CATEGORY_STOCK).fetchall()
+            other_products, other_units, other_value = conn.execute(UNCATEGORISED_STOCK).fetchone()
+            conn.close()
+            
+            top = [row for row in rows if row[1] == 0]
+            self.show_category_rows(
+                ["Category", "Products", "Stock Units", "Stock Value"],
+                [(name, depth, str(p), str(u), f"Rs.{v:.2f}") for name, depth, p, u, v in rows],
+                (str(other_products), str(other_units), f"Rs.{other_value:.2f}") if other_products else None)
+            
+            total_value = sum(row[4] for row in top) + other_value
+            summary_text = f"""
+CATEGORY STOCK
+==============
+Total Products: {sum(row[2] for row in top) + other_products}
+Total Stock Units: {sum(row[3] for row in top) + other_units}
+Total Stock Value: Rs.{total_value:.2f}
+Uncategorised: {other_products} products, Rs.{other_value:.2f}
+""" + "\n".join(f"  {name}: Rs.{v:.2f}" for name, _, _, _, v in top)
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate category stock report: {str(e)}")
+            print(f"Debug - Category stock report error: {e}")
+    
+    def generate_expiry_report(self, as_of):
+        try:
+            conn = self.db.get_connection()
+            lots = expiring_lots(conn, as_of)
+            conn.close()
+            
+            self.table.setColumnCount(7)
+            self.table.setHorizontalHeaderLabels(["Expiry", "Days Left", "Product", "Batch", "Units",
+                                                  "Cost Value", "Received"])
+            self.table.setRowCount(len(lots))
+            for row, lot in enumerate(lots):
+                self.table.setItem(row, 0, QTableWidgetItem(lot['expiry_date']))
+                self.table.setItem(row, 1, QTableWidgetItem(str(lot['days_left'])))
+                self.table.setItem(row, 2, QTableWidgetItem(lot['product']))
+                self.table.setItem(row, 3, QTableWidgetItem(lot['batch_code']))
+                self.table.setItem(row, 4, QTableWidgetItem(str(lot['quantity'])))
+                self.table.setItem(row, 5, QTableWidgetItem(f"Rs.{lot['value']:.2f}"))
+                self.table.setItem(row, 6, QTableWidgetItem(lot['received_date']))
+            
+            expired = [lot for lot in lots if lot['days_left'] < 0]
+            soon = [lot for lot in lots if 0 <= lot['days_left'] <= 30]
+            title = f"EXPIRING STOCK (next {EXPIRY_WINDOW_DAYS} days from {as_of})"
+            summary_text = f"""
+{title}
+{"=" * len(title)}
+Lots: {len(lots)} ({sum(lot['quantity'] for lot in lots)} units, Rs.{sum(lot['value'] for lot in lots):.2f})
+Already Expired: {len(expired)} lots, {sum(lot['quantity'] for lot in expired)} units, Rs.{sum(lot['value'] for lot in expired):.2f}
+Within 30 Days: {len(soon)} lots, {sum(lot['quantity'] for lot in soon)} units, Rs.{sum(lot['value'] for lot in soon):.2f}
+"""
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate expiry report: {str(e)}")
+            print(f"Debug - Expiry report error: {e}")
+    
+    def generate_aging_report(self, as_of):
+        try:
+            conn = self.db.get_connection()
+            rows = aging_report(conn, as_of)
+            conn.close()
+            
+            labels = [label for label, _ in AGING_BUCKETS]
+            self.table.setColumnCount(2 + len(labels))
+            self.table.setHorizontalHeaderLabels(["Customer", "Balance"] + labels)
+            self.table.setRowCount(len(rows))
+            totals = [0.0] * len(labels)
+            for row, data in enumerate(rows):
+                self.table.setItem(row, 0, QTableWidgetItem(data['name']))
+                self.table.setItem(row, 1, QTableWidgetItem(f"Rs.{data['balance']:.2f}"))
+                for col, amount in enumerate(data['buckets']):
+                    self.table.setItem(row, 2 + col, QTableWidgetItem(f"Rs.{amount:.2f}"))
+                    totals[col] += amount
+            
+            title = f"RECEIVABLES AGING (as of {as_of})"
+            summary_text = f"""
+{title}
+{"=" * len(title)}
+Customers Owing: {len(rows)}
+Total Outstanding: Rs.{sum(totals):.2f}
+""" + "\n".join(f"  {label}: Rs.{amount:.2f}" for label, amount in zip(labels, totals))
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate aging report: {str(e)}")
+            print(f"Debug - Aging report error: {e}")
+    
+    def generate_payables_report(self):
+        try:
+            # Both come from maintained aggregates, not from purchase history
+            conn = self.db.get_connection()
+            balances = supplier_balances(conn)
+            costs = supplier_costs(conn)
+            conn.close()
+            
+            self.table.setColumnCount(7)
+            self.table.setHorizontalHeaderLabels(["Supplier", "Product", "Purchases", "Units Bought",
+                                                  "Last Cost", "Avg Cost", "Last Purchase"])
+            self.table.setRowCount(len(costs))
+            for row, data in enumerate(costs):
+                self.table.setItem(row, 0, QTableWidgetItem(data['supplier']))
+                self.table.setItem(row, 1, QTableWidgetItem(data['product']))
+                self.table.setItem(row, 2, QTableWidgetItem(str(data['purchases'])))
+                self.table.setItem(row, 3, QTableWidgetItem(str(data['quantity'])))
+                self.table.setItem(row, 4, QTableWidgetItem(f"Rs.{data['last_cost']:.2f}"))
+                self.table.setItem(row, 5, QTableWidgetItem(f"Rs.{data['avg_cost'] or 0:.2f}"))
+                self.table.setItem(row, 6, QTableWidgetItem(str(data['last_purchase_date'])[:10]))
+            
+            summary_text = f"""
+SUPPLIER PAYABLES
+=================
+Suppliers Owed: {len(balances)}
+Total Payable: Rs.{sum(balance for _, _, balance in balances):.2f}
+""" + "\n".join(f"  {name}: Rs.{balance:.2f}" for _, name, balance in balances)
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate payables report: {str(e)}")
+            print(f"Debug - Payables report error: {e}")
+    
+    def generate_jobs_report(self):
+        try:
+            conn = self.db.get_connection()
+            jobs = job_summary(conn)
+            history = job_history(conn, limit=200)
+            conn.close()
+            
+            self.table.setColumnCount(5)
+            self.table.setHorizontalHeaderLabels(["Started", "Job", "Status", "Duration", "Detail"])
+            self.table.setRowCount(len(history))
+            for row, (job, started_at, duration_ms, status, detail) in enumerate(history):
+                self.table.setItem(row, 0, QTableWidgetItem(str(started_at)))
+                self.table.setItem(row, 1, QTableWidgetItem(job))
+                self.table.setItem(row, 2, QTableWidgetItem(status))
+                self.table.setItem(row, 3, QTableWidgetItem(f"{duration_ms:.0f} ms"))
+                self.table.setItem(row, 4, QTableWidgetItem(detail or ""))
+            
+            lines = []
+            for name, _, interval, enabled, last_run, status, last_ms, next_run, avg_ms, runs in jobs:
+                last = f"last {last_run} ({status}, {last_ms:.0f} ms)" if last_run else "not run yet"
+                average = f", avg {avg_ms:.0f} ms" if runs else ""
+                state = "" if enabled else " [disabled]"
+                lines.append(f"  {name}{state}: {last}{average}, next {next_run}")
+            summary_text = f"""
+MAINTENANCE JOBS
+================
+Jobs run in the background once no sale has been saved for a minute.
+""" + "\n".join(lines)
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate jobs report: {str(e)}")
+            print(f"Debug - Jobs report error: {e}")
+    
+    def generate_charts_report(self, from_date, to_date):
+        try:
+            conn = self.db.get_connection()
+            count, revenue, units = conn.execute(CHART_TOTALS, (from_date, to_date)).fetchone()
+            conn.close()
+            
+            self.detail_label.hide()
+            self.table.hide()
+            self.charts_panel.show()
+            self.charts_panel.load(from_date, to_date)
+            
+            summary_text = f"""
+SALES CHARTS ({from_date} to {to_date})
+========================================
+Total Sales: {count}
+Total Revenue: Rs.{revenue:.2f}
+Total Units Sold: {units}
+Scroll the mouse wheel over a chart to zoom, double-click to reset.
+            """
+            self.summary_text.setPlainText(summary_text)
+            
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to generate sales charts: {str(e)}")
+            print(f"Debug - Sales charts error: {e}")
+    
     def export_pdf(self):
         try:
             from fpdf import FPDF
@@ -1,50 +1,31 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
                              QPushButton, QLabel, QMessageBox, QComboBox, 
-                             QSpinBox, QDoubleSpinBox, QDateEdit, QFormLayout)
+                             QSpinBox, QDoubleSpinBox, QDateEdit, QFormLayout,
+                             QCheckBox)
 from PyQt5.QtCore import QDate
+from bisect import bisect_left
+import uuid
 from modules.database import Database
+from modules.events import change_bus, gui_callback
+from modules.transactions import TransactionError
+from modules.writer import get_write_queue
+from modules.scanner import ScanDetector
+from modules.parties import PartyIndex
 
 class SaleWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.db = Database()
+        self.product_names = []
+        self.products = {}  # name -> {'id', 'price', 'stock', 'barcode'}
+        self.barcodes = {}  # barcode -> name
+        self.pending_sale = None  # sale submitted to the writer, awaiting its result
         self.init_ui()
     
     def init_ui(self):
         self.setWindowTitle("Sale Entry")
-        self.setFixedSize(600, 550)  # Increased size
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-                font-family: Arial, sans-serif;
-            }
-            QLineEdit, QComboBox, QSpinBox, QDoubleSpinBox, QDateEdit {
-                padding: 10px;
-                border: 2px solid #bdc3c7;
-                border-radius: 5px;
-                font-size: 14px;
-                min-height: 20px;
-            }
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: #2c3e50;
-                margin-bottom: 5px;
-            }
-            QPushButton {
-                background-color: #e74c3c;
-                color: white;
-                padding: 12px;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #c0392b;
-            }
-        """)
+        self.setFixedSize(600, 660)  # Increased size
+        self.setObjectName("SaleWindow")
         
         # Main layout
         main_layout = QVBoxLayout()
@@ -53,7 +34,7 @@ class SaleWindow(QWidget):
         
         # Title
         title = QLabel("💰 Sale Entry")
-        title.setStyleSheet("font-size: 20px; font-weight: bold; color: #2c3e50; margin-bottom: 20px;")
+        title.setObjectName("title")
         
         # Form layout for better organization
         form_layout = QFormLayout()
@@ -61,6 +42,8 @@ class SaleWindow(QWidget):
         form_layout.setFieldGrowthPolicy(QFormLayout.ExpandingFieldsGrow)
         
         # Form fields
+        self.scanner_mode = QCheckBox("Scanner mode (scan barcode to add item)")
+        
         self.product_combo = QComboBox()
         self.product_combo.setEditable(True)
         self.product_combo.setPlaceholderText("Select or enter product name")
@@ -68,12 +51,19 @@ class SaleWindow(QWidget):
         
         self.customer_name = QLineEdit()
         self.customer_name.setPlaceholderText("Enter customer name")
+        self.customers = PartyIndex(self.db, 'customers')
+        self.customer_name.setCompleter(self.customers.completer(self))
         
         self.quantity = QSpinBox()
         self.quantity.setRange(1, 10000)
         self.quantity.setSuffix(" units")
         self.quantity.setValue(1)
         
+        # Shown under the quantity when it exceeds the stock on hand
+        self.stock_warning = QLabel()
+        self.stock_warning.setObjectName("stockWarning")
+        self.stock_warning.setVisible(False)
+        
         self.unit_price = QDoubleSpinBox()
         self.unit_price.setRange(0.01, 999999.99)
         self.unit_price.setPrefix("Rs. ")
@@ -88,29 +78,34 @@ class SaleWindow(QWidget):
         self.sale_date.setCalendarPopup(True)
         
         # Add fields to form layout
+        form_layout.addRow("", self.scanner_mode)
         form_layout.addRow("Product:", self.product_combo)
         form_layout.addRow("Customer Name:", self.customer_name)
         form_layout.addRow("Quantity:", self.quantity)
+        form_layout.addRow("", self.stock_warning)
         form_layout.addRow("Unit Price:", self.unit_price)
         form_layout.addRow("Payment Type:", self.payment_type)
         form_layout.addRow("Sale Date:", self.sale_date)
         
         # Calculate total automatically
         self.total_amount = QLabel("Total: Rs. 0.00")
-        self.total_amount.setStyleSheet("""
-            font-size: 18px; 
-            font-weight: bold; 
-            color: #27ae60;
-            padding: 10px;
-            background-color: #ecf0f1;
-            border-radius: 5px;
-            margin: 10px 0;
-        """)
+        self.total_amount.setObjectName("total")
         
         # Connect signals for auto-calculation
         self.quantity.valueChanged.connect(self.calculate_total)
         self.unit_price.valueChanged.connect(self.calculate_total)
         self.product_combo.currentTextChanged.connect(self.load_product_price)
+        self.quantity.valueChanged.connect(self.update_stock_warning)
+        self.product_combo.currentTextChanged.connect(self.update_stock_warning)
+        
+        # Pick up products added or repriced elsewhere while this window is open
+        change_bus.products_changed.connect(self.on_products_changed)
+        change_bus.sale_recorded.connect(self.on_sale_recorded)
+        
+        # Keyboard-wedge barcode scanner input
+        self.scan_detector = ScanDetector(self)
+        self.scan_detector.scanned.connect(self.on_barcode_scanned)
+        self.scanner_mode.toggled.connect(self.scan_detector.set_enabled)
         
         # Calculate initial total
         self.calculate_total()
@@ -119,35 +114,27 @@ class SaleWindow(QWidget):
         button_layout = QHBoxLayout()
         button_layout.setSpacing(15)
         
-        save_btn = QPushButton("💾 Save Sale")
-        save_btn.clicked.connect(self.save_sale)
+        self.save_btn = QPushButton("💾 Save Sale")
+        self.save_btn.clicked.connect(self.save_sale)
         
         cancel_btn = QPushButton("❌ Cancel")
         cancel_btn.clicked.connect(self.close)
-        cancel_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                padding: 12px;
-                border: none;
-                border-radius: 5px;
-                font-size: 14px;
-                font-weight: bold;
-                min-height: 40px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
-        
-        button_layout.addWidget(save_btn)
+        cancel_btn.setObjectName("cancelButton")
+        
+        button_layout.addWidget(self.save_btn)
         button_layout.addWidget(cancel_btn)
         
+        # Outcome of the last save; the window stays open for the next item
+        self.status = QLabel()
+        self.status.setObjectName("status")
+        self.status.setWordWrap(True)
+        
         # Add everything to main layout
         main_layout.addWidget(title)
         main_layout.addLayout(form_layout)
         main_layout.addWidget(self.total_amount)
         main_layout.addLayout(button_layout)
+        main_layout.addWidget(self.status)
         main_layout.addStretch()  # Push everything to top
         
         self.setLayout(main_layout)
@@ -155,40 +142,109 @@ class SaleWindow(QWidget):
         # Set focus to first field
         self.product_combo.setFocus()
     
+    def reset(self):
+        """Clear the form for the next sale; product data is kept live by the change bus"""
+        self.product_combo.setCurrentIndex(-1)
+        self.product_combo.clearEditText()
+        self.customer_name.clear()
+        self.quantity.setValue(1)
+        self.unit_price.setValue(1.00)
+        self.payment_type.setCurrentIndex(0)
+        self.sale_date.setDate(QDate.currentDate())
+        self.save_btn.setEnabled(True)
+        self.status.clear()
+        self.product_combo.setFocus()
+    
     def load_products(self):
-        """Load existing products into combo box"""
+        """Load existing products into combo box and the in-memory lookup maps"""
         try:
             conn = self.db.get_connection()
             cursor = conn.cursor()
-            cursor.execute("SELECT name FROM products ORDER BY name")
+            cursor.execute("SELECT id, name, unit_price, stock_quantity, barcode FROM products ORDER BY name")
             products = cursor.fetchall()
             
+            self.product_names = [product[1] for product in products]
+            self.products = {}
+            self.barcodes = {}
+            for product_id, name, price, stock, barcode in products:
+                self.products[name] = {'id': product_id, 'price': price, 'stock': stock, 'barcode': barcode}
+                if barcode:
+                    self.barcodes[barcode] = name
+            
             self.product_combo.clear()
-            for product in products:
-                self.product_combo.addItem(product[0])
+            self.product_combo.addItems(self.product_names)
             
             conn.close()
         except Exception as e:
             print(f"Error loading products: {e}")
     
+    def on_products_changed(self, changes):
+        """Insert newly created products and refresh the price of the current one"""
+        current_text = self.product_combo.currentText()
+        for change in changes:
+            name = change['name']
+            product = self.products.setdefault(name, {'barcode': None})
+            if product['barcode'] and product['barcode'] != change['barcode']:
+                self.barcodes.pop(product['barcode'], None)
+            product.update(id=change['product_id'], price=change['unit_price'],
+                           stock=change['stock_quantity'], barcode=change['barcode'])
+            if change['barcode']:
+                self.barcodes[change['barcode']] = name
+            
+            if change['created'] and self.product_combo.findText(name) < 0:
+                position = bisect_left(self.product_names, name)
+                self.product_names.insert(position, name)
+                self.product_combo.insertItem(position, name)
+            elif name == current_text and change['unit_price'] != change['previous_unit_price']:
+                self.unit_price.setValue(change['unit_price'])
+        self.update_stock_warning()
+        
+        # Inserting into an empty combo selects the new item; keep what the user typed
+        if self.product_combo.currentText() != current_text:
+            self.product_combo.setEditText(current_text)
+    
+    def on_sale_recorded(self, sale):
+        self.customers.add(sale['customer_name'])
+    
     def load_product_price(self):
         """Load product price when product is selected"""
-        product_name = self.product_combo.currentText()
-        if not product_name:
+        product = self.products.get(self.product_combo.currentText())
+        if product:
+            self.unit_price.setValue(product['price'])
+    
+    def on_barcode_scanned(self, code):
+        """Resolve a scanned code from memory and fill in the sale line"""
+        name = self.barcodes.get(code)
+        if name is None:
+            QMessageBox.warning(self, "Error", f"Unknown barcode: {code}")
             return
         
-        try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT unit_price FROM products WHERE name = ?", (product_name,))
-            result = cursor.fetchone()
-            
-            if result:
-                self.unit_price.setValue(result[0])
-            
-            conn.close()
-        except Exception as e:
-            print(f"Error loading product price: {e}")
+        current = self.product_combo.currentText().strip()
+        
+        # Scanning the same item again counts another unit
+        if current == name:
+            self.quantity.setValue(self.quantity.value() + 1)
+        else:
+            # The form holds one line, cleared once saved; don't let a scan
+            # silently throw away one that has not been
+            if current:
+                answer = QMessageBox.question(
+                    self, "Unsaved Sale",
+                    f"{current} ({self.quantity.value()} units) has not been saved.\n"
+                    f"Discard it and start a sale of {name}?",
+                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+                if answer != QMessageBox.Yes:
+                    return
+            self.product_combo.setEditText(name)
+            self.quantity.setValue(1)
+    
+    def update_stock_warning(self):
+        """Flag a quantity above the in-memory stock next to the quantity field"""
+        product = self.products.get(self.product_combo.currentText().strip())
+        short = product is not None and product.get('stock') is not None and product['stock'] < self.quantity.value()
+        if short:
+            self.stock_warning.setText(f"⚠ Only {product['stock']} units in stock")
+        self.stock_warning.setVisible(short)
     
     def calculate_total(self):
         total = self.quantity.value() * self.unit_price.value()
@@ -204,47 +260,51 @@ class SaleWindow(QWidget):
             QMessageBox.warning(self, "Error", "Please enter customer name")
             return
         
-        try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # Check if product exists
-            product_name = self.product_combo.currentText().strip()
-            cursor.execute("SELECT id, stock_quantity FROM products WHERE name = ?", (product_name,))
-            product = cursor.fetchone()
-            
-            if not product:
-                QMessageBox.warning(self, "Error", "Product not found. Please add it through Purchase Entry first.")
-                return
-            
-            product_id, current_stock = product
-            
-            # Check if enough stock available
-            if current_stock < self.quantity.value():
-                QMessageBox.warning(self, "Error", f"Insufficient stock. Available: {current_stock} units")
-                return
-            
-            # Insert sale record
-            total_amount = self.quantity.value() * self.unit_price.value()
-            cursor.execute("""
-                INSERT INTO sales (product_id, customer_name, quantity, unit_price, total_amount, payment_type, sale_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (product_id, self.customer_name.text().strip(), self.quantity.value(), 
-                  self.unit_price.value(), total_amount, self.payment_type.currentText(),
-                  self.sale_date.date().toString("yyyy-MM-dd")))
-            
-            # Update product stock
-            cursor.execute("""
-                UPDATE products 
-                SET stock_quantity = stock_quantity - ?
-                WHERE id = ?
-            """, (self.quantity.value(), product_id))
-            
-            conn.commit()
-            conn.close()
-            
-            QMessageBox.information(self, "Success", "Sale record saved successfully!")
-            self.close()
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save sale: {str(e)}")
\ No newline at end of file
+        product_name = self.product_combo.currentText().strip()
+        
+        # Quick check against the in-memory stock; the writer re-checks in the transaction
+        product = self.products.get(product_name)
+        if product and product['stock'] < self.quantity.value():
+            QMessageBox.warning(self, "Error", f"Insufficient stock. Available: {product['stock']} units")
+            return
+        
+        sale = {
+            'txn_id': uuid.uuid4().hex,
+            'product_name': product_name,
+            'customer_name': self.customers.canonical(self.customer_name.text()),
+            'quantity': self.quantity.value(),
+            'unit_price': self.unit_price.value(),
+            'payment_type': self.payment_type.currentText(),
+            'sale_date': self.sale_date.date().toString("yyyy-MM-dd"),
+        }
+        
+        # Commit on the background writer so the window never blocks on disk I/O
+        self.save_btn.setEnabled(False)
+        self.pending_sale = sale
+        get_write_queue().submit('sale', sale, gui_callback(self.on_sale_saved))
+    
+    def on_sale_saved(self, sale, error):
+        self.save_btn.setEnabled(True)
+        if error is not None:
+            if isinstance(error, TransactionError):
+                QMessageBox.warning(self, "Error", str(error))
+            else:
+                QMessageBox.critical(self, "Error", f"Failed to save sale: {str(error)}")
+            return
+        
+        saved = self.pending_sale
+        line = f"{saved['quantity']} × {saved['product_name']} (Rs. {saved['quantity'] * saved['unit_price']:.2f})"
+        if sale and sale.get('offline'):
+            self.status.setText(f"Saved offline: {line}. The database is unavailable; "
+                                "it will be written automatically once it is reachable.")
+        else:
+            self.status.setText(f"Saved: {line}")
+        
+        # Clear the line for the next item, unless another scan already replaced it
+        if (self.product_combo.currentText().strip(), self.quantity.value()) == \
+                (saved['product_name'], saved['quantity']):
+            self.product_combo.setCurrentIndex(-1)
+            self.product_combo.clearEditText()
+            self.quantity.setValue(1)
+            self.unit_price.setValue(1.00)
+        self.product_combo.setFocus()
\ No newline at end of file
@@ -0,0 +1,74 @@
+from PyQt5.QtCore import QObject, QEvent, QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QKeyEvent
+from PyQt5.QtWidgets import QApplication, QWidget
+
+
+class ScanDetector(QObject):
+    """Detect keyboard-wedge barcode scanner bursts in a window.
+
+    Scanners "type" the whole code within a few milliseconds and finish
+    with Enter. Printable keys aimed at the watched window are held back
+    while they keep arriving faster than max_gap_ms; a burst ending in
+    Enter is emitted as scanned(code), anything slower is replayed to the
+    focused widget so normal typing keeps working.
+    """
+
+    scanned = pyqtSignal(str)
+
+    def __init__(self, window, max_gap_ms=50, min_length=4):
+        super().__init__(window)
+        self.window = window
+        self.min_length = min_length
+        self.enabled = False
+        self.pending = []
+        self.replaying = False
+
+        self.gap_timer = QTimer(self)
+        self.gap_timer.setSingleShot(True)
+        self.gap_timer.setInterval(max_gap_ms)
+        self.gap_timer.timeout.connect(self.flush)
+
+        QApplication.instance().installEventFilter(self)
+
+    def set_enabled(self, enabled):
+        self.flush()
+        self.enabled = bool(enabled)
+
+    def eventFilter(self, obj, event):
+        if (not self.enabled or self.replaying or event.type() != QEvent.KeyPress
+                or not isinstance(obj, QWidget) or obj.window() is not self.window):
+            return False
+
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+            if len(self.pending) >= self.min_length and self.gap_timer.isActive():
+                code = ''.join(key_event.text() for key_event in self.pending)
+                self.gap_timer.stop()
+                self.pending = []
+                self.scanned.emit(code)
+                return True
+            self.flush()
+            return False
+
+        text = event.text()
+        if text and text.isprintable() and not event.modifiers() & (Qt.ControlModifier | Qt.AltModifier):
+            self.pending.append(QKeyEvent(QEvent.KeyPress, event.key(), event.modifiers(), text))
+            self.gap_timer.start()
+            return True
+
+        self.flush()
+        return False
+
+    def flush(self):
+        """Replay held-back keys to the focused widget (they were typed by hand)"""
+        self.gap_timer.stop()
+        pending, self.pending = self.pending, []
+        target = QApplication.focusWidget()
+        if not pending or target is None:
+            return
+
+        self.replaying = True
+        try:
+            for key_event in pending:
+                QApplication.sendEvent(target, key_event)
+        finally:
+            self.replaying = False
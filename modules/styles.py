@@ -0,0 +1,238 @@
+# Application-wide stylesheet, applied once with QApplication.setStyleSheet.
+#
+# Windows no longer carry their own inline stylesheets; each one sets its
+# objectName (e.g. "SaleWindow") and the rules below are scoped to it, so
+# Qt parses and caches a single sheet for the whole process instead of
+# re-parsing one every time a window is constructed.
+
+# Entry forms share a layout and differ only in their main button colour
+FORM_WINDOWS = {
+    'SaleWindow': ('#e74c3c', '#c0392b'),
+    'PurchaseWindow': ('#27ae60', '#219a52'),
+    'PaymentWindow': ('#2980b9', '#2471a3'),
+}
+
+# Dashboard menu buttons and KPI tiles, by objectName suffix
+MENU_COLORS = {
+    'purchase': ('#e74c3c', '#c0392b'),
+    'sale': ('#27ae60', '#219a52'),
+    'inventory': ('#9b59b6', '#8e44ad'),
+    'reports': ('#f39c12', '#d68910'),
+    'payment': ('#2980b9', '#2471a3'),
+    'supplier_payment': ('#16a085', '#138d75'),
+}
+TILE_COLORS = {
+    'revenue': '#27ae60',
+    'units': '#3498db',
+    'stock_value': '#9b59b6',
+    'low_stock': '#e74c3c',
+}
+
+
+def scoped(windows, selector):
+    """'#A sel, #B sel' for each window objectName"""
+    return ", ".join(f"#{window} {selector}" for window in windows)
+
+
+def form_rules():
+    windows = list(FORM_WINDOWS)
+    rules = [f"""
+        {", ".join(f"#{window}" for window in windows)}, {scoped(windows, "QWidget")} {{
+            background-color: #f5f5f5;
+            font-family: Arial, sans-serif;
+        }}
+        {scoped(windows, "QLineEdit")}, {scoped(windows, "QComboBox")}, {scoped(windows, "QSpinBox")},
+        {scoped(windows, "QDoubleSpinBox")}, {scoped(windows, "QDateEdit")} {{
+            padding: 10px;
+            border: 2px solid #bdc3c7;
+            border-radius: 5px;
+            font-size: 14px;
+            min-height: 20px;
+        }}
+        {scoped(windows, "QLabel")} {{
+            font-size: 14px;
+            font-weight: bold;
+            color: #2c3e50;
+            margin-bottom: 5px;
+        }}
+        {scoped(windows, "QPushButton")} {{
+            color: white;
+            padding: 12px;
+            border: none;
+            border-radius: 5px;
+            font-size: 14px;
+            font-weight: bold;
+            min-height: 40px;
+        }}
+    """]
+    for window, (color, hover) in FORM_WINDOWS.items():
+        rules.append(f"""
+        #{window} QPushButton {{ background-color: {color}; }}
+        #{window} QPushButton:hover {{ background-color: {hover}; }}
+        """)
+    return "".join(rules)
+
+
+def dashboard_rules():
+    rules = ["""
+        #DashboardWindow, #DashboardWindow QWidget {
+            background-color: #f5f5f5;
+            font-family: Arial, sans-serif;
+        }
+        #DashboardWindow QFrame {
+            background-color: white;
+            border-radius: 10px;
+            padding: 20px;
+        }
+        #DashboardWindow QLabel#header {
+            color: #2c3e50;
+            margin-bottom: 20px;
+        }
+        #DashboardWindow QPushButton {
+            color: white;
+            padding: 20px;
+            border: none;
+            border-radius: 10px;
+            font-size: 16px;
+            font-weight: bold;
+            min-height: 100px;
+            min-width: 180px;
+        }
+    """]
+    for key, (color, hover) in MENU_COLORS.items():
+        rules.append(f"""
+        #DashboardWindow QPushButton#menu_{key} {{ background-color: {color}; }}
+        #DashboardWindow QPushButton#menu_{key}:hover {{ background-color: {hover}; }}
+        """)
+    for key, color in TILE_COLORS.items():
+        rules.append(f"""
+        #DashboardWindow QLabel#tile_{key} {{
+            background-color: {color};
+            color: white;
+            border-radius: 10px;
+            padding: 10px;
+            font-size: 13px;
+        }}
+        """)
+    return "".join(rules)
+
+
+TABLE_RULES = """
+    #InventoryWindow, #InventoryWindow QWidget, #ReportsWindow, #ReportsWindow QWidget {
+        background-color: #f5f5f5;
+        font-family: Arial, sans-serif;
+    }
+    #InventoryWindow QTableWidget, #ReportsWindow QTableWidget {
+        background-color: white;
+        border: 1px solid #bdc3c7;
+        gridline-color: #ecf0f1;
+    }
+    #InventoryWindow QTableWidget { font-size: 14px; }
+    #InventoryWindow QHeaderView::section, #ReportsWindow QHeaderView::section {
+        background-color: #3498db;
+        color: white;
+        border: none;
+        font-weight: bold;
+    }
+    #InventoryWindow QHeaderView::section { padding: 12px; font-size: 14px; }
+    #ReportsWindow QHeaderView::section { padding: 8px; }
+    #InventoryWindow QPushButton, #ReportsWindow QPushButton {
+        color: white;
+        border: none;
+        border-radius: 5px;
+        font-weight: bold;
+    }
+    #InventoryWindow QPushButton {
+        background-color: #2ecc71;
+        padding: 12px 20px;
+        font-size: 14px;
+    }
+    #InventoryWindow QPushButton:hover { background-color: #27ae60; }
+    #ReportsWindow QPushButton {
+        background-color: #9b59b6;
+        padding: 10px 20px;
+        min-width: 120px;
+    }
+    #ReportsWindow QPushButton:hover { background-color: #8e44ad; }
+    #InventoryWindow QLineEdit {
+        padding: 10px;
+        border: 2px solid #bdc3c7;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    #ReportsWindow QTextEdit {
+        background-color: white;
+        border: 1px solid #bdc3c7;
+        border-radius: 5px;
+        padding: 10px;
+        font-family: monospace;
+    }
+"""
+
+LOGIN_RULES = """
+    #LoginWindow, #LoginWindow QWidget {
+        background-color: #f0f0f0;
+        font-family: Arial, sans-serif;
+    }
+    #LoginWindow QLineEdit {
+        padding: 10px;
+        border: 2px solid #ccc;
+        border-radius: 5px;
+        font-size: 14px;
+    }
+    #LoginWindow QPushButton {
+        background-color: #4CAF50;
+        color: white;
+        padding: 10px;
+        border: none;
+        border-radius: 5px;
+        font-size: 14px;
+        font-weight: bold;
+    }
+    #LoginWindow QPushButton:hover { background-color: #45a049; }
+    #LoginWindow QLabel {
+        color: #333;
+        font-size: 16px;
+    }
+    #LoginWindow QLabel#loginTitle { color: #2c3e50; margin-bottom: 20px; }
+"""
+
+# Shared widget roles; the extra QWidget ancestor outranks the per-window
+# type rules above without needing !important
+ROLE_RULES = """
+    QWidget QLabel#title {
+        font-size: 20px;
+        font-weight: bold;
+        color: #2c3e50;
+        margin-bottom: 20px;
+    }
+    QWidget#InventoryWindow QLabel#title { margin-bottom: 10px; }
+    QWidget#ReportsWindow QLabel#title { font-size: 18px; margin-bottom: 0px; }
+    QWidget QLabel#total {
+        font-size: 18px;
+        font-weight: bold;
+        padding: 10px;
+        background-color: #ecf0f1;
+        border-radius: 5px;
+        margin: 10px 0;
+    }
+    QWidget#SaleWindow QLabel#total { color: #27ae60; }
+    QWidget#PurchaseWindow QLabel#total { color: #e74c3c; }
+    QWidget#PaymentWindow QLabel#total { color: #c0392b; }
+    QWidget QLabel#summary {
+        font-size: 14px;
+        font-weight: bold;
+        color: #2c3e50;
+        padding: 10px;
+        background-color: #ecf0f1;
+        border-radius: 5px;
+    }
+    QWidget QLabel#status { font-size: 11px; color: #7f8c8d; }
+    QWidget QLabel#stockWarning { font-size: 12px; color: #e74c3c; }
+    QWidget QPushButton#cancelButton { background-color: #95a5a6; }
+    QWidget QPushButton#cancelButton:hover { background-color: #7f8c8d; }
+    QWidget QPushButton#exportButton { background-color: #9b59b6; }
+    QWidget QPushButton#exportButton:hover { background-color: #8e44ad; }
+"""
+
+APP_STYLESHEET = form_rules() + dashboard_rules() + TABLE_RULES + LOGIN_RULES + ROLE_RULES
@@ -0,0 +1,237 @@
+from modules.categories import add_category_sales, move_product, resolve_category
+from modules.changelog import log_change
+from modules.event_payloads import product_change
+from modules.lots import allocate_lots, receive_lot
+from modules.party_store import normalize_name, resolve_party
+
+
+class TransactionError(Exception):
+    """A sale or purchase that cannot be recorded (unknown product, no stock...)"""
+
+
+def record_sale(cursor, sale, enforce_stock=True):
+    """Insert a sale and decrement stock inside the caller's transaction.
+
+    sale holds product_name, customer_name, quantity, unit_price,
+    payment_type, sale_date and an optional client-generated txn_id.
+    The units are taken from the product's lots, first expiring first
+    out. Returns (sale record, product change), or None when a sale with
+    the same txn_id is already recorded.
+    """
+    txn_id = sale.get('txn_id')
+    if txn_id:
+        cursor.execute("SELECT 1 FROM sales WHERE txn_id = ?", (txn_id,))
+        if cursor.fetchone():
+            return None
+
+    cursor.execute("""
+        SELECT p.id, p.stock_quantity, p.unit_price, p.barcode, c.path
+        FROM products p LEFT JOIN categories c ON c.id = p.category_id
+        WHERE p.name = ?
+    """, (sale['product_name'],))
+    product = cursor.fetchone()
+
+    if not product:
+        raise TransactionError("Product not found. Please add it through Purchase Entry first.")
+
+    product_id, current_stock, current_price, barcode, category_path = product
+    quantity = sale['quantity']
+
+    # Check if enough stock available (journalled sales have already happened)
+    if enforce_stock and current_stock < quantity:
+        raise TransactionError(f"Insufficient stock. Available: {current_stock} units")
+
+    customer_id, customer_name = resolve_party(cursor, 'customers', sale['customer_name'])
+    record = {
+        'product_id': product_id,
+        'customer_id': customer_id,
+        'customer_name': customer_name,
+        'quantity': quantity,
+        'unit_price': sale['unit_price'],
+        'total_amount': quantity * sale['unit_price'],
+        'payment_type': sale['payment_type'],
+        'sale_date': sale['sale_date'],
+        'txn_id': txn_id,
+    }
+    cursor.execute("""
+        INSERT INTO sales (product_id, customer_id, customer_name, quantity, unit_price, total_amount, payment_type, sale_date, txn_id)
+        VALUES (:product_id, :customer_id, :customer_name, :quantity, :unit_price, :total_amount, :payment_type, :sale_date, :txn_id)
+    """, record)
+    record['id'] = cursor.lastrowid
+
+    # Update product stock
+    cursor.execute("""
+        UPDATE products
+        SET stock_quantity = stock_quantity - ?
+        WHERE id = ?
+    """, (quantity, product_id))
+    allocate_lots(cursor, product_id, record['id'], quantity)
+
+    # Credit sales add to what the customer owes
+    if record['payment_type'] == 'Credit':
+        cursor.execute("UPDATE customers SET balance = balance + ? WHERE id = ?",
+                       (record['total_amount'], customer_id))
+
+    # Keep the per-day aggregate used by charts in step
+    cursor.execute("""
+        INSERT INTO daily_sales (day, sales_count, units, revenue)
+        VALUES (substr(?, 1, 10), 1, ?, ?)
+        ON CONFLICT (day) DO UPDATE SET
+            sales_count = sales_count + 1,
+            units = units + excluded.units,
+            revenue = revenue + excluded.revenue
+    """, (record['sale_date'], quantity, record['total_amount']))
+    if category_path:
+        add_category_sales(cursor, category_path, record['sale_date'], 1, quantity, record['total_amount'])
+
+    log_change(cursor, 'sale', sale, sale['product_name'])
+
+    change = product_change(product_id, sale['product_name'], current_stock - quantity,
+                            -quantity, current_price, barcode=barcode)
+    return record, change
+
+
+def record_purchase(cursor, purchase):
+    """Insert a purchase, creating the product if needed, inside the caller's transaction.
+
+    purchase holds product_name, barcode (optional), supplier, quantity,
+    unit_cost, payment_type, purchase_date and optional category ('Brand >
+    Type', which files the product there), batch_code and expiry_date for
+    the lot the purchase brings in. Returns (purchase record, product
+    change).
+    """
+    product_name = purchase['product_name']
+    barcode = purchase.get('barcode') or None
+    unit_cost = purchase['unit_cost']
+    category = resolve_category(cursor, purchase.get('category'))
+
+    # Check if product exists, if not create it
+    cursor.execute("SELECT id, stock_quantity, unit_price, barcode, category_id FROM products WHERE name = ?",
+                   (product_name,))
+    product = cursor.fetchone()
+
+    created = not product
+    if created:
+        category_id, category_name = (category[0], category[2]) if category else (None, None)
+        cursor.execute("""
+            INSERT INTO products (name, stock_quantity, unit_price, barcode, category_id, category)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (product_name, 0, unit_cost, barcode, category_id, category_name))
+        product_id = cursor.lastrowid
+        current_stock, current_price = 0, unit_cost
+    else:
+        product_id, current_stock, current_price, current_barcode, category_id = product
+        if barcode and barcode != current_barcode:
+            cursor.execute("UPDATE products SET barcode = ? WHERE id = ?", (barcode, product_id))
+        else:
+            barcode = current_barcode
+        # A blank category leaves the product where it is
+        if category and category[0] != category_id:
+            move_product(cursor, product_id, category)
+
+    supplier_id, supplier = resolve_party(cursor, 'suppliers', purchase['supplier'])
+    quantity = purchase['quantity']
+    record = {
+        'product_id': product_id,
+        'supplier_id': supplier_id,
+        'supplier': supplier,
+        'quantity': quantity,
+        'unit_cost': unit_cost,
+        'total_cost': quantity * unit_cost,
+        'payment_type': purchase['payment_type'],
+        'purchase_date': purchase['purchase_date'],
+    }
+    cursor.execute("""
+        INSERT INTO purchases (product_id, supplier_id, supplier, quantity, unit_cost, total_cost, payment_type, purchase_date)
+        VALUES (:product_id, :supplier_id, :supplier, :quantity, :unit_cost, :total_cost, :payment_type, :purchase_date)
+    """, record)
+    record['id'] = cursor.lastrowid
+    receive_lot(cursor, product_id, record['id'], quantity, unit_cost, record['purchase_date'],
+                purchase.get('batch_code'), purchase.get('expiry_date'))
+
+    # Update product stock
+    cursor.execute("""
+        UPDATE products
+        SET stock_quantity = stock_quantity + ?, unit_price = ?
+        WHERE id = ?
+    """, (quantity, unit_cost, product_id))
+
+    # Credit purchases add to what we owe the supplier
+    if record['payment_type'] == 'Credit':
+        cursor.execute("UPDATE suppliers SET balance = balance + ? WHERE id = ?",
+                       (record['total_cost'], supplier_id))
+
+    # Running cost figures per supplier and product; an older back-dated
+    # purchase does not replace the last cost
+    cursor.execute("""
+        INSERT INTO supplier_product_costs
+            (supplier_id, product_id, purchase_count, quantity, total_cost, last_cost, last_purchase_date)
+        VALUES (:supplier_id, :product_id, 1, :quantity, :total_cost, :unit_cost, :purchase_date)
+        ON CONFLICT (supplier_id, product_id) DO UPDATE SET
+            purchase_count = purchase_count + 1,
+            quantity = quantity + excluded.quantity,
+            total_cost = total_cost + excluded.total_cost,
+            last_cost = CASE WHEN excluded.last_purchase_date >= last_purchase_date
+                             THEN excluded.last_cost ELSE last_cost END,
+            last_purchase_date = max(last_purchase_date, excluded.last_purchase_date)
+    """, record)
+
+    log_change(cursor, 'purchase', purchase, product_name)
+
+    change = product_change(product_id, product_name, current_stock + quantity, quantity,
+                            unit_cost, current_price, created, barcode)
+    return record, change
+
+
+def record_payment(cursor, payment):
+    """Insert a customer payment and reduce their balance inside the caller's transaction.
+
+    payment holds customer_name, amount, payment_type, payment_date and an
+    optional note. Returns (payment record, None) - payments change no
+    product rows.
+    """
+    return _record_party_payment(cursor, payment, 'customers', 'customer')
+
+
+def record_supplier_payment(cursor, payment):
+    """Insert a payment to a supplier and reduce what we owe them.
+
+    payment holds supplier, amount, payment_type, payment_date and an
+    optional note. Returns (payment record, None).
+    """
+    return _record_party_payment(cursor, payment, 'suppliers', 'supplier')
+
+
+def _record_party_payment(cursor, payment, table, party):
+    amount = payment['amount']
+    if amount <= 0:
+        raise TransactionError("Payment amount must be greater than zero")
+
+    name_field = 'customer_name' if party == 'customer' else 'supplier'
+    cursor.execute(f"SELECT id, name FROM {table} WHERE name_key = ?",
+                   (normalize_name(payment[name_field]),))
+    row = cursor.fetchone()
+    if not row:
+        raise TransactionError(f"{party.title()} not found. Payments can only be recorded for existing {table}.")
+
+    party_id, name = row
+    record = {
+        f'{party}_id': party_id,
+        name_field: name,
+        'amount': amount,
+        'payment_type': payment['payment_type'],
+        'payment_date': payment['payment_date'],
+        'note': payment.get('note') or None,
+    }
+    cursor.execute(f"""
+        INSERT INTO {party}_payments ({party}_id, amount, payment_type, payment_date, note)
+        VALUES (:{party}_id, :amount, :payment_type, :payment_date, :note)
+    """, record)
+    record['id'] = cursor.lastrowid
+
+    cursor.execute(f"UPDATE {table} SET balance = balance - ? WHERE id = ?", (amount, party_id))
+    cursor.execute(f"SELECT balance FROM {table} WHERE id = ?", (party_id,))
+    record['balance'] = cursor.fetchone()[0]
+
+    log_change(cursor, 'payment' if party == 'customer' else 'supplier_payment', payment)
+    return record, None
@@ -0,0 +1,77 @@
+import time
+from PyQt5.QtCore import QObject, QEvent
+
+
+class WindowManager(QObject):
+    """Keeps one instance per window type and re-shows it instead of rebuilding.
+
+    Windows stay alive after they are closed (close() only hides a
+    top-level widget) and keep themselves current through the change bus,
+    so re-opening one is a reset() plus show(). The time from open() to
+    the window's first paint is recorded per window type.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.windows = {}
+        self.pending = {}  # window -> (name, started)
+        self.latencies = {}  # name -> [ms, ...]
+
+    def open(self, window_class, *args):
+        started = time.perf_counter()
+        key = (window_class.__name__,) + args
+        window = self.windows.get(key)
+        if window is None:
+            window = window_class(*args)
+            self.windows[key] = window
+        elif window.isVisible():
+            # Already on screen; just bring it to the front
+            window.raise_()
+            window.activateWindow()
+            return window
+        elif hasattr(window, 'reset'):
+            window.reset()
+
+        name = " ".join(str(part) for part in key)
+        self.pending[window] = (name, started)
+        window.installEventFilter(self)
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj in self.pending:
+            name, started = self.pending.pop(obj)
+            obj.removeEventFilter(self)
+            self.latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        return False
+
+    def latency_summary(self):
+        """{name: (opens, first_ms, avg_reopen_ms)} for every window opened so far"""
+        summary = {}
+        for name, samples in self.latencies.items():
+            reopens = samples[1:]
+            summary[name] = (len(samples), samples[0],
+                             sum(reopens) / len(reopens) if reopens else None)
+        return summary
+
+    def print_latencies(self):
+        for name, (opens, first_ms, reopen_ms) in self.latency_summary().items():
+            reopen = f", re-open avg {reopen_ms:.1f} ms" if reopen_ms is not None else ""
+            print(f"Window {name}: opened {opens}x, first {first_ms:.1f} ms{reopen}")
+
+    def close_all(self):
+        for window in self.windows.values():
+            window.close()
+
+
+_window_manager = None
+
+
+def get_window_manager():
+    """Return the process-wide window manager, creating it on first use"""
+    global _window_manager
+    if _window_manager is None:
+        _window_manager = WindowManager()
+    return _window_manager
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from modules.config import get_settings
+
+# Parameters kept per operation, in log order. txn_ids are left out so a
+# replay is never mistaken for the original sale and skipped as a duplicate.
+FIELDS = {
+    'sale': ('product_name', 'customer_name', 'quantity', 'unit_price', 'payment_type', 'sale_date'),
+    'purchase': ('product_name', 'barcode', 'supplier', 'quantity', 'unit_cost', 'payment_type',
+                 'purchase_date', 'category', 'batch_code', 'expiry_date'),
+    'payment': ('customer_name', 'amount', 'payment_type', 'payment_date', 'note'),
+    'supplier_payment': ('supplier', 'amount', 'payment_type', 'payment_date', 'note'),
+    'report': ('report_type', 'from_date', 'to_date'),
+}
+
+
+def default_workload_path():
+    settings = get_settings()
+    base = os.path.dirname(settings.db_path) if settings.persistent else os.getcwd()
+    return os.path.join(base, f"workload_{datetime.now():%Y%m%d_%H%M%S}.log")
+
+
+class WorkloadRecorder:
+    """Appends every operation the app issues to a compact log.
+
+    One line per operation: [milliseconds since recording started, kind,
+    parameter values in FIELDS order] as JSON. A '#' line starts each
+    recording session, so one file can collect several evenings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self.file.write(f"# workload recorded {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+
+    def record(self, kind, data):
+        offset_ms = int((time.perf_counter() - self.started) * 1000)
+        line = json.dumps([offset_ms, kind, *(data.get(field) for field in FIELDS[kind])],
+                          separators=(",", ":"), ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+_recorder = None
+
+
+def start_recording(path=None):
+    global _recorder
+    stop_recording()
+    _recorder = WorkloadRecorder(path or default_workload_path())
+    print(f"Recording workload to {_recorder.path}")
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def record_operation(kind, data):
+    """Log one operation if a recording is running (cheap no-op otherwise)"""
+    recorder = _recorder
+    if recorder is not None and kind in FIELDS:
+        try:
+            recorder.record(kind, data)
+        except (OSError, ValueError) as e:
+            print(f"Debug - workload recording stopped: {e}")
+            stop_recording()
+
+
+def load_workload(path):
+    """[(offset seconds, kind, data)] from a workload log.
+
+    Sessions are laid end to end, so offsets keep increasing across the
+    whole file. Lines cut short by a crash are skipped.
+    """
+    operations = []
+    base = last = 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                base = last
+                continue
+            try:
+                offset_ms, kind, *values = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            if kind not in FIELDS:
+                continue
+            last = base + offset_ms / 1000
+            operations.append((last, kind, dict(zip(FIELDS[kind], values))))
+    return operations
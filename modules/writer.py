@@ -0,0 +1,294 @@
+import queue
+import sqlite3
+import threading
+import time
+from modules.aggregates import repair_drift
+from modules.database import Database
+try:
+    from modules.events import change_bus
+except ImportError:
+    # Headless (API server, sync, CLIs) without PyQt5: no windows to notify
+    change_bus = None
+from modules.journal import SaleJournal, replay_journal
+from modules.replication import apply_remote_changes
+from modules.transactions import (record_sale, record_purchase, record_payment,
+                                  record_supplier_payment)
+from modules.workload import record_operation
+
+HANDLERS = {
+    'sale': record_sale,
+    'purchase': record_purchase,
+    'payment': record_payment,
+    'supplier_payment': record_supplier_payment,
+    'replicated': apply_remote_changes,
+    'aggregate_repair': repair_drift,
+}
+
+
+def database_unavailable(error):
+    """True for errors that mean the file cannot be written right now (locked,
+    I/O, disk full, unreadable) rather than that a command was wrong"""
+    return isinstance(error, sqlite3.OperationalError) or type(error) is sqlite3.DatabaseError
+
+
+class WriteCommand:
+    def __init__(self, kind, data, callback=None):
+        self.kind = kind
+        self.data = data
+        self.callback = callback
+        self.submitted_at = time.perf_counter()
+        self.answered = False
+
+
+class WriteQueue:
+    """Single writer thread that group-commits queued sales and purchases.
+
+    Windows submit commands and return immediately; the writer drains
+    everything pending into one transaction, with a savepoint per command
+    so a rejected sale does not roll back its neighbours. Each command's
+    callback(result, error) runs on the writer thread once the batch has
+    committed - wrap it with events.gui_callback to touch widgets.
+
+    When the database cannot be written (locked, unreachable, disk full)
+    sales are appended to the offline journal instead and replayed once
+    the database is available again. A command that fails on its own -
+    bad data, no stock - only fails its own callback.
+    """
+
+    def __init__(self, db=None, max_batch=100, busy_timeout_ms=2000, replay_interval=5):
+        self.db = db or Database()
+        self.max_batch = max_batch
+        self.busy_timeout_ms = busy_timeout_ms
+        self.replay_interval = replay_interval
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.conn = None
+        self.last_activity = time.monotonic()
+        self.journal = SaleJournal(self.db.journal_path)
+        self.journal.recover()
+        self.journal_pending = self.journal.has_pending()
+        self.stats = {
+            'commits': 0,
+            'commands': 0,
+            'failed_commits': 0,
+            'last_batch_size': 0,
+            'last_commit_ms': 0.0,
+            'total_commit_ms': 0.0,
+            'max_commit_ms': 0.0,
+            'last_wait_ms': 0.0,
+            'lock_wait_ms': 0.0,
+            'max_lock_wait_ms': 0.0,
+            'journalled': 0,
+            'replayed': 0,
+        }
+        self.thread = threading.Thread(target=self.run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, data, callback=None):
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown write command: {kind}")
+        self.last_activity = time.monotonic()
+        record_operation(kind, data)
+        self.queue.put(WriteCommand(kind, data, callback))
+
+    def stop(self, timeout=10):
+        """Commit whatever is pending and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def idle_seconds(self):
+        """Seconds since the last command was submitted or committed (0 while busy)"""
+        if self.queue_depth():
+            return 0.0
+        return time.monotonic() - self.last_activity
+
+    def metrics(self):
+        with self.lock:
+            metrics = dict(self.stats)
+        metrics['queue_depth'] = self.queue_depth()
+        metrics['journal_pending'] = self.journal_pending
+        metrics['avg_commit_ms'] = (metrics['total_commit_ms'] / metrics['commits']
+                                    if metrics['commits'] else 0.0)
+        return metrics
+
+    def connect(self):
+        if self.conn is None:
+            self.conn = self.db.get_connection()
+            self.conn.isolation_level = None  # transactions are managed explicitly
+            # Fail fast into the offline journal instead of stalling the till
+            self.conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        return self.conn
+
+    def disconnect(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+            self.conn = None
+
+    def run(self):
+        running = True
+        while running:
+            try:
+                batch = [self.queue.get(timeout=self.replay_interval if self.journal_pending else None)]
+            except queue.Empty:
+                self.replay()
+                continue
+
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                running = False
+                batch = [command for command in batch if command is not None]
+
+            # One bad batch must not stop the writer: its commands fail, the loop goes on
+            try:
+                # Journalled sales go in ahead of anything newer
+                self.replay()
+                if batch:
+                    self.commit_batch(batch)
+            except Exception as e:
+                print(f"Debug - writer batch failed: {e}")
+                self.disconnect()
+                self.answer([(command, None, e) for command in batch if not command.answered])
+        self.disconnect()
+
+    def commit_batch(self, batch):
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            cursor = self.connect().cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            # Time spent waiting for another process to release the write lock
+            lock_wait_ms = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.stats['lock_wait_ms'] += lock_wait_ms
+                self.stats['max_lock_wait_ms'] = max(self.stats['max_lock_wait_ms'], lock_wait_ms)
+            for command in batch:
+                cursor.execute("SAVEPOINT command")
+                try:
+                    result = HANDLERS[command.kind](cursor, command.data)
+                    cursor.execute("RELEASE command")
+                    outcomes.append((command, result, None))
+                except Exception as e:
+                    # Rejected or malformed: undo just this command
+                    cursor.execute("ROLLBACK TO command")
+                    cursor.execute("RELEASE command")
+                    outcomes.append((command, None, e))
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            # BEGIN, a savepoint or COMMIT failed, so nothing in the batch was saved
+            self.disconnect()
+            rejected = {id(command): error for command, _, error in outcomes if error is not None}
+            outcomes = [(command, None, rejected[id(command)]) if id(command) in rejected
+                        else self.commit_offline(command, e) for command in batch]
+            with self.lock:
+                self.stats['failed_commits'] += 1
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_activity = time.monotonic()
+        with self.lock:
+            self.stats['commits'] += 1
+            self.stats['commands'] += len(batch)
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_commit_ms'] = elapsed_ms
+            self.stats['total_commit_ms'] += elapsed_ms
+            self.stats['max_commit_ms'] = max(self.stats['max_commit_ms'], elapsed_ms)
+            self.stats['last_wait_ms'] = (started - batch[0].submitted_at) * 1000
+
+        try:
+            self.publish([(command.kind, result) for command, result, error in outcomes if result])
+        finally:
+            self.answer(outcomes)
+
+    def answer(self, outcomes):
+        """Run each command's callback once with its result or error"""
+        for command, result, error in outcomes:
+            command.answered = True
+            if command.callback:
+                try:
+                    command.callback(result[0] if result else None, error)
+                except Exception as e:
+                    print(f"Error in write callback: {e}")
+
+    def commit_offline(self, command, error):
+        """Journal a sale while the database is unavailable; anything else just fails"""
+        if command.kind != 'sale' or not database_unavailable(error):
+            return command, None, error
+        try:
+            self.journal.append(command.data)
+        except OSError as journal_error:
+            return command, None, journal_error
+
+        self.journal_pending = True
+        with self.lock:
+            self.stats['journalled'] += 1
+        # Nothing reached the database yet, so there is no product change to publish
+        return command, (dict(command.data, offline=True), None), None
+
+    def replay(self):
+        """Try to drain the offline journal into the database"""
+        if not self.journal_pending:
+            return
+        try:
+            applied = replay_journal(self.journal, self.connect())
+        except sqlite3.Error as e:
+            print(f"Journal replay deferred: {e}")
+            self.disconnect()
+            return
+
+        self.journal_pending = False
+        with self.lock:
+            self.stats['replayed'] += len(applied)
+        self.publish([('sale', result) for result in applied])
+
+    def publish(self, results):
+        """Announce committed changes to open windows"""
+        if change_bus is None:
+            return
+        changes = []
+        for kind, (record, change) in results:
+            if kind == 'payment':
+                change_bus.payment_recorded.emit(record)
+                continue
+            if kind == 'supplier_payment':
+                change_bus.supplier_payment_recorded.emit(record)
+                continue
+            if kind == 'replicated':
+                # Stock moved by other terminals
+                changes.extend(change)
+                continue
+            if change is None:
+                continue
+            changes.append(change)
+            if kind == 'sale':
+                change_bus.sale_recorded.emit(record)
+            else:
+                change_bus.purchase_recorded.emit(record)
+        if changes:
+            change_bus.products_changed.emit(changes)
+
+
+_write_queue = None
+
+
+def get_write_queue():
+    """Return the process-wide writer, starting it on first use"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+    return _write_queue
+
+
+def stop_write_queue():
+    if _write_queue is not None:
+        _write_queue.stop()